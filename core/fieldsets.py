@@ -0,0 +1,144 @@
+"""
+Выборочные поля (?fields=) и раскрытие вложенных связей (?expand=).
+
+    ?fields=id,title,favorite_movies.title
+        только перечисленные поля; поля вложенных объектов через точку
+    ?expand=favorite_movies,favorite_movies.genres
+        раскрыть только эти связи из Meta.expandable_fields, остальные
+        отдаются списком id (одиночная связь — id)
+
+Без параметров ответ прежний: все поля, все связи раскрыты. Форма ответа
+определяет и запрос к базе: shape_queryset строит select_related /
+prefetch_related по тем полям, которые сериализатор действительно отдаст,
+так что невыбранные связи не загружаются.
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+PARAMS = ("fields", "expand")
+
+
+def _parse(raw):
+    """'a,b.c' -> {'a': {}, 'b': {'c': {}}}"""
+    tree = {}
+    for path in raw.split(","):
+        node = tree
+        for part in path.strip().split("."):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def requests_shape(request):
+    """Запрошена ли форма ответа, отличная от полной"""
+    return any(param in request.query_params for param in PARAMS)
+
+
+class Shape:
+    """Запрошенная форма: fields/expand — деревья имён или None (без ограничений)"""
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params if request is not None else {}
+        fields = _parse(params["fields"]) if "fields" in params else None
+        expand = _parse(params["expand"]) if "expand" in params else None
+        return cls(fields or None, expand)
+
+    def keeps(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.expand is None or name in self.expand
+
+    def child(self, name):
+        fields = self.fields.get(name) if self.fields is not None else None
+        expand = self.expand.get(name, {}) if self.expand is not None else None
+        return Shape(fields or None, expand)
+
+
+class ShapedSerializerMixin:
+    """
+    Сериализатор, который отдаёт только запрошенные поля. Корневой читает
+    форму из запроса в context, вложенный — из формы родителя.
+    Meta.expandable_fields — вложенные сериализаторы, которые можно свернуть
+    до id; Meta.field_prefetches — lookups для полей-методов
+    ({"following": [Prefetch(...)]}), их учитывает shape_queryset.
+    """
+
+    @property
+    def shape(self):
+        if not hasattr(self, "_shape"):
+            parent, name = self.parent, self.field_name
+            if isinstance(parent, serializers.ListSerializer):
+                parent, name = parent.parent, parent.field_name
+            if parent is None:
+                self._shape = Shape.from_request(self.context.get("request"))
+            elif isinstance(parent, ShapedSerializerMixin):
+                self._shape = parent.shape.child(name)
+            else:
+                self._shape = Shape()
+        return self._shape
+
+    def get_fields(self):
+        fields = super().get_fields()
+        shape = self.shape
+        expandable = getattr(self.Meta, "expandable_fields", ())
+        for param, allowed in (("fields", fields), ("expand", expandable)):
+            unknown = set(getattr(shape, param) or ()) - set(allowed)
+            if unknown:
+                raise serializers.ValidationError({param: f"Неизвестные поля: {', '.join(sorted(unknown))}"})
+
+        shaped = {}
+        for name, field in fields.items():
+            if not shape.keeps(name):
+                continue
+            if name in expandable and not shape.expands(name):
+                many = isinstance(field, serializers.ListSerializer)
+                field = serializers.PrimaryKeyRelatedField(many=many, read_only=True, source=field.source)
+            shaped[name] = field
+        return shaped
+
+
+def _prefixed(lookup, prefix):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(prefix + lookup.prefetch_through, queryset=lookup.queryset)
+    return prefix + lookup
+
+
+def _collect(serializer, prefix, select, prefetch):
+    """Связи для полей serializer; внутри prefetch всё догружается через prefetch"""
+    model = serializer.Meta.model
+    extra = getattr(serializer.Meta, "field_prefetches", {})
+    for name, field in serializer.fields.items():
+        prefetch.extend(_prefixed(lookup, prefix) for lookup in extra.get(name, ()))
+        source = field.source
+        if source == "*" or "." in source:
+            continue
+        if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+            prefetch.append(prefix + source)
+            _collect(field.child, f"{prefix}{source}__", None, prefetch)
+        elif isinstance(field, serializers.ManyRelatedField):
+            related = model._meta.get_field(source).related_model
+            prefetch.append(Prefetch(prefix + source, queryset=related.objects.only("pk")))
+        elif isinstance(field, serializers.ModelSerializer):
+            if select is not None:
+                select.append(prefix + source)
+                _collect(field, f"{prefix}{source}__", select, prefetch)
+            else:
+                prefetch.append(prefix + source)
+                _collect(field, f"{prefix}{source}__", None, prefetch)
+
+
+def shape_queryset(queryset, serializer):
+    """select_related/prefetch_related ровно под поля, которые отдаст serializer"""
+    select, prefetch = [], []
+    _collect(serializer, "", select, prefetch)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
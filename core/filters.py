@@ -0,0 +1,98 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def _parse_ids(raw, param):
+    try:
+        ids = [int(value) for value in raw.split(",") if value]
+    except ValueError:
+        raise ValidationError({param: "Ожидается список id через запятую"})
+    if not ids:
+        raise ValidationError({param: "Ожидается список id через запятую"})
+    return ids
+
+
+class CatalogFilter(BaseFilterBackend):
+    """
+    Фильтры каталога из query-параметров. View описывает их атрибутами:
+
+        range_filters = {"release_year": "release_year"}
+            -> ?release_year_min=1990&release_year_max=2000 (границы включительно)
+        id_filters = {"movie": "movie"}
+            -> ?movie=1,2 (внешний ключ из списка id)
+        genre_field = "genres"
+            -> ?genre=1,2 (хотя бы один из жанров)
+
+    Жанр фильтруется подзапросом к промежуточной таблице (pk IN (...)),
+    а не JOIN, поэтому строки не дублируются и сортировка остаётся по индексу.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        for param, field_name in getattr(view, "range_filters", {}).items():
+            field = queryset.model._meta.get_field(field_name)
+            for suffix, lookup in (("min", "gte"), ("max", "lte")):
+                name = f"{param}_{suffix}"
+                if not params.get(name):
+                    continue
+                try:
+                    value = field.to_python(params[name])
+                except DjangoValidationError:
+                    raise ValidationError({name: "Некорректное значение"})
+                queryset = queryset.filter(**{f"{field_name}__{lookup}": value})
+
+        for param, field_name in getattr(view, "id_filters", {}).items():
+            if params.get(param):
+                queryset = queryset.filter(**{f"{field_name}__in": _parse_ids(params[param], param)})
+
+        genre_field = getattr(view, "genre_field", None)
+        if genre_field and params.get("genre"):
+            ids = _parse_ids(params["genre"], "genre")
+            m2m = queryset.model._meta.get_field(genre_field)
+            links = m2m.remote_field.through.objects.filter(**{f"{m2m.m2m_reverse_name()}__in": ids})
+            queryset = queryset.filter(pk__in=links.values(m2m.m2m_column_name()))
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        parameters = []
+        for param in getattr(view, "range_filters", {}):
+            for suffix in ("min", "max"):
+                parameters.append({
+                    "name": f"{param}_{suffix}", "required": False, "in": "query",
+                    "schema": {"type": "string"},
+                })
+        for param in getattr(view, "id_filters", {}):
+            parameters.append({
+                "name": param, "required": False, "in": "query",
+                "description": "id через запятую", "schema": {"type": "string"},
+            })
+        if getattr(view, "genre_field", None):
+            parameters.append({
+                "name": "genre", "required": False, "in": "query",
+                "description": "id жанров через запятую", "schema": {"type": "string"},
+            })
+        if getattr(view, "ordering_fields", None):
+            parameters.append({
+                "name": "ordering", "required": False, "in": "query",
+                "schema": {"type": "string", "enum": [
+                    prefix + name for name in view.ordering_fields for prefix in ("", "-")
+                ]},
+            })
+        return parameters
+
+
+class KeysetOrderingMixin:
+    """
+    Сортировка ?ordering=title / -year для KeysetPagination.
+    ordering_fields сопоставляет значение параметра полю модели.
+    """
+    ordering_fields = {}
+    default_ordering = None
+
+    def get_keyset_ordering(self):
+        raw = self.request.query_params.get("ordering") or self.default_ordering
+        name = raw.lstrip("-")
+        if name not in self.ordering_fields:
+            raise ValidationError({"ordering": f"Допустимые значения: {', '.join(self.ordering_fields)}"})
+        return (("-" if raw.startswith("-") else "") + self.ordering_fields[name],)
@@ -0,0 +1,11 @@
+from django.db import models
+
+
+class CollectionVersion(models.Model):
+    """Номер версии коллекции API: растёт при любом изменении её данных (core/versions.py)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
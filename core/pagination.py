@@ -0,0 +1,170 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) пагинация.
+
+    Курсор хранит значения полей сортировки последней строки страницы,
+    следующая страница ищется условием WHERE по этим значениям, без OFFSET,
+    поэтому стоимость страницы не зависит от её номера.
+    Последним полем сортировки всегда идёт pk, чтобы курсор был однозначным.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering = ("-pk",)
+    invalid_cursor_message = "Некорректный курсор"
+
+    def __init__(self, ordering=None, page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+        self.next_cursor = None
+
+    # ---------- настройки ----------
+    def get_ordering(self, request, queryset, view):
+        if view is not None and hasattr(view, "get_keyset_ordering"):
+            ordering = tuple(view.get_keyset_ordering())
+        else:
+            ordering = self.ordering
+        if ordering[-1].lstrip("-") not in ("pk", queryset.model._meta.pk.name):
+            tie_breaker = "-pk" if ordering[0].startswith("-") else "pk"
+            ordering = ordering + (tie_breaker,)
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # ---------- курсор ----------
+    def encode_cursor(self, values):
+        raw = json.dumps(values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request, fields):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for field, value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _dump_value(value):
+        if value is None or isinstance(value, (int, float, str, bool)):
+            return value
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+    # ---------- запрос ----------
+    @staticmethod
+    def _resolve(model, ordering):
+        """[(имя поля, поле модели, по убыванию)] для каждого элемента сортировки"""
+        resolved = []
+        for item in ordering:
+            name = item.lstrip("-")
+            field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+            resolved.append((field.attname, field, item.startswith("-")))
+        return resolved
+
+    @staticmethod
+    def _order_by(resolved):
+        expressions = []
+        for name, field, descending in resolved:
+            if field.null:
+                # NULL всегда в конце, в любом направлении
+                expr = F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+                expressions.append(expr)
+            else:
+                expressions.append(f"-{name}" if descending else name)
+        return expressions
+
+    @staticmethod
+    def _seek_filter(resolved, values):
+        """(a после va) ИЛИ (a = va И (b после vb ИЛИ ...)) с учётом NULL в конце"""
+        condition = None
+        for (name, field, descending), value in reversed(list(zip(resolved, values))):
+            if value is None:
+                after = None
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+                if field.null:
+                    after |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            if condition is None:
+                condition = after if after is not None else Q(pk__in=[])
+            elif after is None:
+                condition = same & condition
+            else:
+                condition = after | (same & condition)
+
+        # Дублируем нестрогую границу по первому полю, чтобы SQLite искал по индексу
+        name, field, descending = resolved[0]
+        if values[0] is not None and not field.null:
+            condition &= Q(**{f"{name}__{'lte' if descending else 'gte'}": values[0]})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        resolved = self._resolve(queryset.model, self.get_ordering(request, queryset, view))
+
+        values = self.decode_cursor(request, [field for _, field, _ in resolved])
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(resolved, values))
+
+        rows = list(queryset.order_by(*self._order_by(resolved))[: page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = None
+        if len(rows) > page_size:
+            last = page[-1]
+            self.next_cursor = self.encode_cursor(
+                [self._dump_value(getattr(last, name)) for name, _, _ in resolved]
+            )
+        return page
+
+    # ---------- ответ ----------
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -27,6 +29,10 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# manage.py test: фоновые пулы выполняют задачи в потоке теста (тестовая база
+# в транзакции, из других потоков её строки не видны и таблицы заблокированы)
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Application definition
 
@@ -40,11 +46,15 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'drf_spectacular',
+    'core',
     'users.apps.UsersConfig',
     'movies',
     'reviews.apps.ReviewsConfig',
     'direct_messages.apps.DirectMessagesConfig',
     'news',
+    'search',
+    'imaging',
+    'feed.apps.FeedConfig',
     "rest_framework_simplejwt",
 ]
 
@@ -82,10 +92,13 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# IMMEDIATE: транзакция сразу берёт блокировку записи, и параллельные писатели
+# (фоновые пулы, кэш shared в базе) ждут её, а не падают с "database is locked"
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
@@ -130,6 +143,23 @@ STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Загрузки хранятся по хэшу содержимого, одинаковые файлы — один раз (imaging/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'imaging.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Ограничения загружаемых изображений, проверяются по заголовку (imaging/validators.py)
+IMAGE_UPLOAD = {
+    'MAX_BYTES': 2 * 1024 * 1024,
+    'MAX_SIDE': 8000,
+    'MAX_PIXELS': 40_000_000,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -142,10 +172,122 @@ AUTH_USER_MODEL = 'users.User'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.JWTAuthentication",
     ],
 }
 
+# Кэш. 'default' — локальный для процесса, в нём только то, что можно потерять и
+# пересобрать (готовые ответы). 'shared' — общий для всех веб-воркеров и команд
+# по расписанию: дельты лайков, журнал отзыва JWT, версии пользователей, готовность
+# вариантов изображений. В проде это Redis (REDIS_URL, нужен пакет redis, без
+# вытеснения ключей); без него — таблица shared_cache в базе, её создаёт
+# manage.py createcachetable (выполняется при старте в docker-compose.yml, см. README.md).
+# incr в DatabaseCache не атомарен, под нагрузкой нужен Redis.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'TIMEOUT': None,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10_000_000},
+    },
+}
+
+# Отзыв JWT (users/revocation.py): журнал отзывов в общем кэше CACHE
+JWT_REVOCATION = {
+    'CACHE': 'shared',
+    'SYNC_INTERVAL': 5,
+    'BLOOM_CAPACITY': 100_000,
+    'BLOOM_ERROR_RATE': 0.001,
+}
+
+# Кэш пользователей для JWT-аутентификации (users/user_cache.py), MAXSIZE=0 отключает
+AUTH_USER_CACHE = {
+    'CACHE': 'shared',
+    'MAXSIZE': 10_000,
+    'TTL': 300,
+    'REVALIDATE': 5,
+}
+
+# Счётчик лайков отзывов (reviews/like_counter.py): дельты копятся в общем кэше CACHE,
+# flush_review_likes переносит их в базу UPDATE'ами по FLUSH_BATCH отзывов
+REVIEW_LIKES = {
+    'CACHE': 'shared',
+    'FLUSH_BATCH': 1000,
+    'LOCK_TIMEOUT': 300,
+}
+
+# Пул хэширования паролей при входе/регистрации (users/auth_pool.py).
+# Когда WORKERS задач выполняются и MAX_QUEUE ждут, новые запросы получают 503.
+AUTH_HASH_POOL = {
+    'WORKERS': 4,
+    'MAX_QUEUE': 32,
+    'RETRY_AFTER': 1,
+}
+
+# Рейтинг фильмов (movies/ranking.py): байесовское среднее
+# (rating_sum + PRIOR_VOTES * среднее по каталогу) / (rating_count + PRIOR_VOTES),
+# в рейтинг попадают фильмы минимум с MIN_VOTES оценками
+MOVIE_RANKING = {
+    'PRIOR_VOTES': 10,
+    'MIN_VOTES': 1,
+}
+
+# Варианты изображений (imaging/variants.py): вписываются в SIZES без увеличения,
+# строятся в WORKERS потоках после загрузки (0 — в потоке запроса). Готовность
+# отмечается в кэше CACHE, ответ "не готово" процесс помнит NEGATIVE_TTL секунд.
+# FIELDS ("app.Model.field") по умолчанию — imaging.signals.DEFAULT_IMAGE_FIELDS
+IMAGE_VARIANTS = {
+    'SIZES': {'thumb': (160, 160), 'card': (480, 480), 'full': (1280, 1280)},
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'WORKERS': 2,
+    'CACHE': 'shared',
+    'NEGATIVE_TTL': 30,
+}
+
+# Рекомендации фильмов и сериалов (users/recommendations.py): вес сигнала по виду
+# объекта, оценка отзыва переводится в (rating - NEUTRAL_RATING) / 2. На объект
+# хранится NEIGHBOURS соседей; блок сходства в расчёте не больше CHUNK_CELLS ячеек
+RECOMMENDATIONS = {
+    'NEIGHBOURS': 30,
+    'WEIGHTS': {'movie': 1.0, 'series': 1.0, 'genre': 0.5},
+    'NEUTRAL_RATING': 3,
+    'CHUNK_CELLS': 4_000_000,
+}
+
+# Популярные отзывы (reviews/trending.py): события за WINDOW_DAYS дней с весами WEIGHTS
+# (отзыв весит rating * WEIGHTS['rating']) и затуханием вдвое за HALF_LIFE_HOURS.
+# В снимке SIZE отзывов, готовый ответ /trending/ живёт в общем кэше CACHE
+# CACHE_TIMEOUT секунд, команда refresh_review_trending сбрасывает его после пересборки
+REVIEW_TRENDING = {
+    'WINDOW_DAYS': 7,
+    'HALF_LIFE_HOURS': 24,
+    'WEIGHTS': {'like': 1.0, 'comment': 2.0, 'rating': 0.2},
+    'SIZE': 50,
+    'CACHE': 'shared',
+    'CACHE_TIMEOUT': 600,
+}
+
+# Ленты подписок (feed/fanout.py): события рассылаются подписчикам в WORKERS потоках
+# пачками по BATCH_SIZE строк. Аккаунты с FANOUT_LIMIT и более подписчиками не
+# рассылаются, их события читаются при открытии ленты. Новая подписка добавляет в
+# ленту BACKFILL последних событий автора; WORKERS=0 — рассылка в потоке запроса.
+# Неудавшиеся рассылки и дозаполнения досылает команда fanout_feed
+FEED = {
+    'WORKERS': 0 if TESTING else 1,
+    'FANOUT_LIMIT': 10_000,
+    'BATCH_SIZE': 1000,
+    'BACKFILL': 20,
+}
+
 
 
 SPECTACULAR_SETTINGS = {
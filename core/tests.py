@@ -0,0 +1,62 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from users.models import Genre, Movie
+
+
+class ConditionalGetTest(TestCase):
+    """Списки каталога отвечают 304 по ETag и Last-Modified, пока коллекция не изменилась"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.genre = Genre.objects.create(name="Драма")
+        self.movie = Movie.objects.create(title="Фильм", release_year=2000)
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_etag_and_last_modified_answer_304(self):
+        response = self.get("/api/genres/")
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        # только чтение версии коллекции, без выборки жанров
+        with self.assertNumQueries(1):
+            response = self.get("/api/genres/", if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.get("/api/genres/", if_modified_since=last_modified).status_code, 304)
+
+        # другой query string — другой ответ и другой ETag
+        self.assertNotEqual(self.get("/api/genres/?page_size=1")["ETag"], etag)
+
+        Genre.objects.create(name="Комедия")
+        response = self.get("/api/genres/", if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_nested_links_change_version(self):
+        etag = self.get("/api/movies/")["ETag"]
+        self.assertEqual(self.get("/api/movies/", if_none_match=etag).status_code, 304)
+        self.movie.genres.add(self.genre)
+        self.assertEqual(self.get("/api/movies/", if_none_match=etag).status_code, 200)
+
+        # переименование жанра меняет вложенные данные фильмов
+        etag = self.get("/api/movies/")["ETag"]
+        self.genre.name = "Триллер"
+        self.genre.save()
+        self.assertEqual(self.get("/api/movies/", if_none_match=etag).status_code, 200)
+
+    def test_changes_within_one_second_get_distinct_last_modified(self):
+        moment = datetime.datetime(2024, 1, 1, 12, 0, 0, 100, tzinfo=datetime.timezone.utc)
+        with mock.patch("django.utils.timezone.now", return_value=moment):
+            Genre.objects.create(name="Комедия")
+            last_modified = self.get("/api/genres/")["Last-Modified"]
+            Genre.objects.create(name="Триллер")
+        response = self.get("/api/genres/", if_modified_since=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["Last-Modified"], last_modified)
+        self.assertEqual(self.get("/api/genres/", if_modified_since=response["Last-Modified"]).status_code, 304)
@@ -38,6 +38,13 @@ urlpatterns = [
 
     path("api/", include("news.urls")),
 
+    # каталог приложения movies (/api/movies/ и /api/genres/ уже заняты приложением users)
+    path("api/catalog/", include("movies.urls")),
+
+    path("api/", include("search.urls")),
+
+    path("api/", include("feed.urls")),
+
 
 
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,125 @@
+"""
+Версии коллекций API для условных GET.
+
+Каждая коллекция (список фильмов, жанров, новостей...) хранит номер версии
+и время последнего изменения в CollectionVersion. Сохранение, удаление
+и изменение M2M-связей моделей, из которых собирается ответ, увеличивает
+версию; массовые операции без сигналов (bulk_create, update) вызывают
+bump() сами. ConditionalGetMixin строит по версии ETag и Last-Modified
+и отвечает 304 до выборки и сериализации данных.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import CollectionVersion
+
+# Коллекция -> модели, от которых зависит её ответ (вложенные жанры тоже)
+COLLECTIONS = {
+    "movies": ("users.Movie", "users.Genre"),
+    "series": ("users.Series", "users.Genre"),
+    "genres": ("users.Genre",),
+    "news": ("news.News",),
+    "catalog.movies": ("movies.Movie", "movies.Genre", "movies.Person"),
+    "catalog.genres": ("movies.Genre",),
+    "catalog.people": ("movies.Person",),
+    # рейтинг пересобирается массово, версию поднимает movies.ranking.refresh_ranking
+    "catalog.top": (),
+}
+
+
+def bump(*names):
+    """
+    Увеличивает версии коллекций names. Last-Modified идёт с точностью до
+    секунды, поэтому время изменения сдвигается минимум на секунду вперёд:
+    два изменения за одну секунду иначе дали бы одинаковый Last-Modified,
+    и клиент с If-Modified-Since получил бы 304 на устаревшую копию.
+    """
+    now = timezone.now().replace(microsecond=0)
+    names = set(names)
+    updated_at = Greatest(Value(now), F("updated_at") + timedelta(seconds=1))
+    updated = CollectionVersion.objects.filter(name__in=names).update(version=F("version") + 1, updated_at=updated_at)
+    if updated < len(names):
+        existing = set(CollectionVersion.objects.filter(name__in=names).values_list("name", flat=True))
+        for name in names - existing:
+            try:
+                with transaction.atomic():
+                    CollectionVersion.objects.create(name=name, version=1, updated_at=now)
+            except IntegrityError:
+                CollectionVersion.objects.filter(name=name).update(version=F("version") + 1, updated_at=updated_at)
+
+
+def current(name):
+    """(версия, время изменения) коллекции; (0, None), если она ещё не менялась"""
+    row = CollectionVersion.objects.filter(name=name).values_list("version", "updated_at").first()
+    return row or (0, None)
+
+
+def _collections_of(model):
+    label = model._meta.label
+    return [name for name, labels in COLLECTIONS.items() if label in labels]
+
+
+def model_changed(sender, **kwargs):
+    bump(*sender._version_collections)
+
+
+def links_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump(*sender._version_collections)
+
+
+def connect_collections():
+    models = {label for labels in COLLECTIONS.values() for label in labels}
+    for label in models:
+        model = apps.get_model(label)
+        model._version_collections = _collections_of(model)
+        uid = f"versions:{label}"
+        post_save.connect(model_changed, sender=model, dispatch_uid=uid)
+        post_delete.connect(model_changed, sender=model, dispatch_uid=uid)
+        for m2m in model._meta.local_many_to_many:
+            through = m2m.remote_field.through
+            through._version_collections = sorted(
+                set(getattr(through, "_version_collections", ())) | set(model._version_collections)
+            )
+            m2m_changed.connect(links_changed, sender=through, dispatch_uid=f"versions:{through._meta.label}")
+
+
+class ConditionalGetMixin:
+    """
+    Условный GET для list/retrieve: ETag из версии коллекции version_collection
+    и полного URL запроса, Last-Modified из времени изменения коллекции.
+    При совпадении If-None-Match / If-Modified-Since — 304 без обращения к данным.
+    """
+    version_collection = None
+
+    def conditional(self, handler, request, *args, collection=None, **kwargs):
+        collection = collection or self.version_collection
+        version, modified = current(collection)
+        # в ответе абсолютные URL, поэтому хост и query string входят в ETag
+        key = f"{collection}:{version}:{request.build_absolute_uri()}"
+        etag = quote_etag(hashlib.blake2b(key.encode(), digest_size=12).hexdigest())
+        last_modified = int(modified.timestamp()) if modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers["ETag"] = etag
+            if last_modified is not None:
+                response.headers["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,228 @@
+"""
+Ленты подписок.
+
+Новое событие (Activity) после коммита уходит в пул потоков, который
+рассылает его при записи: по строке FeedEntry каждому подписчику, пачками
+bulk_create. Лента читается одним диапазонным сканом по индексу
+(owner, created_at, activity).
+
+Аккаунты, у которых подписчиков не меньше FANOUT_LIMIT, не рассылаются:
+их события остаются с pushed=False, читатель забирает их при чтении по
+индексу (actor, created_at, id) и сливает со своей лентой
+(feed/pagination.py). На лету читаются и авторы, опустившиеся ниже порога,
+пока у них есть неразосланные события; команда fanout_feed --repush
+рассылает такие события, после чего автор читается только из FeedEntry.
+
+Подписка дозаполняет ленту последними BACKFILL событиями автора, отписка
+убирает его события из ленты. Если процесс упал до рассылки, событие
+остаётся с fanned_out=False, а подписка — в PendingBackfill (строка
+создаётся вместе с подпиской и удаляется после дозаполнения); и то и другое
+дошлёт команда fanout_feed.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from users.models import Follow, Profile
+from .models import Activity, FeedEntry, PendingBackfill
+
+logger = logging.getLogger(__name__)
+
+
+def _config():
+    config = getattr(settings, "FEED", {})
+    return {
+        "workers": config.get("WORKERS", 1),
+        "fanout_limit": config.get("FANOUT_LIMIT", 10_000),
+        "batch_size": config.get("BATCH_SIZE", 1000),
+        "backfill": config.get("BACKFILL", 20),
+    }
+
+
+def fanout_limit():
+    return _config()["fanout_limit"]
+
+
+def _entry(activity, owner_id):
+    return FeedEntry(owner_id=owner_id, activity=activity, actor_id=activity.actor_id, created_at=activity.created_at)
+
+
+def _push(activity, owner_ids, batch_size):
+    FeedEntry.objects.bulk_create(
+        [_entry(activity, owner_id) for owner_id in owner_ids], batch_size=batch_size, ignore_conflicts=True
+    )
+
+
+def _push_followers(activity, config):
+    followers = (
+        Follow.objects.filter(to_profile=activity.actor_id)
+        .order_by("from_profile_id")
+        .values_list("from_profile_id", flat=True)
+    )
+    pushed, batch = 0, []
+    for follower_id in followers.iterator(chunk_size=config["batch_size"]):
+        batch.append(follower_id)
+        if len(batch) >= config["batch_size"]:
+            _push(activity, batch, config["batch_size"])
+            pushed += len(batch)
+            batch = []
+    if batch:
+        _push(activity, batch, config["batch_size"])
+        pushed += len(batch)
+    return pushed
+
+
+def fanout(activity_id):
+    """Рассылает событие подписчикам автора, возвращает число строк ленты"""
+    config = _config()
+    activity = Activity.objects.filter(pk=activity_id, fanned_out=False).select_related("actor").first()
+    if activity is None:
+        return 0
+    if activity.actor.followers_count >= config["fanout_limit"]:
+        Activity.objects.filter(pk=activity_id).update(fanned_out=True)
+        return 0
+    pushed = _push_followers(activity, config)
+    Activity.objects.filter(pk=activity_id).update(fanned_out=True, pushed=True)
+    return pushed
+
+
+def repush():
+    """
+    Рассылает события, пропущенные, пока автор был крупным аккаунтом,
+    если сейчас он ниже порога. Возвращает (событий, строк ленты).
+    """
+    config = _config()
+    stale = (
+        Activity.objects.filter(fanned_out=True, pushed=False, actor__followers_count__lt=config["fanout_limit"])
+        .order_by("id")
+    )
+    activities = entries = 0
+    for activity in stale.iterator(chunk_size=config["batch_size"]):
+        entries += _push_followers(activity, config)
+        Activity.objects.filter(pk=activity.pk).update(pushed=True)
+        activities += 1
+    return activities, entries
+
+
+def backfill(follower_ids, followee_ids):
+    """
+    Последние события новых подписок в ленты подписчиков: BACKFILL событий
+    каждого автора одним запросом с ROW_NUMBER() по автору.
+    """
+    config = _config()
+    small = (
+        Profile.objects.filter(pk__in=set(followee_ids), followers_count__lt=config["fanout_limit"])
+        .values("pk")
+    )
+    recent = (
+        Activity.objects.filter(actor_id__in=small)
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=[F("actor_id")],
+            order_by=[F("created_at").desc(), F("id").desc()],
+        ))
+        .filter(position__lte=config["backfill"])
+        .only("id", "actor_id", "created_at")
+    )
+    by_actor = {}
+    for activity in recent:
+        by_actor.setdefault(activity.actor_id, []).append(activity)
+    entries = [
+        _entry(activity, follower_id)
+        for follower_id, followee_id in zip(follower_ids, followee_ids)
+        for activity in by_actor.get(followee_id, ())
+    ]
+    FeedEntry.objects.bulk_create(entries, batch_size=config["batch_size"], ignore_conflicts=True)
+    PendingBackfill.objects.filter(_pairs(follower_ids, followee_ids)).delete()
+
+
+def _pairs(follower_ids, followee_ids):
+    """Условие на пары (follower, followee), сгруппированные по стороне с меньшим числом значений"""
+    pairs = list(zip(follower_ids, followee_ids))
+    key, other = ("follower_id", "followee_id")
+    if len(set(followee_ids)) < len(set(follower_ids)):
+        key, other = other, key
+        pairs = [(b, a) for a, b in pairs]
+    groups = {}
+    for pk, other_pk in pairs:
+        groups.setdefault(pk, set()).add(other_pk)
+    condition = Q(pk__in=[])
+    for pk, others in groups.items():
+        condition |= Q(**{key: pk, f"{other}__in": others})
+    return condition
+
+
+def schedule_backfill(follower_ids, followee_ids):
+    """Запоминает новые подписки в транзакции подписки и после коммита дозаполняет ленты"""
+    PendingBackfill.objects.bulk_create(
+        [PendingBackfill(follower_id=a, followee_id=b) for a, b in zip(follower_ids, followee_ids)],
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(lambda: fanout_pool.submit(backfill, follower_ids, followee_ids))
+
+
+def backfill_pending():
+    """Дозаполняет ленты по подпискам, оставшимся в PendingBackfill; возвращает их число"""
+    config = _config()
+    pending = PendingBackfill.objects.order_by("id").values_list("follower_id", "followee_id")
+    done = 0
+    while True:
+        pairs = list(pending[: config["batch_size"]])
+        if not pairs:
+            return done
+        backfill([a for a, _ in pairs], [b for _, b in pairs])
+        done += len(pairs)
+
+
+def retract(follower_ids, followee_ids):
+    """Убирает события отписанных авторов из лент"""
+    by_followee = {}
+    for follower_id, followee_id in zip(follower_ids, followee_ids):
+        by_followee.setdefault(followee_id, []).append(follower_id)
+    for followee_id, owners in by_followee.items():
+        FeedEntry.objects.filter(actor_id=followee_id, owner_id__in=owners).delete()
+    PendingBackfill.objects.filter(_pairs(follower_ids, followee_ids)).delete()
+
+
+class FanoutPool:
+    """Потоки для рассылки; WORKERS=0 — выполнять сразу в вызывающем потоке"""
+
+    def __init__(self, workers=None):
+        self._workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        # читаем настройку при каждой отправке, чтобы её можно было переопределить в тестах
+        return self._workers if self._workers is not None else _config()["workers"]
+
+    @property
+    def executor(self):
+        # создаём лениво, чтобы management-команды и миграции не поднимали потоки
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="feed-fanout")
+            return self._executor
+
+    def submit(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        return self.executor.submit(self._run, func, *args)
+
+    def _run(self, func, *args):
+        try:
+            return func(*args)
+        except Exception:
+            logger.exception("Не удалось обновить ленты: %s%r", func.__name__, args)
+            raise
+        finally:
+            close_old_connections()
+
+
+fanout_pool = FanoutPool()
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from feed.fanout import backfill_pending, fanout, repush
+from feed.models import Activity, FeedEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Досылает события, не разосланные после коммита, и дозаполняет ленты по подпискам, "
+        "оставшимся в PendingBackfill (например, после падения процесса)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prune-days", type=int, help="Удалить строки лент старше указанного числа дней"
+        )
+        parser.add_argument(
+            "--repush", action="store_true",
+            help="Разослать события авторов, опустившихся ниже FANOUT_LIMIT, и перестать читать их на лету",
+        )
+
+    def handle(self, *args, **options):
+        pending = Activity.objects.filter(fanned_out=False).order_by("id").values_list("id", flat=True)
+        activities = entries = 0
+        for activity_id in pending.iterator():
+            entries += fanout(activity_id)
+            activities += 1
+        self.stdout.write(self.style.SUCCESS(f"Разослано событий: {activities}, строк лент: {entries}"))
+        self.stdout.write(self.style.SUCCESS(f"Дозаполнено лент по подпискам: {backfill_pending()}"))
+
+        if options["repush"]:
+            activities, entries = repush()
+            self.stdout.write(self.style.SUCCESS(f"Дослано событий: {activities}, строк лент: {entries}"))
+
+        if options["prune_days"]:
+            border = timezone.now() - timedelta(days=options["prune_days"])
+            deleted, _ = FeedEntry.objects.filter(created_at__lt=border).delete()
+            self.stdout.write(self.style.SUCCESS(f"Удалено строк лент: {deleted}"))
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('users', '0009_item_neighbours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(choices=[('review', 'Отзыв'), ('comment', 'Комментарий'), ('news', 'Новость')], max_length=16)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('summary', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fanned_out', models.BooleanField(default=False, editable=False)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='users.profile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='feed.activity')),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.profile')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='users.profile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['actor', 'created_at', 'id'], name='activity_actor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['id'], name='activity_pending_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activity',
+            unique_together={('verb', 'object_id')},
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['owner', 'created_at', 'activity'], name='feed_owner_created_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='feedentry',
+            unique_together={('owner', 'activity')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_pushed(apps, schema_editor):
+    # до этой миграции fanned_out ставился и для пропущенных событий: разосланными считаем те, что есть в лентах
+    Activity = apps.get_model('feed', 'Activity')
+    FeedEntry = apps.get_model('feed', 'FeedEntry')
+    Activity.objects.filter(fanned_out=True).filter(
+        Exists(FeedEntry.objects.filter(activity=OuterRef('pk')))
+    ).update(pushed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0001_initial'),
+        ('users', '0009_item_neighbours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='pushed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(condition=models.Q(('fanned_out', True), ('pushed', False)), fields=['actor'], name='activity_unpushed_idx'),
+        ),
+        migrations.RunPython(mark_pushed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0002_activity_pushed'),
+        ('users', '0009_item_neighbours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingBackfill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('followee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.profile')),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.profile')),
+            ],
+            options={
+                'unique_together': {('follower', 'followee')},
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import models
+from django.utils import timezone
+
+from users.models import Profile
+
+
+class Activity(models.Model):
+    """Событие профиля для лент подписчиков: отзыв, комментарий или новость"""
+
+    VERB_CHOICES = (
+        ("review", "Отзыв"),
+        ("comment", "Комментарий"),
+        ("news", "Новость"),
+    )
+
+    actor = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="activities")
+    verb = models.CharField(max_length=16, choices=VERB_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    # заголовок/отрывок на момент события, чтобы лента не ходила в исходные таблицы
+    summary = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    # рассылка обработана: разослано подписчикам или пропущено для крупного аккаунта, см. feed/fanout.py
+    fanned_out = models.BooleanField(default=False, editable=False)
+    # строки FeedEntry действительно созданы; иначе событие читается на лету
+    pushed = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        unique_together = ("verb", "object_id")
+        indexes = [
+            # события аккаунта для чтения на лету и дозаполнения ленты при подписке
+            models.Index(fields=["actor", "created_at", "id"], name="activity_actor_created_idx"),
+            models.Index(fields=["id"], condition=models.Q(fanned_out=False), name="activity_pending_idx"),
+            # авторы с неразосланными событиями читаются на лету, даже если уже ниже порога
+            models.Index(
+                fields=["actor"], condition=models.Q(fanned_out=True, pushed=False), name="activity_unpushed_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} {self.verb}:{self.object_id}"
+
+
+class FeedEntry(models.Model):
+    """Событие в ленте одного профиля (рассылка при записи)"""
+
+    owner = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="feed_entries")
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name="+")
+    # копии из Activity: сортировка ленты и чистка при отписке без JOIN
+    actor = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("owner", "activity")
+        indexes = [
+            models.Index(fields=["owner", "created_at", "activity"], name="feed_owner_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id}: {self.activity_id}"
+
+
+class PendingBackfill(models.Model):
+    """Новая подписка, по которой лента ещё не дозаполнена (см. feed/fanout.py)"""
+
+    follower = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="+")
+    followee = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("follower", "followee")
+
+    def __str__(self):
+        return f"{self.follower_id} -> {self.followee_id}"
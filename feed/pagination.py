@@ -0,0 +1,72 @@
+import heapq
+
+from django.db.models import Exists, OuterRef, Q
+
+from core.pagination import KeysetPagination
+from users.models import Follow
+from .fanout import fanout_limit
+from .models import Activity, FeedEntry
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Лента профиля: разосланные строки FeedEntry плюс события крупных аккаунтов.
+
+    Каждый источник читается одним диапазонным сканом по своему индексу
+    (page_size + 1 строк после курсора), потоки сливаются heapq.merge по
+    (created_at, id) события. Курсор общий — значения последнего события.
+    """
+
+    page_size = 20
+    max_page_size = 100
+    ordering = ("-created_at", "-pk")
+    entry_ordering = ("-created_at", "-activity")
+
+    def pull_sources(self, profile):
+        """
+        Подписки, которые читаются на лету: крупные аккаунты и авторы,
+        у которых остались неразосланные события (были выше порога)
+        """
+        unpushed = Activity.objects.filter(actor=OuterRef("to_profile"), fanned_out=True, pushed=False)
+        return list(
+            Follow.objects.filter(from_profile=profile)
+            .filter(Q(to_profile__followers_count__gte=fanout_limit()) | Exists(unpushed))
+            .values_list("to_profile_id", flat=True)
+        )
+
+    def paginate_feed(self, profile, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        resolved = self._resolve(Activity, self.ordering)
+        values = self.decode_cursor(request, [field for _, field, _ in resolved])
+
+        entry_resolved = self._resolve(FeedEntry, self.entry_ordering)
+        entries = FeedEntry.objects.filter(owner=profile)
+        if values is not None:
+            entries = entries.filter(self._seek_filter(entry_resolved, values))
+        entries = entries.select_related("activity__actor__user").order_by(*self._order_by(entry_resolved))
+        streams = [[entry.activity for entry in entries[: page_size + 1]]]
+
+        for actor_id in self.pull_sources(profile):
+            activities = Activity.objects.filter(actor_id=actor_id)
+            if values is not None:
+                activities = activities.filter(self._seek_filter(resolved, values))
+            activities = activities.select_related("actor__user").order_by(*self._order_by(resolved))
+            streams.append(list(activities[: page_size + 1]))
+
+        rows, seen = [], set()
+        # событие может прийти из обоих источников, если автор перешёл порог уже после рассылки
+        for activity in heapq.merge(*streams, key=lambda item: (item.created_at, item.pk), reverse=True):
+            if activity.pk in seen:
+                continue
+            seen.add(activity.pk)
+            rows.append(activity)
+            if len(rows) > page_size:
+                break
+
+        page = rows[:page_size]
+        self.next_cursor = None
+        if len(rows) > page_size:
+            last = page[-1]
+            self.next_cursor = self.encode_cursor([self._dump_value(last.created_at), last.pk])
+        return page
@@ -0,0 +1,13 @@
+from rest_framework import serializers
+
+from users.serializers import FriendSerializer
+from .models import Activity
+
+
+class ActivitySerializer(serializers.ModelSerializer):
+    """Событие ленты с кратким описанием объекта"""
+    actor = FriendSerializer(read_only=True)
+
+    class Meta:
+        model = Activity
+        fields = ["id", "actor", "verb", "object_id", "summary", "created_at"]
@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from news.models import News
+from reviews.models import Review, Comment
+from users.models import Profile, follows_updated
+from .fanout import fanout, fanout_pool, retract, schedule_backfill
+from .models import Activity
+
+EXCERPT_LENGTH = 140
+
+
+def record(verb, instance, user_id, summary):
+    """Создаёт событие и после коммита отдаёт его на рассылку"""
+    actor_id = Profile.objects.filter(user_id=user_id).values_list("pk", flat=True).first()
+    if actor_id is None:
+        return
+    activity, created = Activity.objects.get_or_create(
+        verb=verb,
+        object_id=instance.pk,
+        defaults={"actor_id": actor_id, "summary": summary, "created_at": instance.created_at},
+    )
+    if created:
+        transaction.on_commit(lambda: fanout_pool.submit(fanout, activity.pk))
+
+
+def forget(verb, instance):
+    # FeedEntry уходят каскадом
+    Activity.objects.filter(verb=verb, object_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Review)
+def review_activity(sender, instance, created, **kwargs):
+    if created:
+        record("review", instance, instance.author_id, {
+            "title": instance.title, "movie": instance.movie_id, "rating": instance.rating,
+        })
+
+
+@receiver(post_save, sender=Comment)
+def comment_activity(sender, instance, created, **kwargs):
+    if created:
+        record("comment", instance, instance.author_id, {
+            "review": instance.review_id, "excerpt": instance.content[:EXCERPT_LENGTH],
+        })
+
+
+@receiver(post_save, sender=News)
+def news_activity(sender, instance, created, **kwargs):
+    # в ленты попадают только опубликованные новости; снятие с публикации убирает событие
+    if instance.is_published:
+        record("news", instance, instance.author_id, {"title": instance.title})
+    elif not created:
+        forget("news", instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_activity_deleted(sender, instance, **kwargs):
+    forget("review", instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_activity_deleted(sender, instance, **kwargs):
+    forget("comment", instance)
+
+
+@receiver(post_delete, sender=News)
+def news_activity_deleted(sender, instance, **kwargs):
+    forget("news", instance)
+
+
+@receiver(follows_updated)
+def follows_updated_feed(sender, follower_ids, followee_ids, delta, **kwargs):
+    """Подписка дозаполняет ленту событиями автора, отписка их убирает"""
+    follower_ids, followee_ids = list(follower_ids), list(followee_ids)
+    if delta < 0:
+        retract(follower_ids, followee_ids)
+    else:
+        schedule_backfill(follower_ids, followee_ids)
@@ -0,0 +1,138 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from movies.models import Movie
+from news.models import News
+from reviews.models import Review, Comment
+from users.models import User
+from .fanout import backfill
+from .models import Activity, FeedEntry, PendingBackfill
+from .pagination import FeedPagination
+
+FEED = {"WORKERS": 0, "FANOUT_LIMIT": 3, "BATCH_SIZE": 2, "BACKFILL": 5}
+
+
+@override_settings(FEED=FEED)
+class FeedTest(TestCase):
+    """Рассылка при записи, чтение крупных аккаунтов на лету и общий курсор"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.movie = Movie.objects.create(title="Фильм")
+        self.reader, self.author, self.star = [
+            User.objects.create_user(email=f"{name}@example.com", username=name, password="pass")
+            for name in ("reader", "author", "star")
+        ]
+        self.client.force_authenticate(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.profile.follow_many([self.author.profile.pk, self.star.profile.pk])
+            # у star подписчиков не меньше FANOUT_LIMIT, его события не рассылаются
+            for i in range(3):
+                fan = User.objects.create_user(email=f"fan{i}@example.com", username=f"fan{i}", password="pass")
+                fan.profile.follow(self.star.profile)
+
+    def post(self, user, index):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Review.objects.create(
+                movie=self.movie, author=user, title=f"Отзыв {index}", content="Текст", rating=4
+            )
+
+    def feed(self, url="/api/feed/"):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_push_and_pull_merge(self):
+        reviews = [self.post(self.author if i % 2 else self.star, i) for i in range(6)]
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(review=reviews[0], author=self.author, content="Комментарий")
+            News.objects.create(author=self.star, title="Новость", content="Текст")
+            News.objects.create(author=self.star, title="Черновик", content="Текст", is_published=False)
+
+        self.assertEqual(FeedEntry.objects.filter(owner=self.reader.profile).count(), 4)
+        self.assertFalse(FeedEntry.objects.filter(actor=self.star.profile).exists())
+
+        items, url = [], "/api/feed/?page_size=3"
+        while url:
+            data = self.feed(url)
+            items.extend(data["results"])
+            url = data["next"] and data["next"].replace("http://testserver", "")
+        expected = list(
+            Activity.objects.order_by("-created_at", "-id").values_list("verb", "object_id")
+        )
+        self.assertEqual([(item["verb"], item["object_id"]) for item in items], expected)
+        self.assertEqual(len(expected), 8)
+        self.assertEqual(items[0]["summary"], {"title": "Новость"})
+
+    def test_follow_changes_rewrite_feed(self):
+        review = self.post(self.author, 0)
+        self.reader.profile.unfollow(self.author.profile)
+        self.assertEqual(self.feed()["results"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.profile.follow(self.author.profile)
+        self.assertEqual([item["object_id"] for item in self.feed()["results"]], [review.pk])
+
+        review.delete()
+        self.assertEqual(self.feed()["results"], [])
+
+    def test_backfill_reads_all_followees_in_one_query(self):
+        authors = [
+            User.objects.create_user(email=f"writer{i}@example.com", username=f"writer{i}", password="pass").profile
+            for i in range(3)
+        ]
+        expected = set()
+        for author in authors:
+            reviews = [self.post(author.user, i) for i in range(7)]
+            expected.update(review.pk for review in reviews[-FEED["BACKFILL"]:])
+        owner = User.objects.create_user(email="owner@example.com", username="owner", password="pass").profile
+
+        with CaptureQueriesContext(connection) as queries:
+            backfill([owner.pk] * len(authors), [author.pk for author in authors])
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("SELECT")]), 1)
+        entries = FeedEntry.objects.filter(owner=owner).values_list("activity__object_id", flat=True)
+        self.assertEqual(set(entries), expected)
+
+    def test_lost_backfill_is_recovered_by_command(self):
+        review = self.post(self.author, 0)
+        self.reader.profile.unfollow(self.author.profile)
+        # процесс упал до дозаполнения: колбэк после коммита не выполнился
+        with self.captureOnCommitCallbacks(execute=False):
+            self.reader.profile.follow(self.author.profile)
+        self.assertEqual(self.feed()["results"], [])
+        self.assertTrue(PendingBackfill.objects.filter(follower=self.reader.profile).exists())
+
+        call_command("fanout_feed", stdout=io.StringIO())
+        self.assertEqual([item["object_id"] for item in self.feed()["results"]], [review.pk])
+        self.assertFalse(PendingBackfill.objects.exists())
+
+        # отписка убирает и недозаполненную подписку
+        with self.captureOnCommitCallbacks(execute=False):
+            self.reader.profile.unfollow(self.author.profile)
+            self.reader.profile.follow(self.author.profile)
+            self.reader.profile.unfollow(self.author.profile)
+        self.assertFalse(PendingBackfill.objects.exists())
+
+    def test_actor_below_limit_keeps_skipped_activities(self):
+        review = self.post(self.star, 0)
+        self.assertFalse(FeedEntry.objects.filter(activity__object_id=review.pk).exists())
+        # star опустился ниже порога: пропущенное событие всё ещё читается на лету
+        for fan in User.objects.filter(username__startswith="fan"):
+            fan.profile.unfollow(self.star.profile)
+        self.assertEqual([item["object_id"] for item in self.feed()["results"]], [review.pk])
+
+        call_command("fanout_feed", "--repush", stdout=io.StringIO())
+        self.assertTrue(FeedEntry.objects.filter(owner=self.reader.profile, activity__object_id=review.pk).exists())
+        self.assertEqual(FeedPagination().pull_sources(self.reader.profile), [])
+        self.assertEqual([item["object_id"] for item in self.feed()["results"]], [review.pk])
+
+    def test_feed_requires_auth(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/api/feed/").status_code, 401)
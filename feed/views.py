@@ -0,0 +1,21 @@
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from .pagination import FeedPagination
+from .serializers import ActivitySerializer
+
+
+class FeedView(APIView):
+    """
+    GET /api/feed/?page_size=20&cursor=...
+    Отзывы, комментарии и новости профилей, на которые подписан пользователь, от новых к старым.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedPagination
+    serializer_class = ActivitySerializer
+
+    def get(self, request):
+        paginator = self.pagination_class()
+        page = paginator.paginate_feed(request.user.profile, request)
+        serializer = self.serializer_class(page, many=True, context={"request": request})
+        return paginator.get_paginated_response(serializer.data)
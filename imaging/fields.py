@@ -0,0 +1,81 @@
+from django.db import models
+from rest_framework import serializers
+
+from .variants import prefetch_ready, variant_urls
+
+
+def _loaded(value):
+    """Объекты связи без новых запросов; None, если связь не загружена заранее"""
+    if isinstance(value, models.Manager):
+        value = value.all()
+    if getattr(value, "_result_cache", []) is None:
+        return None
+    return list(value)
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Карта URL вариантов изображения для поля source:
+    {"original": ..., "thumb": {"webp": ..., "jpeg": ...}, "card": ..., "full": ...}.
+    Пока варианты не построены, все URL указывают на оригинал.
+    Готовность вариантов всех объектов ответа читается одним запросом к кэшу
+    при первом обращении к полю (prefetch_ready), а не по строке.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def _steps(self):
+        """[(source_attrs, many)] от корневого сериализатора до поля и признак списка в корне"""
+        steps, node, many = [], self, False
+        while node.parent is not None:
+            if isinstance(node.parent, serializers.ListSerializer):
+                node, many = node.parent, True
+                continue
+            steps.append((node.source_attrs, many))
+            node, many = node.parent, False
+        steps.reverse()
+        return steps, many
+
+    def _files(self):
+        steps, root_many = self._steps()
+        objects = _loaded(self.root.instance) if root_many else [self.root.instance]
+        for attrs, many in steps:
+            found = []
+            for value in objects or ():
+                for attr in attrs:
+                    value = getattr(value, attr, None)
+                    if value is None:
+                        break
+                else:
+                    if not many:
+                        found.append(value)
+                        continue
+                    related = _loaded(value)
+                    if related is None:
+                        return []
+                    found.extend(related)
+            objects = found
+        return objects or []
+
+    def _prefetch_page(self):
+        prefetched = self.root.__dict__.setdefault("_image_variants_prefetched", set())
+        if id(self) in prefetched:
+            return
+        prefetched.add(id(self))
+        prefetch_ready([file.name for file in self._files() if file])
+
+    def to_representation(self, file):
+        if not file:
+            return None
+        self._prefetch_page()
+        urls = variant_urls(file.name, file.storage)
+        request = self.context.get("request")
+        if request is None:
+            return urls
+        return {
+            key: request.build_absolute_uri(value) if isinstance(value, str)
+            else {fmt: request.build_absolute_uri(url) for fmt, url in value.items()}
+            for key, value in urls.items()
+        }
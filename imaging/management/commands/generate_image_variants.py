@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from imaging.signals import image_fields, variants_generated
+from imaging.variants import detect_ready, generate, variants_ready
+
+
+class Command(BaseCommand):
+    help = "Строит варианты (thumb/card/full) для уже загруженных изображений"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Перестроить и готовые варианты")
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--detect", action="store_true",
+            help="Сначала отметить готовыми варианты, уже лежащие на диске",
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field in image_fields():
+            names.update(
+                model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+                .values_list(field, flat=True)
+            )
+        if options["detect"] and not options["force"]:
+            names = {name for name in names if not detect_ready(name)}
+        if not options["force"]:
+            names = {name for name in names if not variants_ready(name)}
+
+        started = time.monotonic()
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = {pool.submit(generate, name): name for name in sorted(names)}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{name}: {exc}")
+                    continue
+                done += 1
+                variants_generated.send(sender=self.__class__, name=name)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {done}, ошибок: {failed}, время: {elapsed:.1f} с"
+        ))
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from imaging.models import StoredBlob
+from imaging.signals import image_fields
+from imaging.storage import PREFIX, delete_unreferenced
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает ссылки на файлы ContentAddressedStorage по полям моделей "
+        "и удаляет файлы без ссылок"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes", type=int, default=60,
+            help="Не трогать файлы моложе: их модель может ещё сохраняться",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        counts = {}
+        for model, field in image_fields():
+            rows = (
+                model._base_manager.filter(**{f"{field}__startswith": PREFIX})
+                .values(field).annotate(total=Count("pk")).values_list(field, "total")
+            )
+            for name, total in rows:
+                counts[name] = counts.get(name, 0) + total
+
+        fixed = 0
+        cutoff = timezone.now() - timedelta(minutes=options["grace_minutes"])
+        orphans = []
+        for blob in StoredBlob.objects.iterator():
+            actual = counts.get(blob.name, 0)
+            if actual == 0 and blob.created_at < cutoff:
+                orphans.append(blob.name)
+            elif actual != blob.refcount:
+                fixed += 1
+                if not options["dry_run"]:
+                    StoredBlob.objects.filter(name=blob.name).update(refcount=actual)
+
+        if not options["dry_run"]:
+            with transaction.atomic():
+                StoredBlob.objects.filter(name__in=orphans).delete()
+                for name in orphans:
+                    transaction.on_commit(lambda name=name: delete_unreferenced(name))
+
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Исправлено счётчиков: {fixed}, удалено файлов без ссылок: {len(orphans)}"
+        ))
@@ -0,0 +1,12 @@
+from django.db import models
+
+
+class StoredBlob(models.Model):
+    """Файл в ContentAddressedStorage и число ссылок на него из полей моделей"""
+    name = models.CharField(max_length=255, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
@@ -0,0 +1,89 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from core.versions import bump
+
+from .storage import acquire, is_content_addressed, release
+from .variants import schedule, variants_ready
+
+# Отправляется из потока пула, когда все варианты изображения name сохранены
+variants_generated = Signal()
+
+DEFAULT_IMAGE_FIELDS = (
+    "users.Profile.avatar",
+    "users.Movie.poster",
+    "users.Series.poster",
+    "movies.Movie.poster_image",
+    "movies.Person.photo",
+    "news.News.image",
+)
+
+
+def image_fields():
+    """[(модель, имя поля)] изображений, для которых строятся варианты и считаются ссылки"""
+    config = getattr(settings, "IMAGE_VARIANTS", {})
+    result = []
+    for path in config.get("FIELDS", DEFAULT_IMAGE_FIELDS):
+        label, field = path.rsplit(".", 1)
+        result.append((apps.get_model(label), field))
+    return result
+
+
+def _names(instance, fields):
+    return {field: getattr(instance, field).name or "" for field in fields}
+
+
+def remember_image_names(sender, instance, raw=False, **kwargs):
+    """Имена файлов до сохранения, чтобы снять ссылки с заменённых"""
+    instance._image_names_before = {}
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    before = sender._base_manager.filter(pk=instance.pk).values(*sender._image_fields).first()
+    instance._image_names_before = before or {}
+
+
+def image_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_image_names_before", {})
+    for field, name in _names(instance, sender._image_fields).items():
+        old = before.get(field) or ""
+        if name != old:
+            storage = getattr(instance, field).storage
+            if is_content_addressed(name):
+                transaction.on_commit(lambda name=name: acquire(name))
+            if is_content_addressed(old):
+                transaction.on_commit(lambda old=old, storage=storage: release(old, storage))
+        if name and not variants_ready(name):
+            schedule(name)
+    instance._image_names_before = _names(instance, sender._image_fields)
+
+
+def image_deleted(sender, instance, **kwargs):
+    for field, name in _names(instance, sender._image_fields).items():
+        if is_content_addressed(name):
+            storage = getattr(instance, field).storage
+            transaction.on_commit(lambda name=name, storage=storage: release(name, storage))
+
+
+def connect_image_fields():
+    for model, field in image_fields():
+        model._image_fields = getattr(model, "_image_fields", ()) + (field,)
+        uid = f"imaging:{model._meta.label}"
+        pre_save.connect(remember_image_names, sender=model, dispatch_uid=uid)
+        post_save.connect(image_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(image_deleted, sender=model, dispatch_uid=uid)
+
+
+@receiver(variants_generated)
+def refresh_collection_versions(sender, name, **kwargs):
+    """Ответы с этим изображением теперь содержат URL вариантов вместо оригинала"""
+    collections = set()
+    for model, field in image_fields():
+        if model._base_manager.filter(**{field: name}).exists():
+            collections.update(getattr(model, "_version_collections", ()))
+    if collections:
+        bump(*collections)
@@ -0,0 +1,129 @@
+"""
+Хранилище медиа с адресацией по содержимому.
+
+Имя файла — sha256 его байт (cas/ab/cd/<sha256>.<расширение>), хэш
+считается потоково по chunks(), файл в память целиком не читается.
+Одинаковые загрузки (тот же постер от разных админов) ложатся в один
+файл. StoredBlob.refcount — число полей моделей, ссылающихся на файл:
+его ведут только сигналы imaging.signals (acquire при сохранении нового
+имени, release при замене и удалении), файл удаляется вместе с последней
+ссылкой. Поэтому storage.delete() для таких имён ничего не делает:
+FieldFile.delete(save=True) снимет ссылку сохранением модели.
+Файл пишется во временный и переносится os.replace, так что две
+одновременные одинаковые загрузки просто записывают одно и то же.
+Загрузки, на которые так никто и не сослался, убирает команда
+recount_media_refs.
+
+Файлы со старыми именами (до включения хранилища) обслуживаются как
+в FileSystemStorage и в подсчёте не участвуют.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredBlob
+from .variants import delete_variants
+
+PREFIX = "cas/"
+
+
+def is_content_addressed(name):
+    return bool(name) and name.startswith(PREFIX)
+
+
+def acquire(name):
+    """Добавляет ссылку на файл"""
+    StoredBlob.objects.filter(name=name).update(refcount=F("refcount") + 1)
+
+
+def release(name, storage=None):
+    """Убирает ссылку; последняя ссылка удаляет и файл (после коммита)"""
+    storage = storage or default_storage
+    with transaction.atomic():
+        if StoredBlob.objects.filter(name=name, refcount__gt=1).update(refcount=F("refcount") - 1):
+            return
+        deleted, _ = StoredBlob.objects.filter(name=name).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_unreferenced(name, storage))
+
+
+def delete_unreferenced(name, storage=None):
+    """Удаляет файл, если на него нет строки StoredBlob"""
+    # файл могли загрузить заново между удалением строки и коммитом
+    if not StoredBlob.objects.filter(name=name).exists():
+        (storage or default_storage).delete_file(name)
+        delete_variants(name)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    @staticmethod
+    def hashed_name(digest, original_name):
+        ext = os.path.splitext(original_name)[1].lower()
+        return f"{PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        hasher = hashlib.sha256()
+        size = 0
+        content.seek(0)
+        for chunk in content.chunks():
+            hasher.update(chunk)
+            size += len(chunk)
+        name = self.hashed_name(hasher.hexdigest(), name)
+        content.seek(0)
+
+        try:
+            with transaction.atomic():
+                # ссылок пока нет: их добавит сохранение модели с этим именем
+                StoredBlob.objects.create(name=name, size=size)
+        except IntegrityError:
+            pass
+        if not self.exists(name):
+            self._save(name, content)
+        return name
+
+    def _save(self, name, content):
+        if not is_content_addressed(name):
+            return super()._save(name, content)
+        # одинаковое содержимое = одинаковое имя: пишем рядом и атомарно подменяем,
+        # параллельная загрузка того же файла перезапишет его теми же байтами
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                for chunk in content.chunks():
+                    fh.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # одинаковое содержимое = одинаковое имя, переименовывать не нужно
+        if is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def delete(self, name):
+        """Файлы по содержимому удаляет release() с последней ссылкой, см. imaging.signals"""
+        if not is_content_addressed(name):
+            super().delete(name)
+
+    def delete_file(self, name):
+        super().delete(name)
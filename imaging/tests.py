@@ -0,0 +1,156 @@
+import io
+import shutil
+import tempfile
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from users.models import Movie, User
+from .models import StoredBlob
+from .validators import validate_image_header
+from . import variants
+from .variants import variant_name, variant_storage, variants_ready
+
+
+def png(color, size=(8, 8)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class MediaTestCase(TestCase):
+    """Медиа во временном каталоге, варианты строятся сразу в потоке теста"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=self.media_root,
+            IMAGE_VARIANTS={"SIZES": {"thumb": (4, 4)}, "FORMATS": ("jpeg",), "WORKERS": 0},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class ContentAddressedStorageTest(MediaTestCase):
+    """Одинаковые загрузки — один файл, ссылки считают только сигналы моделей"""
+
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = [
+            User.objects.create_user(email=f"user{i}@example.com", username=f"user{i}", password="pass").profile
+            for i in range(2)
+        ]
+
+    def upload(self, profile, data, filename="avatar.png"):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.avatar.save(filename, ContentFile(data))
+        return profile.avatar.name
+
+    def refcount(self, name):
+        return StoredBlob.objects.filter(name=name).values_list("refcount", flat=True).first()
+
+    def test_identical_uploads_share_one_blob(self):
+        name = self.upload(self.first, png("red"))
+        self.assertEqual(self.upload(self.second, png("red"), "other.PNG"), name)
+        self.assertTrue(name.startswith("cas/"))
+        self.assertEqual(self.refcount(name), 2)
+        self.assertTrue(variants_ready(name))
+        self.assertTrue(variant_storage.exists(variant_name(name, "thumb", "jpeg")))
+
+    def test_replace_and_delete_release_once(self):
+        shared = self.upload(self.first, png("red"))
+        self.upload(self.second, png("red"))
+
+        # FieldFile.delete(save=True): ссылку снимает сохранение модели, и только одну
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.avatar.delete(save=True)
+        self.assertEqual(self.refcount(shared), 1)
+        self.assertTrue(default_storage.exists(shared))
+
+        # замена снимает последнюю ссылку на старый файл
+        replacement = self.upload(self.second, png("blue"))
+        self.assertIsNone(self.refcount(shared))
+        self.assertFalse(default_storage.exists(shared))
+        self.assertFalse(variant_storage.exists(variant_name(shared, "thumb", "jpeg")))
+        self.assertEqual(self.refcount(replacement), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        self.assertIsNone(self.refcount(replacement))
+        self.assertFalse(default_storage.exists(replacement))
+
+    def test_saving_existing_content_does_not_rename(self):
+        data = png("green")
+        name = default_storage.save("a.png", ContentFile(data))
+        # файл уже на диске (параллельная загрузка того же содержимого)
+        self.assertEqual(default_storage._save(name, ContentFile(data)), name)
+        self.assertEqual(default_storage.save("b.png", ContentFile(data)), name)
+        with default_storage.open(name) as fh:
+            self.assertEqual(fh.read(), data)
+
+
+class VariantReadinessBatchTest(MediaTestCase):
+    """Готовность вариантов для страницы списка — один запрос к общему кэшу на поле, а не на строку"""
+
+    def add_profile(self, index):
+        profile = User.objects.create_user(
+            email=f"user{index}@example.com", username=f"user{index}", password="pass"
+        ).profile
+        movie = Movie.objects.create(title=f"Фильм {index}", release_year=2000)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.avatar.save("avatar.png", ContentFile(png((index * 40, 0, 0))))
+            movie.poster.save("poster.png", ContentFile(png((0, index * 40, 0))))
+        profile.favorite_movies.add(movie)
+
+    def cache_reads(self):
+        with variants._ready_lock:
+            variants._ready.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get("/api/profiles/")
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        for item in data["results"] if isinstance(data, dict) else data:
+            self.assertIn("/variants/", item["avatar_variants"]["thumb"]["jpeg"])
+            self.assertIn("/variants/", item["favorite_movies"][0]["poster_variants"]["thumb"]["jpeg"])
+        return len([query for query in queries if "shared_cache" in query["sql"]])
+
+    def test_one_cache_read_per_field(self):
+        for index in range(2):
+            self.add_profile(index)
+        self.assertEqual(self.cache_reads(), 2)
+        for index in range(2, 5):
+            self.add_profile(index)
+        self.assertEqual(self.cache_reads(), 2)
+
+
+class ImageHeaderTest(TestCase):
+    """Размеры читаются из заголовка, обрезанные и чужие файлы — ошибка проверки, а не 500"""
+
+    def check(self, data, name="image.png"):
+        validate_image_header(SimpleUploadedFile(name, data))
+
+    def test_reads_sizes_from_header(self):
+        self.check(png("red", (20, 10)))
+        with self.assertRaisesMessage(ValidationError, "9000x10"):
+            self.check(png("red", (9000, 10)))
+
+    def test_truncated_headers_are_rejected(self):
+        data = png("red")
+        cases = {
+            "png": data[:20],
+            "gif": b"GIF89a\x01\x00",
+            "jpeg": b"\xff\xd8\xff\xc0\x00",
+            "text": b"not an image",
+        }
+        for label, payload in cases.items():
+            with self.subTest(label):
+                with self.assertRaises(ValidationError):
+                    self.check(payload)
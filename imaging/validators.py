@@ -0,0 +1,101 @@
+"""
+Проверка загружаемых изображений по заголовку.
+
+Формат и размеры в пикселях читаются из первых байт файла: PNG — чанк IHDR,
+GIF — Logical Screen Descriptor, JPEG — маркер SOFn (сегменты до него
+пропускаются seek'ом, их содержимое не читается). Пиксели не
+декодируются, поэтому "бомба" 30000x30000 в 50 КБ отклоняется до того,
+как кто-либо попробует её распаковать.
+"""
+import struct
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+# Маркеры SOFn, в которых лежат размеры кадра (кроме DHT/JPG/DAC)
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Маркеры без длины сегмента
+JPEG_STANDALONE = {0x01, *range(0xD0, 0xD8)}
+
+
+class HeaderError(ValueError):
+    """Заголовок не похож на изображение поддерживаемого формата"""
+
+
+def _read(fh, size):
+    data = fh.read(size)
+    if len(data) != size:
+        raise HeaderError("Файл обрывается в заголовке")
+    return data
+
+
+def _jpeg_size(fh):
+    while True:
+        marker = _read(fh, 2)
+        if marker[0] != 0xFF:
+            raise HeaderError("Повреждённая структура JPEG")
+        code = marker[1]
+        while code == 0xFF:  # заполняющие байты
+            code = _read(fh, 1)[0]
+        if code in JPEG_STANDALONE:
+            continue
+        if code in (0xD9, 0xDA):
+            raise HeaderError("В JPEG нет кадра с размерами")
+        (length,) = struct.unpack(">H", _read(fh, 2))
+        if length < 2:
+            raise HeaderError("Повреждённая структура JPEG")
+        if code in JPEG_SOF:
+            height, width = struct.unpack(">xHH", _read(fh, 5))
+            return width, height
+        fh.seek(length - 2, 1)
+
+
+def read_header(fh):
+    """(формат, ширина, высота) по первым байтам файла"""
+    head = fh.read(26)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+        if len(head) < 24:
+            raise HeaderError("Файл обрывается в заголовке")
+        width, height = struct.unpack(">II", head[16:24])
+        return "PNG", width, height
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        if len(head) < 10:
+            raise HeaderError("Файл обрывается в заголовке")
+        width, height = struct.unpack("<HH", head[6:10])
+        return "GIF", width, height
+    if head[:2] == b"\xff\xd8":
+        fh.seek(2)
+        return ("JPEG", *_jpeg_size(fh))
+    raise HeaderError("Неизвестный формат")
+
+
+def validate_image_header(image):
+    """
+    Формат (JPEG/PNG/GIF), размер файла и размеры в пикселях
+    по IMAGE_UPLOAD без декодирования изображения.
+    """
+    if not image:
+        return
+    config = getattr(settings, "IMAGE_UPLOAD", {})
+    max_bytes = config.get("MAX_BYTES", 2 * 1024 * 1024)
+    if image.size > max_bytes:
+        raise ValidationError(f"Размер изображения не должен превышать {max_bytes // (1024 * 1024)}MB")
+
+    position = image.tell() if hasattr(image, "tell") else 0
+    try:
+        image.seek(0)
+        fmt, width, height = read_header(image)
+    except HeaderError:
+        raise ValidationError("Поддерживаются только JPEG, JPG, PNG, GIF")
+    finally:
+        image.seek(position)
+
+    max_side = config.get("MAX_SIDE", 8000)
+    max_pixels = config.get("MAX_PIXELS", 40_000_000)
+    if not width or not height:
+        raise ValidationError("Некорректный размер изображения")
+    if width > max_side or height > max_side or width * height > max_pixels:
+        raise ValidationError(
+            f"Изображение {width}x{height} слишком большое: не больше {max_side} px по стороне "
+            f"и {max_pixels // 1_000_000} Мп всего"
+        )
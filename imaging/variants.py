@@ -0,0 +1,258 @@
+"""
+Уменьшенные варианты загруженных изображений (thumb/card/full в WebP и JPEG).
+
+Оригинал (до 2 МБ) декодируется один раз: для JPEG draft() просит декодер
+сразу отдать картинку в 1/2–1/8 размера, дальше thumbnail() с reducing_gap
+сначала уменьшает целочисленным reduce() и только остаток доводит LANCZOS.
+Варианты строятся каскадом от большего к меньшему. Файлы лежат рядом с
+медиа: variants/<имя оригинала без расширения>/<вариант>.<формат>, так что
+URL вычисляются по имени без обращения к БД. Генерация идёт в пуле потоков
+после коммита, до её окончания сериализаторы отдают URL оригинала.
+
+Готовность отмечается в общем кэше, когда generate() записала все файлы;
+чтение диск не проверяет. Ответы кэша помнятся в процессе: "готово" —
+до вытеснения из LRU, "не готово" — NEGATIVE_TTL секунд. Для списка
+prefetch_ready читает готовность всех изображений страницы одним get_many.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "variants"
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+READY_CACHE_SIZE = 10_000
+READY_KEY = "imaging:variants:ready:"
+
+# Варианты пишутся в обычное файловое хранилище под MEDIA_ROOT: их имена
+# фиксированы, а default_storage может переименовывать файлы по содержимому
+variant_storage = FileSystemStorage()
+
+
+def _config():
+    config = getattr(settings, "IMAGE_VARIANTS", {})
+    sizes = config.get("SIZES", {"thumb": (160, 160), "card": (480, 480), "full": (1280, 1280)})
+    # от большего к меньшему: каждый следующий вариант строится из предыдущего
+    sizes = dict(sorted(sizes.items(), key=lambda item: item[1][0] * item[1][1], reverse=True))
+    return sizes, tuple(config.get("FORMATS", ("webp", "jpeg"))), config.get("QUALITY", 80)
+
+
+def variant_name(name, variant, fmt):
+    stem = os.path.splitext(name)[0]
+    return f"{PREFIX}/{stem}/{variant}.{EXTENSIONS[fmt]}"
+
+
+# ---------- готовность ----------
+# имя -> True (готово) или время, до которого верим ответу "не готово"
+_ready = OrderedDict()
+_ready_lock = threading.Lock()
+
+
+def _ready_cache():
+    return caches[getattr(settings, "IMAGE_VARIANTS", {}).get("CACHE", "shared")]
+
+
+def _ready_key(name):
+    return READY_KEY + hashlib.blake2b(name.encode(), digest_size=16).hexdigest()
+
+
+def _remember(name, state):
+    with _ready_lock:
+        _ready[name] = state
+        _ready.move_to_end(name)
+        while len(_ready) > READY_CACHE_SIZE:
+            _ready.popitem(last=False)
+
+
+def _known(name, now):
+    """True/False, если ответ помнится в процессе, иначе None; вызывать под _ready_lock"""
+    state = _ready.get(name)
+    if state is True:
+        _ready.move_to_end(name)
+        return True
+    if state is not None and state > now:
+        return False
+    return None
+
+
+def prefetch_ready(names):
+    """Готовность сразу для многих имён: неизвестные процессу читаются одним get_many"""
+    now = time.monotonic()
+    with _ready_lock:
+        keys = {_ready_key(name): name for name in set(names) if _known(name, now) is None}
+    if not keys:
+        return
+    found = _ready_cache().get_many(list(keys))
+    ttl = getattr(settings, "IMAGE_VARIANTS", {}).get("NEGATIVE_TTL", 30)
+    for key, name in keys.items():
+        _remember(name, True if found.get(key) else now + ttl)
+
+
+def variants_ready(name):
+    now = time.monotonic()
+    with _ready_lock:
+        known = _known(name, now)
+    if known is not None:
+        return known
+    ready = bool(_ready_cache().get(_ready_key(name)))
+    ttl = getattr(settings, "IMAGE_VARIANTS", {}).get("NEGATIVE_TTL", 30)
+    _remember(name, True if ready else now + ttl)
+    return ready
+
+
+def mark_ready(name):
+    _ready_cache().set(_ready_key(name), True, None)
+    _remember(name, True)
+
+
+def detect_ready(name):
+    """Отмечает варианты, уже лежащие на диске (построенные до отметок в кэше)"""
+    sizes, formats, _ = _config()
+    if not variant_storage.exists(variant_name(name, list(sizes)[-1], formats[-1])):
+        return False
+    mark_ready(name)
+    return True
+
+
+def variant_urls(name, storage=None):
+    """{"original": url, "<вариант>": {"<формат>": url}}; до генерации везде URL оригинала"""
+    sizes, formats, _ = _config()
+    original = (storage or default_storage).url(name)
+    ready = variants_ready(name)
+    urls = {"original": original}
+    for variant in sizes:
+        urls[variant] = {
+            fmt: variant_storage.url(variant_name(name, variant, fmt)) if ready else original for fmt in formats
+        }
+    return urls
+
+
+# ---------- генерация ----------
+def _prepare(image):
+    if image.mode in ("RGB", "RGBA"):
+        return image
+    has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def _encode(image, fmt, quality):
+    buffer = io.BytesIO()
+    if fmt == "jpeg":
+        if image.mode == "RGBA":
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def generate(name, storage=None):
+    """Строит и сохраняет все варианты изображения name из хранилища storage"""
+    sizes, formats, quality = _config()
+    with (storage or default_storage).open(name, "rb") as fh:
+        image = Image.open(fh)
+        image.draft("RGB", next(iter(sizes.values())))
+        image = _prepare(ImageOps.exif_transpose(image))
+
+    for variant, size in sizes.items():
+        image = image.copy()
+        image.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        for fmt in formats:
+            path = variant_name(name, variant, fmt)
+            # имена вариантов фиксированы, поэтому старый файл сначала удаляем
+            variant_storage.delete(path)
+            variant_storage.save(path, ContentFile(_encode(image, fmt, quality)))
+    mark_ready(name)
+
+
+def delete_variants(name):
+    sizes, formats, _ = _config()
+    _ready_cache().delete(_ready_key(name))
+    with _ready_lock:
+        _ready.pop(name, None)
+    for variant in sizes:
+        for fmt in formats:
+            variant_storage.delete(variant_name(name, variant, fmt))
+
+
+# ---------- пул ----------
+class VariantPool:
+    """
+    Потоки для генерации вариантов; Pillow отпускает GIL при декодировании и ресайзе.
+    WORKERS=0 — строить сразу в вызывающем потоке.
+    """
+
+    def __init__(self, workers=None):
+        self._workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    @property
+    def workers(self):
+        if self._workers is not None:
+            return self._workers
+        return getattr(settings, "IMAGE_VARIANTS", {}).get("WORKERS", 2)
+
+    @property
+    def executor(self):
+        # создаём лениво, чтобы management-команды и миграции не поднимали потоки
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-variants")
+            return self._executor
+
+    def submit(self, name):
+        with self._lock:
+            if name in self._pending:
+                return None
+            self._pending.add(name)
+        if self.workers <= 0:
+            try:
+                self._generate(name)
+            except Exception:
+                pass  # уже в логе, запрос это не ломает
+            return None
+        return self.executor.submit(self._run, name)
+
+    def _generate(self, name):
+        from .signals import variants_generated
+
+        try:
+            generate(name)
+            variants_generated.send(sender=self.__class__, name=name)
+        except Exception:
+            logger.exception("Не удалось построить варианты %s", name)
+            raise
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def _run(self, name):
+        try:
+            return self._generate(name)
+        finally:
+            close_old_connections()
+
+
+variant_pool = VariantPool()
+
+
+def schedule(name):
+    """Построить варианты после коммита текущей транзакции"""
+    transaction.on_commit(lambda: variant_pool.submit(name))
@@ -0,0 +1,98 @@
+"""
+Материализованные JSON-документы фильмов.
+
+Фильм с жанрами, актёрами и режиссёрами сериализуется один раз при
+изменении и хранится в MovieDocument как готовые байты. Список и карточка
+фильма склеивают эти байты без запуска сериализаторов. Пересборку
+планируют сигналы (movies/signals.py) после коммита транзакции, несколько
+изменений в одной транзакции дают одну пересборку.
+
+URL картинок в документе относительные, хост подставляет absolute() при
+отдаче. Документы, которых ещё нет (например, после миграции), чтение
+рендерит на лету и не сохраняет; их собирает rebuild_movie_documents --missing.
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from .models import Movie, MovieDocument
+from .serializers import MovieSerializer
+
+_pending = threading.local()
+
+
+def render(movie):
+    """JSON фильма в том же виде, что отдаёт MovieSerializer (URL картинок относительные)"""
+    return JSONRenderer().render(MovieSerializer(movie).data)
+
+
+def _render_many(movie_ids):
+    movies = Movie.objects.filter(pk__in=set(movie_ids)).prefetch_related("genres", "actors", "directors")
+    return {movie.pk: render(movie) for movie in movies}
+
+
+def rebuild(movie_ids):
+    """Пересобирает документы фильмов, возвращает {movie_id: bytes}"""
+    bodies = _render_many(movie_ids)
+    MovieDocument.objects.bulk_create(
+        [MovieDocument(movie_id=pk, body=body) for pk, body in bodies.items()],
+        update_conflicts=True,
+        unique_fields=["movie"],
+        update_fields=["body", "updated_at"],
+    )
+    return bodies
+
+
+def fetch(queryset):
+    """[(movie_id, bytes)] в порядке queryset; недостающие документы рендерятся без записи в базу"""
+    rows = list(queryset.values_list("pk", "document__body"))
+    missing = [pk for pk, body in rows if body is None]
+    built = _render_many(missing) if missing else {}
+    result = []
+    for pk, body in rows:
+        body = bytes(body) if body is not None else built.get(pk)
+        if body is not None:
+            result.append((pk, body))
+    return result
+
+
+def absolute(body, request):
+    """
+    Делает URL картинок абсолютными, как их отдаёт сериализатор с request.
+    В компактном JSON открывающая кавычка строки идёт после ":", "[" или ",",
+    а кавычка внутри строки экранирована, поэтому текст описаний не задевается.
+    """
+    media_url = settings.MEDIA_URL
+    if not media_url.startswith("/"):
+        return body
+    prefix = b'"' + request.build_absolute_uri(media_url).encode()
+    pattern = re.compile(rb'(?<=[:\[,])"' + re.escape(media_url.encode()))
+    return pattern.sub(lambda match: prefix, body)
+
+
+def join(bodies):
+    """Склеивает документы в JSON-массив"""
+    return b"[" + b",".join(bodies) + b"]"
+
+
+def schedule(movie_ids):
+    """Пересобрать документы после коммита текущей транзакции"""
+    movie_ids = {pk for pk in movie_ids if pk is not None}
+    if not movie_ids:
+        return
+    # Один _flush на транзакцию; после отката колбэк пропадает, и набор начинается заново
+    connection = transaction.get_connection()
+    if any(func is _flush for _, func, _ in connection.run_on_commit):
+        _pending.ids.update(movie_ids)
+    else:
+        _pending.ids = movie_ids
+        transaction.on_commit(_flush)
+
+
+def _flush():
+    ids, _pending.ids = _pending.ids, set()
+    if ids:
+        rebuild(ids)
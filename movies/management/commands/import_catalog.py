@@ -0,0 +1,287 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from core.versions import bump
+from movies import documents
+from movies.models import Movie as CatalogMovie, Genre as CatalogGenre, Person
+from users.models import Movie, Series, Genre
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _optional_text(value):
+    return _text(value) or None
+
+
+def _date(value):
+    value = _text(value)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"некорректная дата {value!r}")
+    return parsed
+
+
+def _year(value):
+    value = _text(value)
+    return int(value) if value else None
+
+
+def _names(value):
+    """Список имён: массив в JSONL или строка "a|b|c" в CSV"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        items = value
+    else:
+        items = str(value).split("|")
+    return [name for name in (_text(item) for item in items) if name]
+
+
+# Что импортирует каждый --kind: модель, поля (имя -> разбор, обязательное),
+# M2M-связи (поле модели -> модель, на которую ссылаются имена, создавать ли недостающие)
+# и коллекции API, версии которых поднимаются после пачки (core/versions.py)
+KINDS = {
+    "person": {
+        "model": Person,
+        "fields": {"name": (_text, True), "birth_date": (_date, True), "photo": (_text, False)},
+        "links": {},
+        "collections": ("catalog.people", "catalog.movies"),
+    },
+    "movie": {
+        "model": CatalogMovie,
+        "fields": {"title": (_text, True), "description": (_text, False), "release_date": (_date, False)},
+        "links": {
+            "genres": (CatalogGenre, True),
+            "actors": (Person, False),
+            "directors": (Person, False),
+        },
+        "collections": ("catalog.movies", "catalog.genres"),
+    },
+    "users-movie": {
+        "model": Movie,
+        "fields": {
+            "title": (_text, True), "description": (_optional_text, False), "release_year": (_year, True),
+        },
+        "links": {"genres": (Genre, True)},
+        "collections": ("movies", "genres"),
+    },
+    "series": {
+        "model": Series,
+        "fields": {
+            "title": (_text, True), "description": (_optional_text, False),
+            "start_year": (_year, True), "end_year": (_year, False),
+        },
+        "links": {"genres": (Genre, True)},
+        "collections": ("series", "genres"),
+    },
+}
+
+
+class NameMap:
+    """Имя (без учёта регистра) -> id для жанров и людей; недостающие жанры создаются пачкой"""
+
+    def __init__(self, model, create):
+        self.model = model
+        self.create = create
+        self.ids = {}
+        # при дублях имён берём самую раннюю запись
+        for pk, name in model.objects.order_by("-pk").values_list("pk", "name").iterator(chunk_size=10000):
+            self.ids[name.casefold()] = pk
+
+    def resolve(self, names):
+        missing = {}
+        for name in names:
+            if name.casefold() not in self.ids:
+                missing.setdefault(name.casefold(), name)
+        if missing and self.create:
+            self.model.objects.bulk_create(
+                [self.model(name=name) for name in missing.values()], ignore_conflicts=True
+            )
+            created = self.model.objects.filter(name__in=missing.values()).values_list("pk", "name")
+            for pk, name in created:
+                self.ids.setdefault(name.casefold(), pk)
+        return {name: self.ids.get(name.casefold()) for name in names}
+
+
+class Checkpoint:
+    """Сколько записей файла уже записано в базу; привязан к размеру и времени изменения файла"""
+
+    def __init__(self, path, source):
+        self.path = path
+        stat = source.stat()
+        self.key = {"source": str(source.resolve()), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return 0
+        if {key: data.get(key) for key in self.key} != self.key:
+            return 0
+        return data.get("records", 0)
+
+    def save(self, records):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({**self.key, "records": records}))
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоковый импорт каталога из CSV/JSONL: люди (person), фильмы movies (movie), "
+        "фильмы и сериалы users (users-movie, series). Строки обновляются по external_id "
+        "через bulk_create(update_conflicts), жанры и люди в связях указываются по имени "
+        "(в CSV — через |), недостающие жанры создаются. Прогресс сохраняется в checkpoint, "
+        "повторный запуск продолжает с места остановки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(KINDS))
+        parser.add_argument("path", help="Файл .csv (с заголовком) или .jsonl")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="По умолчанию по расширению файла")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--checkpoint", help="По умолчанию <path>.checkpoint")
+        parser.add_argument("--restart", action="store_true", help="Игнорировать сохранённый checkpoint")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"Файл {path} не найден")
+        fmt = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+        self.spec = KINDS[options["kind"]]
+        self.maps = {
+            name: NameMap(model, create) for name, (model, create) in self.spec["links"].items()
+        }
+        checkpoint = Checkpoint(Path(options["checkpoint"] or f"{path}.checkpoint"), path)
+        done = 0 if options["restart"] else checkpoint.load()
+        if done:
+            self.stdout.write(f"Продолжаем с записи {done}")
+
+        self.imported = self.skipped = self.unresolved = 0
+        started = time.monotonic()
+        size = path.stat().st_size or 1
+        with open(path, encoding="utf-8", newline="") as fh:
+            records = csv.DictReader(fh) if fmt == "csv" else self.read_jsonl(fh)
+            records = islice(records, done, None)
+            while chunk := list(islice(records, options["chunk_size"])):
+                self.write_chunk(chunk)
+                done += len(chunk)
+                checkpoint.save(done)
+                self.report(done, fh.buffer.tell() / size, started)
+        checkpoint.clear()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Импортировано: {self.imported}, пропущено: {self.skipped}, "
+            f"не найдено в связях: {self.unresolved}, время: {elapsed:.1f} с"
+        ))
+
+    @staticmethod
+    def read_jsonl(fh):
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+    def parse(self, record):
+        """external_id, значения и связи; в значения попадают только поля, которые есть в записи"""
+        external_id = _text(record.get("external_id"))
+        if not external_id:
+            raise ValueError("нет external_id")
+        values = {}
+        for name, (parse, required) in self.spec["fields"].items():
+            value = parse(record.get(name))
+            if required and value in (None, ""):
+                raise ValueError(f"нет поля {name}")
+            if name in record:
+                values[name] = value
+        links = {name: _names(record.get(name)) for name in self.spec["links"] if name in record}
+        return external_id, values, links
+
+    def write_chunk(self, chunk):
+        model = self.spec["model"]
+        rows = {}
+        for record in chunk:
+            try:
+                external_id, values, links = self.parse(record)
+            except (ValueError, TypeError) as exc:
+                self.skipped += 1
+                self.stderr.write(f"Пропуск записи {record.get('external_id')!r}: {exc}")
+                continue
+            rows[external_id] = (values, links)  # повтор в пачке: последняя запись побеждает
+        if not rows:
+            return
+
+        # Обновляются только поля, которые есть в записи, остальные не затираются:
+        # записи с одинаковым набором полей идут одним upsert
+        groups = {}
+        for key, (values, _) in rows.items():
+            groups.setdefault(tuple(values), []).append(model(external_id=key, **values))
+
+        with transaction.atomic():
+            for columns, objs in groups.items():
+                if columns:
+                    model.objects.bulk_create(
+                        objs, update_conflicts=True, unique_fields=["external_id"], update_fields=list(columns)
+                    )
+                else:
+                    model.objects.bulk_create(objs, ignore_conflicts=True)
+            ids = dict(model.objects.filter(external_id__in=rows).values_list("external_id", "pk"))
+            for name in self.spec["links"]:
+                self.write_links(model, name, ids, rows)
+            self.schedule_documents(model, list(ids.values()))
+            bump(*self.spec["collections"])
+        self.imported += len(ids)
+
+    def write_links(self, model, name, ids, rows):
+        """Заменяет связи name у строк пачки одним DELETE и одним bulk INSERT"""
+        owners = {key: (values, links[name]) for key, (values, links) in rows.items() if name in links}
+        if not owners:
+            return
+        resolved = self.maps[name].resolve({target for _, targets in owners.values() for target in targets})
+        m2m = model._meta.get_field(name)
+        through = m2m.remote_field.through
+        source, target = f"{m2m.m2m_field_name()}_id", f"{m2m.m2m_reverse_field_name()}_id"
+
+        through.objects.filter(**{f"{source}__in": [ids[key] for key in owners]}).delete()
+        links = []
+        for key, (_, targets) in owners.items():
+            for target_name in targets:
+                target_id = resolved.get(target_name)
+                if target_id is None:
+                    self.unresolved += 1
+                    continue
+                links.append(through(**{source: ids[key], target: target_id}))
+        through.objects.bulk_create(links, ignore_conflicts=True, batch_size=5000)
+
+    @staticmethod
+    def schedule_documents(model, pks):
+        # bulk_create не шлёт сигналов, документы фильмов пересобираем сами после коммита
+        if model is CatalogMovie:
+            documents.schedule(pks)
+        elif model is Person:
+            movie_ids = set()
+            for name in ("actors", "directors"):
+                through = getattr(CatalogMovie, name).through
+                movie_ids.update(through.objects.filter(person_id__in=pks).values_list("movie_id", flat=True))
+            documents.schedule(movie_ids)
+
+    def report(self, done, progress, started):
+        elapsed = time.monotonic() - started
+        rate = self.imported / elapsed if elapsed else 0
+        self.stdout.write(f"Обработано {done} записей ({min(progress, 1):.0%}), {rate:.0f} строк/с")
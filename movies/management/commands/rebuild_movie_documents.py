@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from movies import documents
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = "Пересобирает готовые JSON-документы фильмов (все или только отсутствующие)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--missing", action="store_true", help="Только фильмы без документа")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        movies = Movie.objects.order_by("pk")
+        if options["missing"]:
+            movies = movies.filter(document__isnull=True)
+        movie_ids = list(movies.values_list("pk", flat=True))
+        batch_size = options["batch_size"]
+        for start in range(0, len(movie_ids), batch_size):
+            documents.rebuild(movie_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Документы пересобраны для {len(movie_ids)} фильмов"))
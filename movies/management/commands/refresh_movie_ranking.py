@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from movies.ranking import refresh_ranking
+
+
+class Command(BaseCommand):
+    help = "Пересобирает рейтинг фильмов (MovieRanking) по байесовскому среднему; запускать по расписанию"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prior-votes", type=int, help="По умолчанию MOVIE_RANKING['PRIOR_VOTES']")
+        parser.add_argument("--min-votes", type=int, help="По умолчанию MOVIE_RANKING['MIN_VOTES']")
+
+    def handle(self, *args, **options):
+        ranked = refresh_ranking(options["prior_votes"], options["min_votes"])
+        self.stdout.write(self.style.SUCCESS(f"В рейтинге {ranked} фильмов"))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_movie_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title', 'id'], name='catalog_movie_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_date', 'id'], name='catalog_movie_date_idx'),
+        ),
+    ]
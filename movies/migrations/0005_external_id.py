@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_movie_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genre',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
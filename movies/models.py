@@ -2,20 +2,25 @@ from django.db import models
 
 class Genre(models.Model):
     name = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 class Person(models.Model):
     name = models.CharField(max_length=100)
+    # ключ записи во внешнем каталоге, по нему import_catalog обновляет строки
+    external_id = models.CharField(max_length=64, unique=True, blank=True, null=True)
     birth_date = models.DateField()
     photo = models.ImageField(upload_to='people/')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 class Movie(models.Model):
     title = models.CharField(max_length=100)
+    external_id = models.CharField(max_length=64, unique=True, blank=True, null=True)
     description = models.TextField(blank=True)
     release_date = models.DateField(blank=True, null=True)
     poster_image = models.ImageField(upload_to='movies/posters/', blank=True, null=True)
@@ -23,6 +28,47 @@ class Movie(models.Model):
     actors = models.ManyToManyField(Person, related_name='acted_movies', blank=True)
     directors = models.ManyToManyField(Person, related_name='directed_movies', blank=True)
     created_at = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Агрегаты оценок из отзывов, их ведут сигналы reviews.models
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title', 'id'], name='catalog_movie_title_idx'),
+            models.Index(fields=['release_date', 'id'], name='catalog_movie_date_idx'),
+            models.Index(fields=['rating_avg', 'id'], name='catalog_movie_rating_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class MovieDocument(models.Model):
+    """Готовый JSON фильма, который MovieViewSet отдаёт без сериализации (movies/documents.py)"""
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    body = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Document of {self.movie_id}"
+
+
+class MovieRanking(models.Model):
+    """Рейтинг фильмов по байесовскому среднему, пересчитывается командой refresh_movie_ranking"""
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+    position = models.PositiveIntegerField(unique=True)
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['position']
+
+    def __str__(self):
+        return f"#{self.position} {self.movie_id}"
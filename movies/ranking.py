@@ -0,0 +1,51 @@
+"""
+Рейтинг фильмов по байесовскому среднему.
+
+Фильм с парой пятёрок не должен обгонять фильм с тысячей оценок 4.8,
+поэтому средняя оценка сглаживается к среднему по каталогу с весом
+PRIOR_VOTES виртуальных голосов. Счёт зависит от всего каталога, так что
+вести его инкрементально нельзя: таблица MovieRanking пересобирается
+периодически (команда refresh_movie_ranking), а /top/ читает её по
+индексу позиции.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Sum, Window
+from django.db.models.functions import Cast, RowNumber
+
+from core.versions import bump
+from .models import Movie, MovieRanking
+
+BATCH_SIZE = 1000
+
+
+def refresh_ranking(prior_votes=None, min_votes=None):
+    """Пересобирает MovieRanking, возвращает число фильмов в рейтинге"""
+    config = getattr(settings, "MOVIE_RANKING", {})
+    prior_votes = prior_votes if prior_votes is not None else config.get("PRIOR_VOTES", 10)
+    min_votes = min_votes if min_votes is not None else config.get("MIN_VOTES", 1)
+
+    totals = Movie.objects.aggregate(votes=Sum("rating_count"), points=Sum("rating_sum"))
+    mean = totals["points"] / totals["votes"] if totals["votes"] else 0
+    score = (Cast(F("rating_sum"), FloatField()) + prior_votes * mean) / (F("rating_count") + prior_votes)
+    rows = (
+        Movie.objects.filter(rating_count__gte=max(min_votes, 1))
+        .annotate(score=score)
+        .annotate(position=Window(RowNumber(), order_by=[F("score").desc(), F("pk").asc()]))
+        .values_list("pk", "score", "position")
+    )
+
+    ranked = 0
+    with transaction.atomic():
+        MovieRanking.objects.all().delete()
+        batch = []
+        for movie_id, value, position in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(MovieRanking(movie_id=movie_id, position=position, score=value))
+            if len(batch) == BATCH_SIZE:
+                MovieRanking.objects.bulk_create(batch)
+                ranked += len(batch)
+                batch = []
+        MovieRanking.objects.bulk_create(batch)
+        ranked += len(batch)
+        bump("catalog.top")
+    return ranked
@@ -1,20 +1,26 @@
 from rest_framework import serializers
-from .models import Genre,Person,Movie
+from core.fieldsets import ShapedSerializerMixin
+from imaging.fields import ImageVariantsField
+from .models import Genre,Person,Movie,MovieRanking
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ['id','name']
 
-class PersonSerializer(serializers.ModelSerializer):
+class PersonSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
+    photo_variants = ImageVariantsField(source='photo')
+
     class Meta:
         model = Person
-        fields = ['id','name', 'birth_date', 'photo']
+        fields = ['id','name', 'birth_date', 'photo', 'photo_variants']
 
-class MovieSerializer(serializers.ModelSerializer):
+class MovieSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     genres = GenreSerializer(many=True, read_only=True)
     actors = PersonSerializer(many=True, read_only=True)
     directors = PersonSerializer(many=True, read_only=True)
+    rating_histogram = serializers.SerializerMethodField()
+    poster_image_variants = ImageVariantsField(source="poster_image")
 
     class Meta:
         model = Movie
@@ -24,7 +30,29 @@ class MovieSerializer(serializers.ModelSerializer):
             "description",
             "release_date",
             "poster_image",
+            "poster_image_variants",
             "genres",
             "actors",
             "directors",
-        ]
\ No newline at end of file
+            "rating_avg",
+            "rating_count",
+            "rating_histogram",
+        ]
+        expandable_fields = ["genres", "actors", "directors"]
+
+    def get_rating_histogram(self, obj):
+        return {str(value): getattr(obj, f"rating_{value}") for value in range(1, 6)}
+
+class RankedMovieSerializer(serializers.ModelSerializer):
+    poster_image_variants = ImageVariantsField(source="poster_image")
+
+    class Meta:
+        model = Movie
+        fields = ["id", "title", "release_date", "poster_image", "poster_image_variants", "rating_avg", "rating_count"]
+
+class MovieRankingSerializer(serializers.ModelSerializer):
+    movie = RankedMovieSerializer(read_only=True)
+
+    class Meta:
+        model = MovieRanking
+        fields = ["position", "score", "movie"]
\ No newline at end of file
@@ -0,0 +1,76 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from imaging.signals import variants_generated
+from . import documents
+from .models import Genre, Person, Movie
+
+# Через какие поля Person и Genre попадают в документ фильма
+PERSON_LINKS = ("acted_movies", "directed_movies")
+
+
+def _person_movie_ids(person):
+    ids = set()
+    for name in PERSON_LINKS:
+        ids.update(getattr(person, name).values_list("pk", flat=True))
+    return ids
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, **kwargs):
+    documents.schedule([instance.pk])
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, **kwargs):
+    documents.schedule(instance.movie_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Person)
+def person_saved(sender, instance, **kwargs):
+    documents.schedule(_person_movie_ids(instance))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Person)
+def remember_linked_movies(sender, instance, **kwargs):
+    """Связи удалятся каскадом, поэтому фильмы запоминаем до удаления"""
+    if sender is Genre:
+        instance._linked_movie_ids = set(instance.movie_set.values_list("pk", flat=True))
+    else:
+        instance._linked_movie_ids = _person_movie_ids(instance)
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Person)
+def linked_deleted(sender, instance, **kwargs):
+    documents.schedule(getattr(instance, "_linked_movie_ids", ()))
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+@receiver(m2m_changed, sender=Movie.actors.through)
+@receiver(m2m_changed, sender=Movie.directors.through)
+def movie_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith("post_"):
+            documents.schedule([instance.pk])
+        return
+    # instance — жанр или человек, pk_set — фильмы
+    if action == "pre_clear":
+        field = "genre" if isinstance(instance, Genre) else "person"
+        instance._cleared_movie_ids = set(
+            sender.objects.filter(**{field: instance.pk}).values_list("movie_id", flat=True)
+        )
+    elif action in ("post_add", "post_remove"):
+        documents.schedule(pk_set)
+    elif action == "post_clear":
+        documents.schedule(getattr(instance, "_cleared_movie_ids", ()))
+
+
+@receiver(variants_generated)
+def image_variants_ready(sender, name, **kwargs):
+    """В документах до этого стояли URL оригинала, теперь есть варианты"""
+    movie_ids = set(Movie.objects.filter(poster_image=name).values_list("pk", flat=True))
+    for person in Person.objects.filter(photo=name):
+        movie_ids.update(_person_movie_ids(person))
+    documents.schedule(movie_ids)
@@ -1,3 +1,141 @@
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from movies import documents
+from movies.models import Genre as CatalogGenre, Movie as CatalogMovie, MovieDocument, MovieRanking
+from movies.ranking import refresh_ranking
+from users.models import Movie
+
+
+class ImportCatalogTest(TestCase):
+    """Upsert обновляет у каждой записи только её поля, пачка не зависит от первой записи"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = Path(directory) / "movies.jsonl"
+
+    def run_import(self, records):
+        self.path.write_text("\n".join(json.dumps(record) for record in records))
+        call_command("import_catalog", "users-movie", str(self.path), "--restart", stdout=io.StringIO(),
+                     stderr=io.StringIO())
+
+    def test_mixed_columns_in_one_chunk(self):
+        Movie.objects.create(external_id="m2", title="Старое", description="Описание", release_year=1990)
+        self.run_import([
+            {"external_id": "m0"},
+            {"external_id": "m1", "title": "Новый", "release_year": 2001, "description": "Текст"},
+            {"external_id": "m2", "title": "Обновлённое", "release_year": 1991},
+        ])
+        self.assertFalse(Movie.objects.filter(external_id="m0").exists())
+        self.assertEqual(
+            Movie.objects.filter(external_id="m1").values_list("title", "description", "release_year").get(),
+            ("Новый", "Текст", 2001),
+        )
+        # в записи m2 нет description — сохранённое значение не затирается
+        self.assertEqual(
+            Movie.objects.filter(external_id="m2").values_list("title", "description", "release_year").get(),
+            ("Обновлённое", "Описание", 1991),
+        )
+
+
+class CatalogShapeTest(TestCase):
+    """Каталог с ?fields=/?expand= отдаёт сериализатор вместо готовых документов"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.genre = CatalogGenre.objects.create(name="Драма")
+        self.movie = CatalogMovie.objects.create(title="Фильм")
+        self.movie.genres.add(self.genre)
+
+    def test_fields_and_expand(self):
+        response = self.client.get("/api/catalog/movies/?fields=id,title,genres&expand=")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["results"], [{"id": self.movie.pk, "title": "Фильм", "genres": [self.genre.pk]}])
+
+        response = self.client.get(f"/api/catalog/movies/{self.movie.pk}/?fields=genres.name")
+        self.assertEqual(response.json(), {"genres": [{"name": "Драма"}]})
+
+    def test_unknown_names_are_rejected(self):
+        for query in ("fields=nope", "expand=title", "fields=genres.nope"):
+            with self.subTest(query):
+                self.assertEqual(self.client.get(f"/api/catalog/movies/?{query}").status_code, 400)
+
+
+class MovieDocumentTest(TestCase):
+    """Готовые документы отдают те же абсолютные URL, что и сериализатор, и не пишутся на чтении"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.movie = CatalogMovie.objects.create(title="Фильм", description='Путь "/media/x.jpg" в тексте')
+        # update() — без сигналов, которые стали бы строить варианты несуществующего файла
+        CatalogMovie.objects.filter(pk=self.movie.pk).update(poster_image="movies/posters/p.jpg")
+        documents.rebuild([self.movie.pk])
+
+    def shaped(self):
+        """Тот же фильм через сериализатор (?fields=), без готового документа"""
+        fields = "id,title,description,poster_image,poster_image_variants"
+        return self.client.get(f"/api/catalog/movies/{self.movie.pk}/?fields={fields}").json()
+
+    def test_image_urls_match_serializer(self):
+        shaped = self.shaped()
+        self.assertEqual(shaped["poster_image"], "http://testserver/media/movies/posters/p.jpg")
+        detail = self.client.get(f"/api/catalog/movies/{self.movie.pk}/").json()
+        listed = self.client.get("/api/catalog/movies/").json()["results"][0]
+        for body in (detail, listed):
+            self.assertEqual({key: body[key] for key in shaped}, shaped)
+        self.assertEqual(detail["description"], 'Путь "/media/x.jpg" в тексте')
+
+    def test_missing_document_is_rendered_without_writing(self):
+        MovieDocument.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.get(f"/api/catalog/movies/{self.movie.pk}/")
+        self.assertEqual(response.json()["poster_image"], "http://testserver/media/movies/posters/p.jpg")
+        self.assertEqual(callbacks, [])
+        self.assertFalse(MovieDocument.objects.exists())
+
+        call_command("rebuild_movie_documents", "--missing", stdout=io.StringIO())
+        self.assertTrue(MovieDocument.objects.filter(movie=self.movie).exists())
+
+class MovieRankingTest(TestCase):
+    """Байесовское среднее: пара пятёрок не обгоняет сотню оценок 4.9, /top/ идёт страницами по позиции"""
+
+    def setUp(self):
+        self.client = APIClient()
+        votes = {"few": (10, 2), "many": (490, 100), "low": (150, 50), "none": (0, 0)}
+        self.movies = {}
+        for title, (total, count) in votes.items():
+            movie = CatalogMovie.objects.create(title=title)
+            CatalogMovie.objects.filter(pk=movie.pk).update(rating_sum=total, rating_count=count)
+            self.movies[title] = movie
+
+    def test_bayesian_order(self):
+        call_command("refresh_movie_ranking", "--prior-votes", "10", stdout=io.StringIO())
+        rows = list(MovieRanking.objects.order_by("position").values_list("movie__title", "position", "score"))
+        self.assertEqual([(title, position) for title, position, _ in rows], [("many", 1), ("few", 2), ("low", 3)])
+        mean = 650 / 152
+        self.assertAlmostEqual(rows[1][2], (10 + 10 * mean) / (2 + 10))
+
+        # без сглаживания пара пятёрок была бы первой
+        refresh_ranking(prior_votes=0)
+        self.assertEqual(MovieRanking.objects.get(position=1).movie, self.movies["few"])
+        self.assertEqual(refresh_ranking(prior_votes=10, min_votes=50), 2)
 
-# Create your tests here.
+    def test_top_pages(self):
+        refresh_ranking(prior_votes=10)
+        titles, url = [], "/api/catalog/movies/top/?page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            titles.extend(item["movie"]["title"] for item in response.data["results"])
+            self.assertEqual([item["position"] for item in response.data["results"]],
+                             list(range(len(titles) - len(response.data["results"]) + 1, len(titles) + 1)))
+            url = response.data["next"] and response.data["next"].replace("http://testserver", "")
+        self.assertEqual(titles, ["many", "few", "low"])
@@ -1,20 +1,86 @@
+import json
+
+from django.http import HttpResponse
 from rest_framework import viewsets
-from .models import Movie, Genre, Person
-from .serializers import MovieSerializer, GenreSerializer, PersonSerializer
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from core.fieldsets import requests_shape, shape_queryset
+from core.filters import CatalogFilter, KeysetOrderingMixin
+from core.pagination import KeysetPagination
+from core.versions import ConditionalGetMixin
+from . import documents
+from .models import Movie, Genre, Person, MovieRanking
+from .serializers import MovieSerializer, GenreSerializer, PersonSerializer, MovieRankingSerializer
 from .permissions import IsAdminOrReadOnly
 
-class MovieViewSet(viewsets.ModelViewSet):
+class MovieViewSet(ConditionalGetMixin, KeysetOrderingMixin, viewsets.ModelViewSet):
     queryset = Movie.objects.all()
+    version_collection = "catalog.movies"
     serializer_class = MovieSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
+    filter_backends = [CatalogFilter]
+    range_filters = {"release_date": "release_date"}
+    genre_field = "genres"
+    ordering_fields = {"title": "title", "date": "release_date", "rating": "rating_avg"}
+    default_ordering = "title"
+
+    # Чтение отдаёт готовые документы (movies/documents.py); сериализатор работает
+    # на запись и на чтение с ?fields= / ?expand= (core/fieldsets.py)
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve") and requests_shape(self.request):
+            queryset = shape_queryset(queryset, self.get_serializer())
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if requests_shape(request):
+            return super().list(request, *args, **kwargs)
+        return self.conditional(self.list_documents, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if requests_shape(request):
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional(self.retrieve_document, request, *args, **kwargs)
+
+    def list_documents(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).only("pk", *self.ordering_fields.values())
+        page = [movie.pk for movie in self.paginate_queryset(queryset)]
+        bodies = dict(documents.fetch(Movie.objects.filter(pk__in=page)))
+        results = documents.absolute(documents.join(bodies[pk] for pk in page if pk in bodies), request)
+        next_link = json.dumps(self.paginator.get_next_link()).encode()
+        return HttpResponse(
+            b'{"next":' + next_link + b',"results":' + results + b"}",
+            content_type="application/json",
+        )
+
+    def retrieve_document(self, request, *args, **kwargs):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        found = documents.fetch(self.get_queryset().filter(**{self.lookup_field: lookup}))
+        if not found:
+            raise NotFound()
+        return HttpResponse(documents.absolute(found[0][1], request), content_type="application/json")
+
+    @action(detail=False, methods=["get"])
+    def top(self, request):
+        """Лучшие фильмы по байесовскому среднему из готовой таблицы MovieRanking"""
+        return self.conditional(self.top_page, request, collection="catalog.top")
+
+    def top_page(self, request):
+        paginator = KeysetPagination(ordering=("position",))
+        page = paginator.paginate_queryset(MovieRanking.objects.select_related("movie"), request)
+        serializer = MovieRankingSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Genre.objects.all()
+    version_collection = "catalog.genres"
     serializer_class = GenreSerializer
     permission_classes = [IsAdminOrReadOnly]
 
-class PersonViewSet(viewsets.ModelViewSet):
+class PersonViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Person.objects.all()
+    version_collection = "catalog.people"
     serializer_class = PersonSerializer
     permission_classes = [IsAdminOrReadOnly]
 
@@ -1,9 +1,11 @@
 from rest_framework import serializers
+from imaging.fields import ImageVariantsField
 from .models import News
 
 
 class NewsSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
+    image_variants = ImageVariantsField(source='image')
 
     class Meta:
         model = News
@@ -14,6 +16,7 @@ class NewsSerializer(serializers.ModelSerializer):
             'title',
             'content',
             'image',
+            'image_variants',
             'created_at',
             'updated_at',
             'is_published'
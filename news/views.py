@@ -1,10 +1,12 @@
 from rest_framework import viewsets, permissions
+from core.versions import ConditionalGetMixin
 from .models import News
 from .serializers import NewsSerializer
 
 
-class NewsViewSet(viewsets.ModelViewSet):
+class NewsViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = News.objects.all().order_by('-created_at')
+    version_collection = 'news'
     serializer_class = NewsSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
@@ -0,0 +1,143 @@
+"""
+Буферизованный счётчик лайков отзывов.
+
+Лайк не трогает строку Review: сигналы ReviewLike (reviews/models.py) после
+коммита прибавляют ±1 к дельте отзыва в общем кэше и пишут id отзыва в
+журнал (счётчик SEQ_KEY и запись на каждый номер, как в users/revocation.py).
+Периодическая команда flush_review_likes читает журнал, забирает накопленные
+дельты и переносит их в Review.likes_count пачками UPDATE — по одному на
+каждое значение сдвига, так что тысячи лайков одного отзыва дают одну запись
+в базу. Чтение складывает сохранённое значение и ещё не перенесённую дельту.
+
+Номер в журнале выдаётся incr'ом раньше, чем появляется запись: flush,
+наткнувшись на пропуск, останавливается перед ним и продолжит со следующего
+запуска. Пропуск старше GAP_GRACE секунд считается записью упавшего процесса
+и пропускается (его дельту перенесёт следующий лайк или --recount).
+
+Кэш должен быть общим для веб-воркеров и команды (алиас 'shared' в
+настройках): в локальном LocMem у каждого процесса своя пустая копия.
+
+Дельта вычитается из кэша только после коммита UPDATE: при падении между
+ними лайки могут быть учтены дважды, flush_review_likes --recount
+пересчитывает счётчики по строкам ReviewLike.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+
+KEY_PREFIX = "reviews:likes:"
+SEQ_KEY = KEY_PREFIX + "seq"
+FLUSHED_KEY = KEY_PREFIX + "flushed"
+LOCK_KEY = KEY_PREFIX + "flush-lock"
+GAP_KEY = KEY_PREFIX + "gap"
+GAP_GRACE = 60
+LOG_BATCH = 1000
+
+
+class LikeCounter:
+    def __init__(self, cache_alias=None, batch_size=None):
+        config = getattr(settings, "REVIEW_LIKES", {})
+        self.cache_alias = cache_alias or config.get("CACHE", "shared")
+        self.batch_size = batch_size or config.get("FLUSH_BATCH", 1000)
+        self.lock_timeout = config.get("LOCK_TIMEOUT", 300)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def _delta_key(review_id):
+        return f"{KEY_PREFIX}delta:{review_id}"
+
+    def add(self, review_id, delta):
+        """Откладывает изменение счётчика отзыва на delta"""
+        cache = self.cache
+        self._incr(cache, self._delta_key(review_id), delta)
+        # запись в журнал после дельты: кто прочитал номер, увидит и дельту
+        seq = self._incr(cache, SEQ_KEY, 1)
+        cache.set(f"{KEY_PREFIX}log:{seq}", review_id, None)
+
+    @staticmethod
+    def _incr(cache, key, delta):
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # ключа ещё нет (или кэш очистили)
+            cache.add(key, 0, None)
+            return cache.incr(key, delta)
+
+    def pending(self, review_ids):
+        """{review_id: дельта} для ещё не перенесённых в базу изменений"""
+        if not review_ids:
+            return {}
+        keys = {self._delta_key(pk): pk for pk in review_ids}
+        return {keys[key]: delta for key, delta in self.cache.get_many(list(keys)).items() if delta}
+
+    def flush(self):
+        """Переносит дельты из кэша в Review.likes_count, возвращает (отзывов, сдвиг суммарно)"""
+        from .models import Review
+
+        cache = self.cache
+        # два flush одновременно перенесли бы одни и те же дельты дважды
+        if not cache.add(LOCK_KEY, 1, self.lock_timeout):
+            return 0, 0
+        try:
+            return self._flush(cache, Review)
+        finally:
+            cache.delete(LOCK_KEY)
+
+    def _flush(self, cache, Review):
+        current = cache.get(SEQ_KEY, 0)
+        flushed = cache.get(FLUSHED_KEY, 0)
+        if current < flushed:
+            # кэш очищали: журнал начинается заново
+            flushed = 0
+        reviews = updated = 0
+        for start in range(flushed + 1, current + 1, LOG_BATCH):
+            seqs = range(start, min(start + LOG_BATCH, current + 1))
+            logged = cache.get_many([f"{KEY_PREFIX}log:{seq}" for seq in seqs])
+            review_ids, done, stopped = set(), start - 1, False
+            for seq in seqs:
+                key = f"{KEY_PREFIX}log:{seq}"
+                if key in logged:
+                    review_ids.add(logged[key])
+                elif not self._gap_expired(cache, seq):
+                    # номер выдан, запись ещё не сделана: дочитаем в следующий раз
+                    stopped = True
+                    break
+                done = seq
+            deltas = self.pending(review_ids)
+            by_step = {}
+            for pk, delta in deltas.items():
+                by_step.setdefault(delta, []).append(pk)
+            with transaction.atomic():
+                for step, pks in by_step.items():
+                    for offset in range(0, len(pks), self.batch_size):
+                        Review.objects.filter(pk__in=pks[offset:offset + self.batch_size]).update(
+                            likes_count=F("likes_count") + step
+                        )
+            for pk, delta in deltas.items():
+                # вычитаем перенесённое: лайки, пришедшие во время flush, остаются в дельте
+                cache.decr(self._delta_key(pk), delta)
+            cache.delete_many([f"{KEY_PREFIX}log:{seq}" for seq in range(start, done + 1)])
+            cache.set(FLUSHED_KEY, done, None)
+            reviews += len(deltas)
+            updated += sum(deltas.values())
+            if stopped:
+                break
+        return reviews, updated
+
+    @staticmethod
+    def _gap_expired(cache, seq):
+        """Пропуск seq ждёт GAP_GRACE секунд с первой встречи, потом пропускается"""
+        gap = cache.get(GAP_KEY)
+        if gap is None or gap[0] != seq:
+            cache.set(GAP_KEY, (seq, time.time()), None)
+            return False
+        return time.time() - gap[1] >= GAP_GRACE
+
+
+like_counter = LikeCounter()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from reviews.like_counter import like_counter
+from reviews.models import recount_review_likes
+
+
+class Command(BaseCommand):
+    help = "Переносит накопленные в кэше лайки в Review.likes_count; запускать по расписанию"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recount", action="store_true", help="Пересчитать счётчики всех отзывов по таблице лайков"
+        )
+
+    def handle(self, *args, **options):
+        reviews, likes = like_counter.flush()
+        self.stdout.write(self.style.SUCCESS(f"Обновлено отзывов: {reviews}, сдвиг лайков: {likes:+d}"))
+        if options["recount"]:
+            updated = recount_review_likes()
+            self.stdout.write(self.style.SUCCESS(f"Пересчитано отзывов: {updated}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reviews.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = "Пересобирает снимок популярных отзывов (ReviewTrending); запускать по расписанию"
+
+    def handle(self, *args, **options):
+        ranked = refresh_trending()
+        self.stdout.write(self.style.SUCCESS(f"В снимке {ranked} отзывов"))
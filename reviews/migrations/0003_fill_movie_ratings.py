@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def fill_movie_ratings(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    Review = apps.get_model('reviews', 'Review')
+    reviews = Review.objects.filter(movie=OuterRef('pk')).values('movie')
+
+    def aggregate(expression):
+        return Coalesce(Subquery(reviews.annotate(total=expression).values('total')), 0)
+
+    counters = {f'rating_{value}': aggregate(Count('pk', filter=Q(rating=value))) for value in range(1, 6)}
+    Movie.objects.update(rating_sum=aggregate(Sum('rating')), rating_count=aggregate(Count('pk')), **counters)
+    Movie.objects.update(rating_avg=Cast(F('rating_sum'), FloatField()) / NullIf(F('rating_count'), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_initial'),
+        ('movies', '0004_movie_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_movie_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:07
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_likes_count(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ReviewLike = apps.get_model('reviews', 'ReviewLike')
+    likes = (
+        ReviewLike.objects.filter(review=OuterRef('pk'))
+        .order_by()
+        .values('review')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Review.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_fill_movie_ratings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_review_likes_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', 'created_at', 'id'], name='comment_review_created_idx'),
+        ),
+    ]
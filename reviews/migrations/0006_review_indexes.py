@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_updated_at'),
+        ('reviews', '0005_comment_review_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'created_at', 'id'], name='review_movie_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'likes_count', 'id'], name='review_movie_likes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', 'created_at', 'id'], name='review_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['likes_count', 'id'], name='review_likes_idx'),
+        ),
+    ]
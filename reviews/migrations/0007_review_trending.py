@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_review_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewTrending',
+            fields=[
+                ('review', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='reviews.review')),
+                ('position', models.PositiveIntegerField(unique=True)),
+                ('score', models.FloatField()),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('comments', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_at'], name='comment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewlike',
+            index=models.Index(fields=['created_at'], name='reviewlike_created_idx'),
+        ),
+    ]
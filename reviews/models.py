@@ -1,7 +1,14 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.conf import settings
+from django.db.models import F, Q, Count, Sum, OuterRef, Subquery, FloatField
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from core.versions import bump
+from movies import documents
 from movies.models import Movie
+from .like_counter import like_counter
 
 class Review(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
@@ -10,6 +17,41 @@ class Review(models.Model):
     content = models.TextField()
     rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     created_at = models.DateTimeField(auto_now_add=True)
+    # Сохранённая часть счётчика лайков; свежие лайки лежат дельтой в кэше (reviews/like_counter.py)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Отзывы фильма/автора по дате и по лайкам (CatalogFilter + KeysetPagination)
+        indexes = [
+            models.Index(fields=["movie", "created_at", "id"], name="review_movie_created_idx"),
+            models.Index(fields=["movie", "likes_count", "id"], name="review_movie_likes_idx"),
+            models.Index(fields=["author", "created_at", "id"], name="review_author_created_idx"),
+            models.Index(fields=["created_at", "id"], name="review_created_idx"),
+            models.Index(fields=["likes_count", "id"], name="review_likes_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # отзыв и агрегаты оценок фильма (сигналы ниже) меняются в одной транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def like(self, user):
+        """Ставит лайк, возвращает False, если лайк уже был"""
+        try:
+            with transaction.atomic():
+                ReviewLike.objects.create(review=self, user=user)
+        except IntegrityError:
+            return False
+        return True
+
+    def unlike(self, user):
+        """Снимает лайк, возвращает False, если лайка не было"""
+        deleted, _ = ReviewLike.objects.filter(review=self, user=user).delete()
+        return bool(deleted)
+
+    def current_likes(self):
+        """Сохранённый счётчик плюс ещё не перенесённая дельта"""
+        return self.likes_count + like_counter.pending([self.pk]).get(self.pk, 0)
 
     def __str__(self):
         return f"Review of {self.movie.title} by {self.author.username}"
@@ -20,6 +62,14 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Обсуждение отзыва по порядку (keyset-страницы и первые N на отзыв)
+        indexes = [
+            models.Index(fields=["review", "created_at", "id"], name="comment_review_created_idx"),
+            # окно расчёта популярных отзывов (reviews/trending.py)
+            models.Index(fields=["created_at"], name="comment_created_idx"),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author.username} on {self.review.title}"
 
@@ -34,6 +84,133 @@ class ReviewLike(models.Model):
 
     class Meta:
         unique_together = ("review", "user")
+        # окно расчёта популярных отзывов (reviews/trending.py)
+        indexes = [
+            models.Index(fields=["created_at"], name="reviewlike_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} likes {self.review.title}"
+
+
+class ReviewTrending(models.Model):
+    """Снимок популярных за неделю отзывов, пересобирается командой refresh_review_trending"""
+    review = models.OneToOneField(Review, on_delete=models.CASCADE, primary_key=True, related_name="trending")
+    position = models.PositiveIntegerField(unique=True)
+    score = models.FloatField()
+    # лайки и комментарии внутри окна расчёта
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["position"]
+
+    def __str__(self):
+        return f"#{self.position} {self.review_id}"
+
+
+# ---------- Агрегаты оценок ----------
+RATING_VALUES = range(1, 6)
+
+
+def adjust_movie_rating(movie_id, removed=None, added=None):
+    """Убирает оценку removed и добавляет added одним UPDATE фильма"""
+    sum_delta = (added or 0) - (removed or 0)
+    count_delta = (added is not None) - (removed is not None)
+    changes = {}
+    for value, step in ((removed, -1), (added, 1)):
+        if value is not None:
+            field = f"rating_{value}"
+            changes[field] = changes.get(field, F(field)) + step
+    if sum_delta or count_delta:
+        # в UPDATE справа стоят старые значения колонок, поэтому среднее считаем от них
+        changes["rating_sum"] = F("rating_sum") + sum_delta
+        changes["rating_count"] = F("rating_count") + count_delta
+        changes["rating_avg"] = (
+            Cast(F("rating_sum") + sum_delta, FloatField())
+            / NullIf(F("rating_count") + count_delta, 0)
+        )
+    if changes:
+        Movie.objects.filter(pk=movie_id).update(**changes)
+        documents.schedule([movie_id])
+        bump("catalog.movies")
+
+
+def recount_movie_ratings():
+    """Пересчитывает агрегаты оценок всех фильмов по таблице отзывов"""
+    reviews = Review.objects.filter(movie=OuterRef("pk")).values("movie")
+
+    def aggregate(expression):
+        return Coalesce(Subquery(reviews.annotate(total=expression).values("total")), 0)
+
+    counters = {f"rating_{value}": aggregate(Count("pk", filter=Q(rating=value))) for value in RATING_VALUES}
+    Movie.objects.update(rating_sum=aggregate(Sum("rating")), rating_count=aggregate(Count("pk")), **counters)
+    updated = Movie.objects.update(rating_avg=Cast(F("rating_sum"), FloatField()) / NullIf(F("rating_count"), 0))
+    bump("catalog.movies")
+    return updated
+
+
+def recount_review_likes(batch_size=1000):
+    """
+    Пересчитывает likes_count по строкам ReviewLike. Ещё не перенесённые
+    дельты вычитаются, чтобы сумма с ними осталась верной.
+    """
+    likes = (
+        ReviewLike.objects.filter(review=OuterRef("pk"))
+        .order_by()
+        .values("review")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    updated = Review.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+    review_ids = list(Review.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(review_ids), batch_size):
+        by_step = {}
+        for pk, delta in like_counter.pending(review_ids[start:start + batch_size]).items():
+            by_step.setdefault(delta, []).append(pk)
+        for step, pks in by_step.items():
+            Review.objects.filter(pk__in=pks).update(likes_count=F("likes_count") - step)
+    return updated
+
+
+# ---------- Сигналы ----------
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    """Фильм и оценка до изменения, чтобы убрать их из агрегатов"""
+    instance._rating_before = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._rating_before = (
+            Review.objects.filter(pk=instance.pk).values_list("movie_id", "rating").first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    before = getattr(instance, "_rating_before", None)
+    if before is None:
+        adjust_movie_rating(instance.movie_id, added=instance.rating)
+    elif before != (instance.movie_id, instance.rating):
+        old_movie_id, old_rating = before
+        if old_movie_id == instance.movie_id:
+            adjust_movie_rating(instance.movie_id, removed=old_rating, added=instance.rating)
+        else:
+            adjust_movie_rating(old_movie_id, removed=old_rating)
+            adjust_movie_rating(instance.movie_id, added=instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # удаление идёт в транзакции Collector, агрегаты откатятся вместе с ним
+    adjust_movie_rating(instance.movie_id, removed=instance.rating)
+
+
+@receiver(post_save, sender=ReviewLike)
+def review_liked(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: like_counter.add(instance.review_id, 1))
+
+
+@receiver(post_delete, sender=ReviewLike)
+def review_unliked(sender, instance, **kwargs):
+    transaction.on_commit(lambda: like_counter.add(instance.review_id, -1))
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Review, Comment, ReviewLike
+from .like_counter import like_counter
+from .models import Review, Comment, ReviewLike, ReviewTrending
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
@@ -9,9 +10,20 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ["id", "author", "content", "created_at"]
         read_only_fields = ["author"]
 
+class ReviewListSerializer(serializers.ListSerializer):
+    """Отложенные дельты лайков для всей страницы одним запросом к кэшу"""
+
+    def to_representation(self, data):
+        reviews = list(data.all() if hasattr(data, "all") else data)
+        pending = like_counter.pending([review.pk for review in reviews])
+        for review in reviews:
+            review.pending_likes = pending.get(review.pk, 0)
+        return super().to_representation(reviews)
+
 class ReviewSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
     likes_count = serializers.SerializerMethodField(read_only=True)
+    comments_count = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Review
@@ -25,14 +37,37 @@ class ReviewSerializer(serializers.ModelSerializer):
             "created_at",
             "comments",
             "likes_count",
+            "comments_count",
         ]
         read_only_fields = ["author"]
+        list_serializer_class = ReviewListSerializer
 
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        pending = getattr(obj, "pending_likes", None)
+        return obj.current_likes() if pending is None else obj.likes_count + pending
+
+    # Списки ReviewViewSet приносят счётчик комментариев аннотацией, остальные пути считают сами
+    def get_comments_count(self, obj):
+        total = getattr(obj, "comments_total", None)
+        return obj.comments.count() if total is None else total
 
 class ReviewLikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReviewLike
         fields = ["id", "review", "user", "created_at"]
-        read_only_fields = ["user"]
\ No newline at end of file
+        read_only_fields = ["user"]
+
+class TrendingReviewSerializer(serializers.ModelSerializer):
+    """Отзыв в снимке популярных: без счётчиков, они берутся из снимка"""
+    author = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ["id", "movie", "author", "title", "content", "rating", "created_at"]
+
+class ReviewTrendingSerializer(serializers.ModelSerializer):
+    review = TrendingReviewSerializer(read_only=True)
+
+    class Meta:
+        model = ReviewTrending
+        fields = ["position", "score", "likes", "comments", "computed_at", "review"]
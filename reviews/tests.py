@@ -1,3 +1,344 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from movies.models import Movie
+from users.models import User
+from .like_counter import GAP_GRACE, GAP_KEY, SEQ_KEY, like_counter
+from .models import Review, Comment, ReviewLike, ReviewTrending, recount_movie_ratings
+from .trending import CACHE_KEY as TRENDING_KEY, refresh_trending
+
+
+# рассылка в ленты в потоке запроса: фоновый поток не видит незакоммиченных строк теста
+@override_settings(FEED={"WORKERS": 0})
+class ReviewListQueriesTest(TestCase):
+    """Список отзывов укладывается в фиксированный бюджет запросов"""
+
+    # отзывы с автором и счётчиками + id комментариев
+    QUERY_BUDGET = 2
+    # несброшенные лайки страницы одним get_many к общему кэшу (таблица shared_cache без Redis)
+    SHARED_CACHE_BUDGET = 1
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.movie = Movie.objects.create(title="Фильм")
+        self.users = [
+            User.objects.create_user(email=f"user{i}@example.com", username=f"user{i}", password="pass")
+            for i in range(3)
+        ]
+        self.reviews = []
+
+    def add_reviews(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_reviews(count)
+
+    def _add_reviews(self, count):
+        for i in range(len(self.reviews), len(self.reviews) + count):
+            review = Review.objects.create(
+                movie=self.movie, author=self.users[i % 3], title=f"Отзыв {i}", content="Текст", rating=4
+            )
+            for user in self.users[: i % 3 + 1]:
+                ReviewLike.objects.create(review=review, user=user)
+                Comment.objects.create(review=review, author=user, content="Комментарий")
+            self.reviews.append(review)
+
+    def test_list_fits_query_budget(self):
+        for count in (2, 20):
+            self.add_reviews(count)
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get("/api/reviews/")
+            self.assertEqual(response.status_code, 200)
+            shared = [query["sql"] for query in captured if "shared_cache" in query["sql"]]
+            self.assertEqual(len(shared), self.SHARED_CACHE_BUDGET, shared)
+            self.assertEqual(len(captured) - len(shared), self.QUERY_BUDGET, [query["sql"] for query in captured])
+            self.assertEqual(len(response.data["results"]), len(self.reviews))
+
+    def test_counts_match_rows(self):
+        self.add_reviews(5)
+        response = self.client.get("/api/reviews/")
+        for item in response.data["results"]:
+            review = Review.objects.get(pk=item["id"])
+            self.assertEqual(item["likes_count"], review.likes.count())
+            self.assertEqual(item["comments_count"], review.comments.count())
+            self.assertEqual(sorted(item["comments"]), sorted(review.comments.values_list("pk", flat=True)))
+            self.assertEqual(item["author"], str(review.author))
+
+
+class ReviewLikeToggleTest(TestCase):
+    """Лайк идемпотентен, счётчик копится в кэше и переносится flush"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="fan@example.com", username="fan", password="pass")
+        self.client.force_authenticate(self.user)
+        author = User.objects.create_user(email="author@example.com", username="author", password="pass")
+        self.review = Review.objects.create(
+            movie=Movie.objects.create(title="Фильм"), author=author, title="Отзыв", content="Текст", rating=5
+        )
+        self.url = f"/api/reviews/{self.review.pk}/like/"
+
+    def request(self, method):
+        # счётчик обновляется после коммита, а TestCase держит транзакцию открытой
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(self.url)
+
+    def test_toggle_is_idempotent(self):
+        self.assertEqual(self.request("post").status_code, 201)
+        response = self.request("post")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+        self.assertEqual(self.review.current_likes(), 1)
+
+        self.assertFalse(self.request("delete").data["liked"])
+        self.assertEqual(self.request("delete").data, {"liked": False, "likes_count": 0})
+        self.assertEqual(ReviewLike.objects.filter(review=self.review).count(), 0)
+
+    def test_flush_moves_pending_delta_to_row(self):
+        self.request("post")
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.likes_count, 0)
+        self.assertEqual(self.review.current_likes(), 1)
+
+        self.assertEqual(like_counter.flush(), (1, 1))
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.likes_count, 1)
+        self.assertEqual(like_counter.pending([self.review.pk]), {})
+        self.assertEqual(like_counter.flush(), (0, 0))
+        self.assertEqual(self.client.get(f"/api/reviews/{self.review.pk}/").data["likes_count"], 1)
+
+    def test_flush_waits_for_unwritten_log_entry(self):
+        # номер выдан другим процессом, но запись журнала ещё не сделана
+        cache = like_counter.cache
+        cache.add(SEQ_KEY, 0, None)
+        cache.incr(SEQ_KEY)
+        self.request("post")
+        self.assertEqual(like_counter.flush(), (0, 0))
+        self.assertEqual(like_counter.pending([self.review.pk]), {self.review.pk: 1})
+
+        # запись так и не появилась: через GAP_GRACE пропуск считается брошенным
+        seq, seen_at = cache.get(GAP_KEY)
+        cache.set(GAP_KEY, (seq, seen_at - GAP_GRACE), None)
+        self.assertEqual(like_counter.flush(), (1, 1))
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.likes_count, 1)
+
+
+class ReviewQueryPlanTest(TestCase):
+    """Фильтры и сортировки отзывов читают таблицу по индексу и без сортировки в памяти"""
+
+    CASES = [
+        "/api/reviews/",
+        "/api/reviews/?ordering=-likes",
+        "/api/reviews/?movie=1",
+        "/api/reviews/?movie=1&ordering=-likes",
+        "/api/reviews/?movie=1&ordering=-likes&rating_min=4",
+        "/api/reviews/?movie=1&rating_min=4",
+        "/api/reviews/?author=1",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        movies = [Movie.objects.create(title=f"Фильм {i}") for i in range(3)]
+        users = [
+            User.objects.create_user(email=f"user{i}@example.com", username=f"user{i}", password="pass")
+            for i in range(3)
+        ]
+        for i in range(30):
+            Review.objects.create(
+                movie=movies[i % 3], author=users[i % 3], title=f"Отзыв {i}", content="Текст", rating=1 + i % 5
+            )
+
+    def assert_uses_index(self, url):
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            if sql.startswith('SELECT "reviews_review"'):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(queries, url)
+        for sql, params in queries:
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                plan = [row[3] for row in cursor.fetchall()]
+            for step in plan:
+                if step.startswith(("SCAN", "SEARCH")):
+                    self.assertIn(" USING ", step, f"{url}: {plan}")
+                self.assertNotIn("TEMP B-TREE", step, f"{url}: {plan}")
+        return response
+
+    def test_filters_use_indexes(self):
+        for url in self.CASES:
+            with self.subTest(url=url):
+                response = self.assert_uses_index(url + ("&" if "?" in url else "?") + "page_size=3")
+                next_link = response.json()["next"]
+                if next_link:
+                    self.assert_uses_index(next_link.replace("http://testserver", ""))
+
+
+class ReviewTrendingTest(TestCase):
+    """Свежие события весят больше старых, /trending/ читает снимок из кэша"""
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        movie = Movie.objects.create(title="Фильм")
+        self.users = [
+            User.objects.create_user(email=f"user{i}@example.com", username=f"user{i}", password="pass")
+            for i in range(6)
+        ]
+        self.fresh, self.old, self.stale = [
+            Review.objects.create(movie=movie, author=self.users[0], title=title, content="Текст", rating=3)
+            for title in ("Свежий", "Старый", "Забытый")
+        ]
+        Review.objects.update(created_at=self.now - timedelta(days=30))
+        # два свежих лайка против четырёх трёхдневной давности и лайков вне окна
+        self.react(self.fresh, self.users[:2], timedelta(hours=1))
+        self.react(self.old, self.users[:4], timedelta(days=3))
+        self.react(self.stale, self.users, timedelta(days=10))
+        Comment.objects.create(review=self.old, author=self.users[5], content="Комментарий")
+        Comment.objects.update(created_at=self.now - timedelta(days=3))
+
+    def react(self, review, users, age):
+        for user in users:
+            ReviewLike.objects.create(review=review, user=user)
+        ReviewLike.objects.filter(review=review).update(created_at=self.now - age)
+
+    def test_snapshot_ranks_decayed_score(self):
+        self.assertEqual(refresh_trending(self.now), 2)
+        rows = list(ReviewTrending.objects.values_list("review_id", "position", "likes", "comments"))
+        self.assertEqual(rows, [(self.fresh.pk, 1, 2, 0), (self.old.pk, 2, 4, 1)])
+        fresh, old = ReviewTrending.objects.values_list("score", flat=True)
+        self.assertAlmostEqual(fresh, 2 * 0.5 ** (1 / 24), places=6)
+        self.assertLess(old, fresh)
+
+    def test_endpoint_serves_cached_snapshot(self):
+        refresh_trending(self.now)
+        response = self.client.get("/api/reviews/trending/")
+        self.assertEqual([item["review"]["id"] for item in response.data["results"]], [self.fresh.pk, self.old.pk])
+        # повтор читает только общий кэш: снимок и отзывы из базы не запрашиваются
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get("/api/reviews/trending/").data, response.data)
+        self.assertFalse([query for query in queries if "reviews_" in query["sql"]])
+        self.assertIsNotNone(caches["shared"].get(TRENDING_KEY))
+
+        # команда в другом процессе сбрасывает ответ в общем кэше, а не в своём локальном
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_trending(self.now + timedelta(days=5))
+        self.assertIsNone(caches["shared"].get(TRENDING_KEY))
+        results = self.client.get("/api/reviews/trending/").data["results"]
+        self.assertEqual([item["review"]["id"] for item in results], [self.fresh.pk])
+
+
+@override_settings(FEED={"WORKERS": 0})
+class ReviewCommentThreadTest(TestCase):
+    """Обсуждение отзыва по страницам и первые комментарии нескольких отзывов одним запросом"""
+
+    def setUp(self):
+        self.client = APIClient()
+        movie = Movie.objects.create(title="Фильм")
+        self.user = User.objects.create_user(email="user@example.com", username="user", password="pass")
+        self.long, self.short, self.empty = [
+            Review.objects.create(movie=movie, author=self.user, title=title, content="Текст", rating=4)
+            for title in ("Длинное", "Короткое", "Пустое")
+        ]
+        now = timezone.now()
+        self.thread = []
+        for i in range(5):
+            comment = Comment.objects.create(review=self.long, author=self.user, content=f"Комментарий {i}")
+            # пары с одинаковым временем: порядок внутри пары держит pk
+            Comment.objects.filter(pk=comment.pk).update(created_at=now + timedelta(minutes=i // 2))
+            self.thread.append(comment.pk)
+        self.reply = Comment.objects.create(review=self.short, author=self.user, content="Ответ").pk
+
+    def get(self, url):
+        response = self.client.get(url.replace("http://testserver", ""))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def walk(self, url):
+        ids = []
+        while url:
+            data = self.get(url)
+            ids.extend(item["id"] for item in data["results"])
+            url = data["next"]
+        return ids
+
+    def test_thread_pages_oldest_first(self):
+        self.assertEqual(self.walk(f"/api/reviews/{self.long.pk}/comments/?page_size=2"), self.thread)
+        self.assertEqual(self.walk(f"/api/reviews/{self.empty.pk}/comments/"), [])
+
+    def test_batch_returns_first_comments_and_next_cursor(self):
+        with self.assertNumQueries(1):
+            data = self.get(f"/api/reviews/comments/?review={self.long.pk},{self.short.pk},{self.empty.pk}&limit=2")
+        threads = {thread["review"]: thread for thread in data["results"]}
+        self.assertEqual(list(threads), [self.long.pk, self.short.pk, self.empty.pk])
+        self.assertEqual([item["id"] for item in threads[self.long.pk]["comments"]], self.thread[:2])
+        self.assertEqual([item["id"] for item in threads[self.short.pk]["comments"]], [self.reply])
+        self.assertEqual(threads[self.empty.pk]["comments"], [])
+        self.assertIsNone(threads[self.short.pk]["next"])
+        self.assertIsNone(threads[self.empty.pk]["next"])
+        # next продолжает обсуждение во вложенном эндпоинте сразу после показанных
+        self.assertEqual(self.walk(threads[self.long.pk]["next"]), self.thread[2:])
+
+    def test_batch_rejects_bad_parameters(self):
+        for query in ("", "review=a", f"review={self.long.pk}&limit=0", f"review={self.long.pk}&limit=21",
+                      "review=" + ",".join(str(i) for i in range(1, 102))):
+            with self.subTest(query):
+                self.assertEqual(self.client.get(f"/api/reviews/comments/?{query}").status_code, 400)
+
+
+class MovieRatingAggregateTest(TestCase):
+    """Сумма, число и гистограмма оценок фильма следуют за отзывами"""
+
+    def setUp(self):
+        self.movies = [Movie.objects.create(title=f"Фильм {i}") for i in range(2)]
+        self.user = User.objects.create_user(email="user@example.com", username="user", password="pass")
+
+    def review(self, movie, rating):
+        return Review.objects.create(movie=movie, author=self.user, title="Отзыв", content="Текст", rating=rating)
+
+    def assert_rating(self, movie, total, count, histogram):
+        movie = Movie.objects.get(pk=movie.pk)
+        self.assertEqual((movie.rating_sum, movie.rating_count), (total, count))
+        self.assertEqual([getattr(movie, f"rating_{value}") for value in range(1, 6)], histogram)
+        if count:
+            self.assertAlmostEqual(movie.rating_avg, total / count)
+        else:
+            self.assertIsNone(movie.rating_avg)
+
+    def test_create_change_move_and_delete(self):
+        first, second = self.movies
+        review = self.review(first, 5)
+        self.review(first, 3)
+        self.assert_rating(first, 8, 2, [0, 0, 1, 0, 1])
+
+        review.rating = 1
+        review.save()
+        self.assert_rating(first, 4, 2, [1, 0, 1, 0, 0])
+
+        # перенос на другой фильм с новой оценкой
+        review.movie, review.rating = second, 4
+        review.save()
+        self.assert_rating(first, 3, 1, [0, 0, 1, 0, 0])
+        self.assert_rating(second, 4, 1, [0, 0, 0, 1, 0])
+
+        # сохранение без изменения оценки агрегаты не трогает
+        review.title = "Новый заголовок"
+        review.save()
+        self.assert_rating(second, 4, 1, [0, 0, 0, 1, 0])
+
+        review.delete()
+        self.assert_rating(second, 0, 0, [0, 0, 0, 0, 0])
+        self.assertEqual(recount_movie_ratings(), 2)
+        self.assert_rating(first, 3, 1, [0, 0, 1, 0, 0])
@@ -0,0 +1,117 @@
+"""
+Популярные отзывы недели.
+
+Счёт отзыва — сумма событий за последние WINDOW_DAYS дней с затуханием
+0.5 ** (возраст в часах / HALF_LIFE_HOURS): лайк весит WEIGHTS["like"],
+комментарий — WEIGHTS["comment"], сам отзыв — WEIGHTS["rating"] * оценка.
+Лайк часовой давности весит вдвое больше лайка, поставленного HALF_LIFE_HOURS
+назад, события старше окна не учитываются.
+
+Расчёт идёт одним SQL-запросом (SQLite, как и search/index.py): события
+окна читаются по индексам created_at, затухание считается от точного
+возраста события в часах, позиция — ROW_NUMBER() OVER.
+Первые SIZE отзывов записываются в ReviewTrending командой
+refresh_review_trending, /api/reviews/trending/ отдаёт снимок из общего
+кэша CACHE: команда работает в своём процессе и сбрасывает ответ для всех
+веб-воркеров сразу после коммита нового снимка.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Comment, Review, ReviewLike, ReviewTrending
+
+CACHE_KEY = "reviews:trending"
+
+TRENDING_SQL = """
+WITH events AS (
+    SELECT review_id, created_at, %(like)s AS weight, 1 AS is_like, 0 AS is_comment
+    FROM {likes} WHERE created_at >= %(since)s AND created_at <= %(now)s
+    UNION ALL
+    SELECT review_id, created_at, %(comment)s, 0, 1
+    FROM {comments} WHERE created_at >= %(since)s AND created_at <= %(now)s
+    UNION ALL
+    SELECT id, created_at, %(rating)s * rating, 0, 0
+    FROM {reviews} WHERE created_at >= %(since)s AND created_at <= %(now)s
+),
+aged AS (
+    SELECT review_id, weight, is_like, is_comment,
+           (julianday(%(now)s) - julianday(created_at)) * 24 AS age
+    FROM events
+),
+scored AS (
+    SELECT review_id, SUM(weight * POWER(0.5, age / %(half_life)s)) AS score,
+           SUM(is_like) AS likes, SUM(is_comment) AS comments
+    FROM aged
+    GROUP BY review_id
+)
+SELECT review_id, score, likes, comments,
+       ROW_NUMBER() OVER (ORDER BY score DESC, review_id DESC) AS position
+FROM scored
+WHERE score > 0
+ORDER BY position
+LIMIT %(size)s
+"""
+
+
+def _config():
+    config = getattr(settings, "REVIEW_TRENDING", {})
+    weights = {"like": 1.0, "comment": 2.0, "rating": 0.2, **config.get("WEIGHTS", {})}
+    return {
+        "window_days": config.get("WINDOW_DAYS", 7),
+        "half_life_hours": config.get("HALF_LIFE_HOURS", 24),
+        "weights": weights,
+        "size": config.get("SIZE", 50),
+        "cache": config.get("CACHE", "shared"),
+        "cache_timeout": config.get("CACHE_TIMEOUT", 600),
+    }
+
+
+def compute_trending(now=None):
+    """[(review_id, score, likes, comments, position)] на момент now"""
+    config = _config()
+    now = now or timezone.now()
+    adapt = connection.ops.adapt_datetimefield_value
+    sql = TRENDING_SQL.format(
+        likes=ReviewLike._meta.db_table, comments=Comment._meta.db_table, reviews=Review._meta.db_table
+    )
+    params = {
+        "since": adapt(now - timedelta(days=config["window_days"])),
+        "now": adapt(now),
+        "half_life": float(config["half_life_hours"]),
+        "size": config["size"],
+        **config["weights"],
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def refresh_trending(now=None):
+    """Пересобирает ReviewTrending, возвращает число отзывов в снимке"""
+    now = now or timezone.now()
+    rows = [
+        ReviewTrending(review_id=review_id, score=score, likes=likes, comments=comments,
+                       position=position, computed_at=now)
+        for review_id, score, likes, comments, position in compute_trending(now)
+    ]
+    cache = caches[_config()["cache"]]
+    with transaction.atomic():
+        ReviewTrending.objects.all().delete()
+        ReviewTrending.objects.bulk_create(rows)
+        transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+    return len(rows)
+
+
+def cached_trending(build):
+    """Готовый ответ из кэша; build() собирает его из снимка при промахе"""
+    config = _config()
+    cache = caches[config["cache"]]
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        data = build()
+        cache.set(CACHE_KEY, data, config["cache_timeout"])
+    return data
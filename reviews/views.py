@@ -1,20 +1,150 @@
-from rest_framework import viewsets, permissions
-from .models import Review, Comment, ReviewLike
-from .serializers import ReviewSerializer, CommentSerializer, ReviewLikeSerializer
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from core.filters import CatalogFilter, KeysetOrderingMixin
+from core.pagination import KeysetPagination
+from .models import Review, Comment, ReviewLike, ReviewTrending
+from .serializers import ReviewSerializer, CommentSerializer, ReviewLikeSerializer, ReviewTrendingSerializer
+from .trending import cached_trending
 from .permissions import IsAdminOrReadOnly
 
+# Комментарии отзыва идут от старых к новым (индекс comment_review_created_idx)
+COMMENT_ORDERING = ("created_at", "pk")
+MAX_BATCH_REVIEWS = 100
+MAX_BATCH_COMMENTS = 20
 
-class ReviewViewSet(viewsets.ModelViewSet):
+
+def count_per_review(model):
+    """Коррелированный подзапрос COUNT(*) по review_id (без JOIN, строки не размножаются)"""
+    counts = (
+        model.objects.filter(review=OuterRef("pk"))
+        .order_by()
+        .values("review")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class ReviewViewSet(KeysetOrderingMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
+    filter_backends = [CatalogFilter]
+    id_filters = {"movie": "movie", "author": "author"}
+    range_filters = {"rating": "rating"}
+    # likes — сохранённый счётчик, лайки из кэша учитываются после flush_review_likes
+    ordering_fields = {"date": "created_at", "likes": "likes_count"}
+    default_ordering = "-date"
+
+    def get_queryset(self):
+        """Автор, счётчик и id комментариев — фиксированное число запросов на весь список"""
+        if self.action not in ("list", "retrieve"):
+            return Review.objects.all()
+        return (
+            Review.objects.select_related("author")
+            .annotate(comments_total=count_per_review(Comment))
+            .prefetch_related(Prefetch("comments", queryset=Comment.objects.only("pk", "review_id")))
+        )
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=True, methods=["post", "delete"], permission_classes=[permissions.IsAuthenticated])
+    def like(self, request, pk=None):
+        """POST ставит лайк, DELETE снимает; повтор ничего не меняет"""
+        review = self.get_object()
+        if request.method == "POST":
+            changed = review.like(request.user)
+        else:
+            changed = review.unlike(request.user)
+        liked = request.method == "POST"
+        return Response(
+            {"liked": liked, "likes_count": review.current_likes()},
+            status=status.HTTP_201_CREATED if liked and changed else status.HTTP_200_OK,
+        )
+
+
+    @action(detail=True, methods=["get"])
+    def comments(self, request, pk=None):
+        """Обсуждение отзыва от старых комментариев к новым, keyset-страницами"""
+        review = self.get_object()
+        paginator = KeysetPagination(ordering=COMMENT_ORDERING)
+        page = paginator.paginate_queryset(
+            Comment.objects.filter(review=review).select_related("author"), request
+        )
+        return paginator.get_paginated_response(CommentSerializer(page, many=True).data)
+
+    @action(detail=False, methods=["get"], url_path="comments", url_name="comments-batch")
+    def comments_batch(self, request):
+        """
+        Первые limit комментариев сразу для нескольких отзывов (экран ленты):
+        GET /api/reviews/comments/?review=1,2,3&limit=3. Один запрос с
+        ROW_NUMBER() по отзыву; next ведёт на продолжение обсуждения.
+        """
+        try:
+            review_ids = list(dict.fromkeys(
+                int(value) for value in request.query_params.get("review", "").split(",") if value
+            ))
+            limit = int(request.query_params.get("limit", 3))
+        except ValueError:
+            raise ValidationError({"detail": "review — список id через запятую, limit — целое число"})
+        if not review_ids or len(review_ids) > MAX_BATCH_REVIEWS:
+            raise ValidationError({"review": f"Укажите от 1 до {MAX_BATCH_REVIEWS} id отзывов"})
+        if not 1 <= limit <= MAX_BATCH_COMMENTS:
+            raise ValidationError({"limit": f"Должно быть от 1 до {MAX_BATCH_COMMENTS}"})
+
+        # limit + 1 строка на отзыв, чтобы знать, есть ли продолжение
+        ranked = (
+            Comment.objects.filter(review_id__in=review_ids)
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=[F("review_id")],
+                order_by=[F("created_at").asc(), F("pk").asc()],
+            ))
+            .filter(position__lte=limit + 1)
+            .select_related("author")
+            .order_by("review_id", "position")
+        )
+        threads = {}
+        for comment in ranked:
+            threads.setdefault(comment.review_id, []).append(comment)
+
+        paginator = KeysetPagination(ordering=COMMENT_ORDERING)
+        results = []
+        for review_id in review_ids:
+            comments = threads.get(review_id, [])
+            next_link = None
+            if len(comments) > limit:
+                comments = comments[:limit]
+                last = comments[-1]
+                url = reverse("reviews-comments", args=[review_id], request=request)
+                cursor = paginator.encode_cursor([last.created_at.isoformat(), last.pk])
+                next_link = replace_query_param(url, paginator.cursor_query_param, cursor)
+            results.append({
+                "review": review_id,
+                "comments": CommentSerializer(comments, many=True).data,
+                "next": next_link,
+            })
+        return Response({"results": results})
+
+    @action(detail=False, methods=["get"])
+    def trending(self, request):
+        """Популярные отзывы недели из снимка ReviewTrending (команда refresh_review_trending)"""
+        data = cached_trending(lambda: ReviewTrendingSerializer(
+            ReviewTrending.objects.select_related("review__author"), many=True
+        ).data)
+        return Response({"results": data})
+
 
 class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related("author")
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
@@ -28,4 +158,7 @@ class ReviewLikeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        review = serializer.validated_data["review"]
+        if not review.like(self.request.user):
+            raise ValidationError({"review": "Вы уже лайкнули этот отзыв"})
+        serializer.instance = ReviewLike.objects.get(review=review, user=self.request.user)
@@ -0,0 +1,79 @@
+"""
+Полнотекстовый поиск по каталогу на SQLite FTS5.
+
+Виртуальная таблица search_index (миграция 0001) содержит заголовок и текст
+фильмов, сериалов и людей из users и movies; триггеры на исходных таблицах
+держат её в актуальном состоянии, так что приложение само в индекс не пишет.
+Тип и id объекта закодированы в rowid (id * 4 + код типа), поэтому
+обновление и удаление строки индекса — поиск по первичному ключу.
+"""
+import html
+import re
+
+from django.db import connection
+
+# Порядок задаёт код типа в rowid и совпадает с SOURCES в миграции
+KINDS = ("movie", "series", "catalog_movie", "person")
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+SNIPPET_TOKENS = 12
+HIGHLIGHT = ("<mark>", "</mark>")
+# FTS5 вставляет в snippet эти символы из области частного использования,
+# после экранирования текста они заменяются на HIGHLIGHT
+_MARKERS = ("\ue000", "\ue001")
+
+_WORD = re.compile(r"\w+")
+
+
+def build_query(text):
+    """
+    Строка пользователя -> выражение MATCH: каждое слово ищется по префиксу,
+    все слова обязательны. Синтаксис FTS5 из ввода не пропускается.
+    """
+    return " ".join(f'"{word}"*' for word in _WORD.findall(text))
+
+
+def highlight(snippet):
+    """Экранирует текст фрагмента как HTML, оставляя только теги подсветки"""
+    escaped = html.escape(snippet)
+    for marker, tag in zip(_MARKERS, HIGHLIGHT):
+        escaped = escaped.replace(marker, tag)
+    return escaped
+
+
+def search(text, kinds=None, limit=20, offset=0):
+    """
+    [{type, id, title, snippet, score}] по убыванию релевантности (BM25).
+    snippet — готовый HTML с <mark>, title — обычный текст.
+    """
+    query = build_query(text)
+    if not query:
+        return []
+    sql = (
+        "SELECT rowid, title, snippet(search_index, -1, %s, %s, '…', %s), "
+        "bm25(search_index, %s, %s) AS score "
+        "FROM search_index WHERE search_index MATCH %s"
+    )
+    params = [*_MARKERS, SNIPPET_TOKENS, TITLE_WEIGHT, BODY_WEIGHT, query]
+    if kinds:
+        codes = [KINDS.index(kind) for kind in kinds]
+        sql += f" AND rowid %% {len(KINDS)} IN ({', '.join(['%s'] * len(codes))})"
+        params += codes
+    sql += " ORDER BY score LIMIT %s OFFSET %s"
+    params += [limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    results = []
+    for rowid, title, snippet, score in rows:
+        object_id, code = divmod(rowid, len(KINDS))
+        # bm25 в SQLite отрицательный: чем меньше, тем релевантнее
+        results.append({
+            "type": KINDS[code],
+            "id": object_id,
+            "title": title,
+            "snippet": highlight(snippet),
+            "score": round(-score, 4),
+        })
+    return results
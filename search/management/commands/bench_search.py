@@ -0,0 +1,87 @@
+import random
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.index import build_query
+
+SYLLABLES = ["ка", "ро", "ми", "ла", "то", "не", "ст", "ва", "ри", "до", "ше", "лу", "зо", "пе", "гра", "мо"]
+
+
+def _vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает поиск через FTS5 (MATCH + bm25, как в /api/search/) с LIKE-сканом, "
+        "в который превращается icontains, на синтетической таблице в памяти"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=20)
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        vocabulary = _vocabulary(rng, 20_000)
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, title TEXT, description TEXT)")
+        db.execute(
+            "CREATE VIRTUAL TABLE item_fts USING fts5("
+            "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+        started = time.perf_counter()
+        batch = []
+        for pk in range(1, options["rows"] + 1):
+            title = " ".join(rng.choices(vocabulary, k=rng.randint(1, 4)))
+            description = " ".join(rng.choices(vocabulary, k=rng.randint(10, 30)))
+            batch.append((pk, title, description))
+            if len(batch) == 10_000 or pk == options["rows"]:
+                db.executemany("INSERT INTO item VALUES (?, ?, ?)", batch)
+                db.executemany("INSERT INTO item_fts(rowid, title, body) VALUES (?, ?, ?)", batch)
+                batch = []
+        db.commit()
+        self.stdout.write(f"Подготовлено {options['rows']} строк за {time.perf_counter() - started:.1f} с")
+
+        # половина запросов — целое слово, половина — префикс (как при вводе с клавиатуры)
+        terms = [rng.choice(vocabulary) for _ in range(options["queries"])]
+        terms = [term if i % 2 else term[:4] for i, term in enumerate(terms)]
+
+        like_sql = (
+            "SELECT id, title FROM item WHERE title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\' "
+            "LIMIT ?"
+        )
+        fts_sql = (
+            "SELECT rowid, title, snippet(item_fts, -1, '<mark>', '</mark>', '…', 12), "
+            "bm25(item_fts, 10.0, 1.0) AS score FROM item_fts WHERE item_fts MATCH ? ORDER BY score LIMIT ?"
+        )
+        like_count_sql = "SELECT count(*) FROM item WHERE title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\'"
+        fts_count_sql = "SELECT count(*) FROM item_fts WHERE item_fts MATCH ?"
+
+        like = self.measure(db, like_sql, [(f"%{t}%", f"%{t}%", options["limit"]) for t in terms])
+        fts = self.measure(db, fts_sql, [(build_query(t), options["limit"]) for t in terms])
+        like_count = self.measure(db, like_count_sql, [(f"%{t}%", f"%{t}%") for t in terms])
+        fts_count = self.measure(db, fts_count_sql, [(build_query(t),) for t in terms])
+
+        # LIKE с LIMIT останавливается на первых совпадениях и ничего не ранжирует;
+        # подсчёт (пагинация, "найдено N") всегда читает таблицу целиком
+        self.stdout.write(f"Первая страница: icontains {like * 1000:.1f} мс (без ранжирования), "
+                          f"FTS5 + bm25 {fts * 1000:.1f} мс")
+        self.stdout.write(f"Подсчёт совпадений: icontains {like_count * 1000:.1f} мс, FTS5 {fts_count * 1000:.1f} мс")
+        if fts_count:
+            self.stdout.write(self.style.SUCCESS(f"Ускорение подсчёта: x{like_count / fts_count:.1f}"))
+
+    @staticmethod
+    def measure(db, sql, params_list):
+        started = time.perf_counter()
+        for params in params_list:
+            db.execute(sql, params).fetchall()
+        return (time.perf_counter() - started) / len(params_list)
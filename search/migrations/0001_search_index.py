@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# (код типа, таблица, индексируемые колонки, выражение заголовка, выражение текста);
+# код типа входит в rowid индекса: rowid = id * 4 + код (см. search.index.KINDS)
+SOURCES = [
+    (0, "users_movie", "title, description", "{row}.title", "coalesce({row}.description, '')"),
+    (1, "users_series", "title, description", "{row}.title", "coalesce({row}.description, '')"),
+    (2, "movies_movie", "title, description", "{row}.title", "{row}.description"),
+    (3, "movies_person", "name", "{row}.name", "''"),
+]
+
+
+def forward_sql():
+    statements = [
+        "CREATE VIRTUAL TABLE search_index USING fts5("
+        "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    ]
+    for code, table, columns, title, body in SOURCES:
+        new = {"row": "new"}
+        title_new, body_new = title.format(**new), body.format(**new)
+        statements += [
+            f"INSERT INTO search_index(rowid, title, body) "
+            f"SELECT id * 4 + {code}, {title.format(row=table)}, {body.format(row=table)} FROM {table}",
+            f"CREATE TRIGGER search_{table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO search_index(rowid, title, body) VALUES (new.id * 4 + {code}, {title_new}, {body_new}); END",
+            f"CREATE TRIGGER search_{table}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+            f"UPDATE search_index SET title = {title_new}, body = {body_new} WHERE rowid = old.id * 4 + {code}; END",
+            f"CREATE TRIGGER search_{table}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; END",
+        ]
+    return statements
+
+
+def reverse_sql():
+    statements = []
+    for _, table, *_ in SOURCES:
+        statements += [f"DROP TRIGGER IF EXISTS search_{table}_{suffix}" for suffix in ("ai", "au", "ad")]
+    return statements + ["DROP TABLE IF EXISTS search_index"]
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("users", "0005_profile_suggestions"),
+        ("movies", "0002_movie_document"),
+    ]
+
+    operations = [
+        migrations.RunSQL(forward_sql(), reverse_sql()),
+    ]
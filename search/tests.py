@@ -0,0 +1,63 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from movies.models import Person
+from users.models import Movie, Series
+
+
+class SearchTest(TestCase):
+    """FTS5-индекс ведут триггеры, заголовок весит больше текста, слова ищутся по префиксу"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.in_title = Movie.objects.create(title="Бегущий по лезвию", description="Репликанты", release_year=1982)
+        self.in_body = Series.objects.create(title="Сериал", description="Бегущий человек", start_year=2000)
+        self.person = Person.objects.create(name="Харрисон Форд", birth_date="1942-07-13", photo="people/ford.jpg")
+
+    def search(self, query, status_code=200):
+        response = self.client.get(f"/api/search/?{query}")
+        self.assertEqual(response.status_code, status_code, response.content)
+        return response.data
+
+    def found(self, query):
+        return [(item["type"], item["id"]) for item in self.search(query)["results"]]
+
+    def test_ranks_title_above_body_and_matches_prefixes(self):
+        results = self.search("q=бег")["results"]
+        self.assertEqual(
+            [(item["type"], item["id"]) for item in results],
+            [("movie", self.in_title.pk), ("series", self.in_body.pk)],
+        )
+        self.assertIn("<mark>Бегущий</mark>", results[0]["snippet"])
+        # все слова обязательны
+        self.assertEqual(self.found("q=бегущий лезв"), [("movie", self.in_title.pk)])
+        self.assertEqual(self.found("q=харрис&type=person,movie"), [("person", self.person.pk)])
+        self.assertEqual(self.found("q=бег&type=series"), [("series", self.in_body.pk)])
+        self.assertEqual(self.found("q=бег&limit=1&offset=1"), [("series", self.in_body.pk)])
+
+    def test_snippet_escapes_source_text(self):
+        Series.objects.create(title="Ловушка", description='<img src=x onerror="alert(1)"> капкан & <b>', start_year=2001)
+        (result,) = self.search("q=капкан")["results"]
+        self.assertEqual(
+            result["snippet"],
+            "&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <mark>капкан</mark> &amp; &lt;b&gt;",
+        )
+
+    def test_triggers_follow_updates_and_deletes(self):
+        self.in_title.title = "Другое название"
+        self.in_title.save()
+        self.assertEqual(self.found("q=лезвию"), [])
+        self.assertEqual(self.found("q=другое"), [("movie", self.in_title.pk)])
+        self.person.delete()
+        self.assertEqual(self.found("q=форд"), [])
+
+    def test_user_input_is_not_fts_syntax(self):
+        for query in ('q="бег', "q=бег OR NOT", "q=title:бег*", "q=(бег"):
+            with self.subTest(query):
+                self.search(query)
+        self.assertEqual(self.search("q=***")["results"], [])
+
+    def test_rejects_bad_parameters(self):
+        for query in ("q=", "q=бег&type=album", "q=бег&limit=x", "q=бег&limit=0", "q=бег&offset=-1"):
+            with self.subTest(query):
+                self.search(query, 400)
@@ -0,0 +1,36 @@
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .index import KINDS, search
+
+MAX_LIMIT = 100
+
+
+class SearchView(APIView):
+    """
+    GET /api/search/?q=...&type=movie,person&limit=20&offset=0
+    Поиск по фильмам, сериалам и людям с ранжированием BM25 и подсветкой совпадений.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            raise ValidationError({"q": "Укажите строку поиска"})
+
+        kinds = [kind for kind in request.query_params.get("type", "").split(",") if kind]
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise ValidationError({"type": f"Неизвестные типы: {', '.join(sorted(unknown))}"})
+
+        try:
+            limit = min(int(request.query_params.get("limit", 20)), MAX_LIMIT)
+            offset = int(request.query_params.get("offset", 0))
+        except ValueError:
+            raise ValidationError({"detail": "limit и offset должны быть целыми числами"})
+        if limit < 1 or offset < 0:
+            raise ValidationError({"detail": "limit должен быть > 0, offset >= 0"})
+
+        return Response({"results": search(text, kinds, limit, offset)})
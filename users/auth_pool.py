@@ -0,0 +1,86 @@
+"""
+Ограниченный пул для хэширования паролей при входе и регистрации.
+
+LoginView/RegisterView — обычные DRF-представления; в пул уходит только
+PBKDF2 (check_password/make_password, hashlib отпускает GIL), поиск
+пользователя и запись в БД остаются в потоке запроса. Под ASGI Django
+выполняет синхронное представление в отдельном потоке, event loop в это
+время обслуживает остальные запросы, а пул ограничивает, сколько хэшей
+считается одновременно. Число задач в работе и в очереди ограничено: при
+переполнении запрос сразу получает 503 с Retry-After, а не ждёт минутами.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PoolBusy(APIException):
+    """Очередь пула заполнена; DRF добавит Retry-After из wait"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Сервер перегружен, повторите запрос позже"
+    default_code = "pool_busy"
+
+    def __init__(self, wait=None):
+        super().__init__()
+        self.wait = wait
+
+
+class HashingPool:
+    def __init__(self, workers=None, max_queue=None):
+        config = getattr(settings, "AUTH_HASH_POOL", {})
+        self.workers = workers or config.get("WORKERS", 4)
+        self.max_pending = self.workers + (max_queue if max_queue is not None else config.get("MAX_QUEUE", 32))
+        self.retry_after = config.get("RETRY_AFTER", 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="auth-hash")
+        self._lock = threading.Lock()
+        self.pending = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                return False
+            self.pending += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def call(self, func, *args, **kwargs):
+        """Выполняет func в пуле и ждёт результат; PoolBusy, если очередь заполнена"""
+        if not self._acquire():
+            raise PoolBusy(wait=self.retry_after)
+        try:
+            return self.executor.submit(func, *args, **kwargs).result()
+        finally:
+            self._release()
+
+    def make_password(self, raw_password):
+        return self.call(make_password, raw_password)
+
+    def authenticate(self, email, password):
+        """
+        Как ModelBackend.authenticate, но PBKDF2 считается в пуле.
+        Для неизвестного email хэш тоже считается, чтобы время ответа не выдавало,
+        есть ли такой пользователь. Устаревший хэш пересчитывается, как в check_password.
+        """
+        User = get_user_model()
+        try:
+            user = User._default_manager.get_by_natural_key(email)
+        except User.DoesNotExist:
+            self.make_password(password)
+            return None
+        if not self.call(check_password, password, user.password):
+            return None
+        if identify_hasher(user.password).must_update(user.password):
+            user.password = self.make_password(password)
+            user.save(update_fields=["password"])
+        return user if user.is_active else None
+
+
+auth_pool = HashingPool()
@@ -0,0 +1,27 @@
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .revocation import revocation_store
+from .user_cache import user_cache
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    JWT-аутентификация, отклоняющая отозванные (после выхода) токены.
+    Пользователь берётся из кэша процесса (users/user_cache.py), а не из БД на каждый запрос.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        jti = token.get(api_settings.JTI_CLAIM)
+        if jti and revocation_store.is_revoked(jti):
+            raise InvalidToken({"detail": "Токен отозван", "code": "token_revoked"})
+        return token
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        # неактивных и несуществующих пользователей super().get_user отклоняет, в кэш они не попадают
+        return user_cache.get(user_id, lambda pk: super(JWTAuthentication, self).get_user(validated_token))
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User
+from users.user_cache import user_cache
+
+BENCH_EMAIL = "bench-auth@example.com"
+
+
+class Command(BaseCommand):
+    help = "Сравнивает запросы/с JWT-аутентификации с кэшем пользователей и без него"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--path", default="/api/messages/")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(email=BENCH_EMAIL, username="bench-auth", password=None)
+        access = str(RefreshToken.for_user(user).access_token)
+        client = Client(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        maxsize = user_cache.maxsize
+        try:
+            for label, size in (("без кэша", 0), ("с кэшем", maxsize or 10_000)):
+                user_cache.maxsize = size
+                user_cache.clear()
+                self.run(client, options["path"], options["requests"], label)
+        finally:
+            user_cache.maxsize = maxsize
+            user_cache.clear()
+
+    def run(self, client, path, count, label):
+        response = client.get(path)  # прогрев
+        if response.status_code != 200:
+            self.stderr.write(f"{path} вернул {response.status_code}")
+            return
+        # CaptureQueriesContext не подходит: request_started сбрасывает журнал запросов
+        queries = []
+
+        def count_queries(execute, sql, *args):
+            queries.append(sql)
+            return execute(sql, *args)
+
+        with connection.execute_wrapper(count_queries):
+            client.get(path)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.get(path)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label}: {count / elapsed:.0f} запр./с, SQL-запросов на запрос: {len(queries)}"
+        )
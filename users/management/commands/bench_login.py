@@ -0,0 +1,127 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.testing import ApplicationCommunicator
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from users.models import User
+
+BENCH_EMAIL = "bench-login@example.com"
+BENCH_PASSWORD = "bench-login-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест входа: один и тот же LoginView под одинаковой конкуренцией "
+        "в синхронной схеме (один WSGI-воркер, запросы по очереди) и в ASGI "
+        "(представление в своём потоке, хэширование в auth_pool). В обеих схемах "
+        "во время серии входов замеряется задержка лёгкого запроса GET /api/genres/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20, help="Сколько входов выполнить")
+        parser.add_argument("--concurrency", type=int, default=10, help="Одновременных клиентов в обеих схемах")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(email=BENCH_EMAIL, username="bench-login", password=BENCH_PASSWORD)
+        else:
+            user.set_password(BENCH_PASSWORD)
+            user.save()
+        body = {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+        count, concurrency = options["requests"], options["concurrency"]
+
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            self.report("sync", *self.run_sync(body, count, concurrency))
+            self.report("async", *asyncio.run(self.run_async(body, count, concurrency)))
+
+    def run_sync(self, body, count, concurrency):
+        # воркер один: клиенты идут параллельно, но запрос обрабатывается только под его замком
+        worker = threading.Lock()
+        latencies, statuses = [], []
+
+        def request(method, path, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                with worker:
+                    response = getattr(Client(), method)(path, **kwargs)
+            finally:
+                connections.close_all()
+            return response.status_code, time.perf_counter() - t0
+
+        def login(_):
+            code, latency = request("post", "/api/auth/login/", data=body, content_type="application/json")
+            statuses.append(code)
+            latencies.append(latency)
+
+        def probe():
+            time.sleep(0.05)
+            return request("get", "/api/genres/")[1]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency + 1) as executor:
+            probe_future = executor.submit(probe)
+            list(executor.map(login, range(count)))
+            probe_latency = probe_future.result()
+        elapsed = time.perf_counter() - started
+        return elapsed, latencies, statuses, probe_latency
+
+    async def asgi_request(self, application, method, path, body=b""):
+        """Запрос через настоящий ASGIHandler: sync-представление получает свой поток, как под uvicorn"""
+        communicator = ApplicationCommunicator(application, {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+        })
+        t0 = time.perf_counter()
+        await communicator.send_input({"type": "http.request", "body": body, "more_body": False})
+        start = await communicator.receive_output(timeout=300)
+        while (await communicator.receive_output(timeout=300)).get("more_body"):
+            pass
+        await communicator.wait()
+        return start["status"], time.perf_counter() - t0
+
+    async def run_async(self, body, count, concurrency):
+        application = ASGIHandler()
+        payload = json.dumps(body).encode()
+        limit = asyncio.Semaphore(concurrency)
+        latencies, statuses = [], []
+
+        async def login():
+            async with limit:
+                code, latency = await self.asgi_request(application, "POST", "/api/auth/login/", payload)
+                statuses.append(code)
+                latencies.append(latency)
+
+        async def probe():
+            await asyncio.sleep(0.05)
+            return (await self.asgi_request(application, "GET", "/api/genres/"))[1]
+
+        started = time.perf_counter()
+        results = await asyncio.gather(probe(), *(login() for _ in range(count)))
+        elapsed = time.perf_counter() - started
+        return elapsed, latencies, statuses, results[0]
+
+    def report(self, label, elapsed, latencies, statuses, probe):
+        ok = statuses.count(200)
+        latencies = sorted(latencies)
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        self.stdout.write(
+            f"{label}: {ok / elapsed:.2f} входов/с, успешно {ok}/{len(statuses)}, "
+            f"503: {statuses.count(503)}, p50 {statistics.median(latencies):.2f} с, p95 {p95:.2f} с, "
+            f"GET /api/genres/ во время нагрузки: {probe * 1000:.0f} мс"
+        )
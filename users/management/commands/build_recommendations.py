@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает item-item рекомендации: матрица профиль × объект по избранному "
+        "и отзывам, косинусное сходство блоками, лучшие соседи каждого объекта в ItemNeighbour"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--neighbours", type=int, help="Сколько соседей хранить на объект")
+        parser.add_argument("--chunk-cells", type=int, help="Размер блока матрицы сходства в ячейках")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        profiles, items, stored = refresh_recommendations(
+            top_n=options["neighbours"],
+            chunk_cells=options["chunk_cells"],
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Профилей: {profiles}, объектов: {items}, соседей сохранено: {stored} за {elapsed:.2f} с"
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.suggestions import TOP_K, refresh_suggestions
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации \"возможно, вы знакомы\" по снимку графа подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Пересчитать все профили, а не только изменившиеся")
+        parser.add_argument("--top", type=int, default=TOP_K, help="Сколько кандидатов хранить на профиль")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        profiles, stored = refresh_suggestions(
+            full=options["full"],
+            batch_size=options["batch_size"],
+            top_k=options["top"],
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Профилей пересчитано: {profiles}, рекомендаций сохранено: {stored} за {elapsed:.2f} с"
+        ))
@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users.models import User, Profile, Genre, DEFAULT_GENRE_NAMES
+
+
+def _init_worker(settings_module):
+    """Инициализация процесса-хэшера (нужна при запуске через spawn)"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def _read_records(path, fmt):
+    """Построчно читает CSV (с заголовком) или JSONL, не загружая файл целиком"""
+    with open(path, encoding="utf-8", newline="") as fh:
+        if fmt == "csv":
+            yield from csv.DictReader(fh)
+        else:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Массовый импорт пользователей из CSV/JSONL (поля email, username, password "
+        "или готовый password_hash). Пароли хэшируются в пуле процессов, пользователи, "
+        "профили и жанры по умолчанию создаются через bulk_create. Существующие email пропускаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл .csv или .jsonl")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="По умолчанию по расширению файла")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"Файл {path} не найден")
+        fmt = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+        chunk_size = options["chunk_size"]
+
+        self.default_genre_ids = list(
+            Genre.objects.filter(name__in=DEFAULT_GENRE_NAMES).values_list("pk", flat=True)
+        )
+        self.created = self.skipped = 0
+        started = time.monotonic()
+
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            initializer=_init_worker,
+            initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "core.settings"),),
+        ) as pool:
+            # Executor.map отправляет задачи сразу, поэтому следующая пачка
+            # хэшируется, пока текущая пишется в базу.
+            pending = None
+            for chunk in _chunks(_read_records(path, fmt), chunk_size):
+                rows = self.prepare(chunk)
+                plain = [row["password"] for row in rows if "password" in row]
+                hashed = pool.map(make_password, plain, chunksize=max(1, len(plain) // (4 * options["workers"])))
+                if pending is not None:
+                    self.insert(*pending)
+                    self.report(started)
+                pending = (rows, hashed)
+            if pending is not None:
+                self.insert(*pending)
+
+        elapsed = time.monotonic() - started
+        rate = self.created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано: {self.created}, пропущено: {self.skipped}, "
+            f"время: {elapsed:.1f} с, скорость: {rate:.0f} польз./с"
+        ))
+
+    def prepare(self, chunk):
+        """Отбрасывает неполные записи, дубли и уже существующие email/username"""
+        rows, emails, usernames = [], set(), set()
+        for record in chunk:
+            email = User.objects.normalize_email((record.get("email") or "").strip())
+            username = (record.get("username") or "").strip()
+            if not email or not username or email in emails or username in usernames:
+                self.skipped += 1
+                continue
+            row = {"email": email, "username": username}
+            if record.get("password_hash"):
+                row["password_hash"] = record["password_hash"]
+            else:
+                row["password"] = record.get("password") or None
+            emails.add(email)
+            usernames.add(username)
+            rows.append(row)
+
+        taken = User.objects.filter(email__in=emails).values_list("email", flat=True)
+        taken_names = User.objects.filter(username__in=usernames).values_list("username", flat=True)
+        taken, taken_names = set(taken), set(taken_names)
+        result = [row for row in rows if row["email"] not in taken and row["username"] not in taken_names]
+        self.skipped += len(rows) - len(result)
+        return result
+
+    def insert(self, rows, hashed):
+        hashed = iter(hashed)
+        users = [
+            User(
+                email=row["email"],
+                username=row["username"],
+                password=row["password_hash"] if "password_hash" in row else next(hashed),
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            # bulk_create не шлёт post_save, поэтому профили и жанры создаём сами
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            user_ids = list(
+                User.objects.filter(email__in=[row["email"] for row in rows], profile__isnull=True)
+                .values_list("pk", flat=True)
+            )
+            Profile.objects.bulk_create(
+                [Profile(user_id=pk) for pk in user_ids], ignore_conflicts=True
+            )
+            if self.default_genre_ids:
+                profile_ids = Profile.objects.filter(user_id__in=user_ids).values_list("pk", flat=True)
+                through = Profile.favorite_genres.through
+                through.objects.bulk_create(
+                    [
+                        through(profile_id=profile_id, genre_id=genre_id)
+                        for profile_id in profile_ids
+                        for genre_id in self.default_genre_ids
+                    ],
+                    ignore_conflicts=True,
+                )
+        self.created += len(user_ids)
+        self.skipped += len(rows) - len(user_ids)
+
+    def report(self, started):
+        elapsed = time.monotonic() - started
+        rate = self.created / elapsed if elapsed else 0
+        self.stdout.write(f"Импортировано {self.created} (пропущено {self.skipped}), {rate:.0f} польз./с")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает followers_count/following_count всех профилей по таблице подписок"
+
+    def handle(self, *args, **options):
+        updated = Profile.recount_follows()
+        self.stdout.write(self.style.SUCCESS(f"Счётчики пересчитаны для {updated} профилей"))
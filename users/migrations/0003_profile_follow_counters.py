@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_follow_counters(apps, schema_editor):
+    Profile = apps.get_model('users', 'Profile')
+    through = Profile.following.through
+    followers = (
+        through.objects.filter(to_profile=OuterRef('pk'))
+        .values('to_profile').annotate(total=Count('pk')).values('total')
+    )
+    following = (
+        through.objects.filter(from_profile=OuterRef('pk'))
+        .values('from_profile').annotate(total=Count('pk')).values('total')
+    )
+    Profile.objects.update(
+        followers_count=Coalesce(Subquery(followers), 0),
+        following_count=Coalesce(Subquery(following), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_movie_poster_alter_profile_gender_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_follow_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_profile_follow_counters'),
+    ]
+
+    operations = [
+        # Таблица users_profile_following уже существует как автоматическая
+        # связь Profile.following, поэтому меняем только состояние моделей.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Follow',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('from_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_links', to='users.profile')),
+                        ('to_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_links', to='users.profile')),
+                    ],
+                    options={
+                        'db_table': 'users_profile_following',
+                        'unique_together': {('from_profile', 'to_profile')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='profile',
+                    name='following',
+                    field=models.ManyToManyField(blank=True, related_name='followers', through='users.Follow', through_fields=('from_profile', 'to_profile'), to='users.profile'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['to_profile', 'created_at'], name='follow_followers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['from_profile', 'created_at'], name='follow_following_idx'),
+        ),
+    ]
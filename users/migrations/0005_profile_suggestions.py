@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_follow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('mutual_count', models.PositiveIntegerField(default=0)),
+                ('shared_genres', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['profile', 'rank'],
+            },
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='suggestions_stale',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('suggestions_stale', True)), fields=['id'], name='profile_suggestions_stale_idx'),
+        ),
+        migrations.AddField(
+            model_name='profilesuggestion',
+            name='candidate',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.profile'),
+        ),
+        migrations.AddField(
+            model_name='profilesuggestion',
+            name='profile',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestions', to='users.profile'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='profilesuggestion',
+            unique_together={('profile', 'rank')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_profile_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title', 'id'], name='movie_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_year', 'id'], name='movie_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='series',
+            index=models.Index(fields=['title', 'id'], name='series_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='series',
+            index=models.Index(fields=['start_year', 'id'], name='series_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='series',
+            index=models.Index(fields=['end_year', 'id'], name='series_end_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='series',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
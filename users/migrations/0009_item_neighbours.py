@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_kind', models.CharField(choices=[('genre', 'Жанр'), ('movie', 'Фильм'), ('series', 'Сериал'), ('catalog_movie', 'Фильм каталога')], max_length=16)),
+                ('item_id', models.PositiveIntegerField()),
+                ('neighbour_kind', models.CharField(choices=[('genre', 'Жанр'), ('movie', 'Фильм'), ('series', 'Сериал'), ('catalog_movie', 'Фильм каталога')], max_length=16)),
+                ('neighbour_id', models.PositiveIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+            ],
+            options={
+                'ordering': ['item_kind', 'item_id', 'rank'],
+                'unique_together': {('item_kind', 'item_id', 'rank')},
+            },
+        ),
+    ]
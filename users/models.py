@@ -1,17 +1,21 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.conf import settings
-from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models import F, Q, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import Signal, receiver
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from PIL import Image
+from django.utils import timezone
+from imaging.validators import validate_image_header
+from .user_cache import user_cache
 
 
 # ---------- Пользователь ----------
 class UserManager(BaseUserManager):
     """Менеджер пользователей"""
 
-    def create_user(self, email, username, password=None, **extra_fields):
+    def create_user(self, email, username, password=None, password_hash=None, **extra_fields):
+        """password_hash — уже посчитанный хэш (регистрация считает его в users/auth_pool.py)"""
         if not email:
             raise ValueError("Пользователь должен иметь email")
         if not username:
@@ -19,7 +23,10 @@ class UserManager(BaseUserManager):
 
         email = self.normalize_email(email)
         user = self.model(email=email, username=username, **extra_fields)
-        user.set_password(password)
+        if password_hash is not None:
+            user.password = password_hash
+        else:
+            user.set_password(password)
         user.save(using=self._db)
         return user
 
@@ -52,17 +59,8 @@ class User(AbstractUser):
 
 # ---------- Валидация изображения ----------
 def validate_image(image):
-    """Валидатор для аватарок/постеров"""
-    if image:
-        if image.size > 2 * 1024 * 1024:  # > 2 MB
-            raise ValidationError("Размер изображения не должен превышать 2MB")
-
-        try:
-            img = Image.open(image)
-            if img.format not in ["JPEG", "JPG", "PNG", "GIF"]:
-                raise ValidationError("Поддерживаются только JPEG, JPG, PNG, GIF")
-        except Exception:
-            raise ValidationError("Некорректный формат изображения")
+    """Валидатор для аватарок/постеров: формат и размеры по заголовку, без декодирования"""
+    validate_image_header(image)
 
 
 # ---------- Профиль ----------
@@ -97,10 +95,17 @@ class Profile(models.Model):
     # Подписки/друзья
     following = models.ManyToManyField(
         "self",
+        through="Follow",
+        through_fields=("from_profile", "to_profile"),
         symmetrical=False,
         related_name="followers",
         blank=True,
     )
+    # Денормализованные счётчики подписок (follows_changed, m2m_changed, удаление профиля)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    # Подписки изменились, рекомендации знакомств нужно пересчитать
+    suggestions_stale = models.BooleanField(default=True, editable=False)
 
     # Интересы
     favorite_genres = models.ManyToManyField("Genre", blank=True, related_name="fans")
@@ -109,6 +114,15 @@ class Profile(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(suggestions_stale=True),
+                name="profile_suggestions_stale_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Профиль {self.user.username}"
 
@@ -121,10 +135,153 @@ class Profile(models.Model):
         """Проверяет, дружат ли (взаимная подписка)"""
         return self.is_following(profile) and profile.is_following(self)
 
+    # Подписки идут напрямую через Follow: уникальность пары держит сама таблица,
+    # поэтому проверка "уже подписан" не требует загрузки списка подписок.
+    def follow(self, profile):
+        """Подписывается на profile, возвращает False, если подписка уже была"""
+        try:
+            with transaction.atomic():
+                Follow.objects.create(from_profile=self, to_profile=profile)
+                follows_changed([self.pk], [profile.pk], 1)
+        except IntegrityError:
+            return False
+        return True
+
+    def unfollow(self, profile):
+        """Отписывается от profile, возвращает False, если подписки не было"""
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(from_profile=self, to_profile=profile).delete()
+            if deleted:
+                follows_changed([self.pk], [profile.pk], -1)
+        return bool(deleted)
+
+    def follow_many(self, profile_ids):
+        """Подписывается на несколько профилей сразу, возвращает id новых подписок"""
+        with transaction.atomic():
+            ids = Profile.objects.filter(pk__in=set(profile_ids) - {self.pk}).values_list("pk", flat=True)
+            # общая метка времени отличает вставленные строки от уже существующих
+            # и от вставленных параллельным вызовом: их пропустит ignore_conflicts
+            marker = timezone.now()
+            Follow.objects.bulk_create(
+                [Follow(from_profile=self, to_profile_id=pk, created_at=marker) for pk in ids],
+                ignore_conflicts=True,
+            )
+            ids = sorted(
+                Follow.objects.filter(from_profile=self, to_profile_id__in=ids, created_at=marker)
+                .values_list("to_profile_id", flat=True)
+            )
+            follows_changed([self.pk] * len(ids), ids, 1)
+        return ids
+
+    def unfollow_many(self, profile_ids):
+        """Отписывается от нескольких профилей сразу, возвращает id снятых подписок"""
+        with transaction.atomic():
+            # строки блокируются до удаления: параллельная отписка не снимет их второй раз
+            links = Follow.objects.select_for_update().filter(from_profile=self, to_profile_id__in=set(profile_ids))
+            pks, ids = [], []
+            for pk, to_profile_id in links.values_list("pk", "to_profile_id"):
+                pks.append(pk)
+                ids.append(to_profile_id)
+            if pks:
+                Follow.objects.filter(pk__in=pks).delete()
+            ids.sort()
+            follows_changed([self.pk] * len(ids), ids, -1)
+        return ids
+
+    @classmethod
+    def recount_follows(cls):
+        """Пересчитывает счётчики подписок всех профилей двумя UPDATE"""
+        followers = (
+            Follow.objects.filter(to_profile=OuterRef("pk"))
+            .values("to_profile")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        following = (
+            Follow.objects.filter(from_profile=OuterRef("pk"))
+            .values("from_profile")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        return cls.objects.update(
+            followers_count=Coalesce(Subquery(followers), 0),
+            following_count=Coalesce(Subquery(following), 0),
+        )
+
+
+# ---------- Подписки ----------
+class Follow(models.Model):
+    """Подписка одного профиля на другой с временем подписки"""
+
+    from_profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="following_links")
+    to_profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="follower_links")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # таблица бывшей автоматической связи Profile.following
+        db_table = "users_profile_following"
+        unique_together = ("from_profile", "to_profile")
+        indexes = [
+            models.Index(fields=["to_profile", "created_at"], name="follow_followers_idx"),
+            models.Index(fields=["from_profile", "created_at"], name="follow_following_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.from_profile_id} -> {self.to_profile_id}"
+
+
+# ---------- Возможные знакомства ----------
+class ProfileSuggestion(models.Model):
+    """Предрасчитанный кандидат "возможно, вы знакомы" (см. users/suggestions.py)"""
+
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="suggestions")
+    candidate = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    mutual_count = models.PositiveIntegerField(default=0)
+    shared_genres = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["profile", "rank"]
+        unique_together = ("profile", "rank")
+
+    def __str__(self):
+        return f"{self.profile_id}: #{self.rank} {self.candidate_id}"
+
+
+class ItemNeighbour(models.Model):
+    """Похожий объект из пакетного item-item расчёта (см. users/recommendations.py)"""
+
+    KIND_CHOICES = (
+        ("genre", "Жанр"),
+        ("movie", "Фильм"),
+        ("series", "Сериал"),
+        ("catalog_movie", "Фильм каталога"),
+    )
+
+    item_kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    item_id = models.PositiveIntegerField()
+    neighbour_kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    neighbour_id = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["item_kind", "item_id", "rank"]
+        unique_together = ("item_kind", "item_id", "rank")
+
+    def __str__(self):
+        return f"{self.item_kind}:{self.item_id} #{self.rank} {self.neighbour_kind}:{self.neighbour_id}"
+
 
 # ---------- Жанры ----------
+# Жанры, которые получает каждый новый профиль
+DEFAULT_GENRE_NAMES = ["Драма", "Комедия"]
+
+
 class Genre(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -133,10 +290,20 @@ class Genre(models.Model):
 # ---------- Фильмы ----------
 class Movie(models.Model):
     title = models.CharField(max_length=200)
+    # ключ записи во внешнем каталоге, по нему import_catalog обновляет строки
+    external_id = models.CharField(max_length=64, unique=True, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     release_year = models.PositiveIntegerField()
     poster = models.ImageField(upload_to="movies/", blank=True, null=True, validators=[validate_image])
     genres = models.ManyToManyField(Genre, related_name="movies")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Сортировки и диапазоны каталога (core.filters.CatalogFilter + KeysetPagination)
+        indexes = [
+            models.Index(fields=["title", "id"], name="movie_title_idx"),
+            models.Index(fields=["release_year", "id"], name="movie_year_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -145,11 +312,20 @@ class Movie(models.Model):
 # ---------- Сериалы ----------
 class Series(models.Model):
     title = models.CharField(max_length=200)
+    external_id = models.CharField(max_length=64, unique=True, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     start_year = models.PositiveIntegerField()
     end_year = models.PositiveIntegerField(blank=True, null=True)
     poster = models.ImageField(upload_to="series/", blank=True, null=True, validators=[validate_image])
     genres = models.ManyToManyField(Genre, related_name="series")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["title", "id"], name="series_title_idx"),
+            models.Index(fields=["start_year", "id"], name="series_start_idx"),
+            models.Index(fields=["end_year", "id"], name="series_end_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -161,3 +337,100 @@ def create_user_profile(sender, instance, created, **kwargs):
     """Автоматически создаем профиль при регистрации"""
     if created:
         Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Сбрасывает пользователя в кэше JWT-аутентификации всех воркеров"""
+    user_cache.invalidate(instance.pk)
+
+
+def adjust_follow_counters(follower_ids, followee_ids, delta):
+    """Сдвигает счётчики подписок на delta для каждой пары подписчик -> автор"""
+    for field, ids in (("following_count", follower_ids), ("followers_count", followee_ids)):
+        counts = {}
+        for pk in ids:
+            counts[pk] = counts.get(pk, 0) + 1
+        # одним UPDATE на каждое уникальное значение сдвига
+        by_step = {}
+        for pk, count in counts.items():
+            by_step.setdefault(count * delta, []).append(pk)
+        for step, pks in by_step.items():
+            Profile.objects.filter(pk__in=pks).update(**{field: F(field) + step})
+
+
+# Подписчиков аккаунтов крупнее этого не помечаем сразу, их догонит полный пересчёт
+SUGGESTIONS_STALE_FANOUT = 1000
+
+
+def mark_suggestions_stale(follower_ids):
+    """
+    Помечает профили, чьи кандидаты могли измениться: самих подписчиков
+    и тех, кто подписан на них (для них это связи второго уровня).
+    """
+    follower_ids = set(follower_ids)
+    small = Profile.objects.filter(
+        pk__in=follower_ids, followers_count__lte=SUGGESTIONS_STALE_FANOUT
+    ).values("pk")
+    second_hop = Follow.objects.filter(to_profile__in=small).values("from_profile")
+    Profile.objects.filter(
+        models.Q(pk__in=follower_ids) | models.Q(pk__in=second_hop),
+        suggestions_stale=False,
+    ).update(suggestions_stale=True)
+
+
+# Подписки добавлены (delta=1) или сняты (delta=-1): follower_ids[i] -> followee_ids[i]
+follows_updated = Signal()
+
+
+def follows_changed(follower_ids, followee_ids, delta):
+    """Всё, что нужно обновить после добавления/удаления подписок"""
+    adjust_follow_counters(follower_ids, followee_ids, delta)
+    mark_suggestions_stale(follower_ids)
+    if follower_ids:
+        follows_updated.send(sender=Follow, follower_ids=follower_ids, followee_ids=followee_ids, delta=delta)
+
+
+def _follow_pairs(instance, pk_set, reverse):
+    """Пары (подписчик, автор) для события m2m_changed по Profile.following"""
+    if reverse:
+        return [(pk, instance.pk) for pk in pk_set]
+    return [(instance.pk, pk) for pk in pk_set]
+
+
+@receiver(m2m_changed, sender=Follow)
+def update_follow_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    """Держит followers_count/following_count в актуальном состоянии"""
+    if action in ("pre_remove", "pre_clear"):
+        # запоминаем реально существующие связи, post_* их уже не увидит
+        lookup = "to_profile" if reverse else "from_profile"
+        links = sender.objects.filter(**{lookup: instance.pk})
+        if action == "pre_remove":
+            links = links.filter(**{("from_profile__in" if reverse else "to_profile__in"): pk_set})
+        instance._removed_follows = [
+            (link.from_profile_id, link.to_profile_id) for link in links
+        ]
+        return
+
+    if action == "post_add":
+        pairs, delta = _follow_pairs(instance, pk_set, reverse), 1
+    elif action in ("post_remove", "post_clear"):
+        pairs, delta = getattr(instance, "_removed_follows", []), -1
+        instance._removed_follows = []
+    else:
+        return
+
+    if pairs:
+        follows_changed([a for a, _ in pairs], [b for _, b in pairs], delta)
+
+
+@receiver(pre_delete, sender=Profile)
+def release_profile_follows(sender, instance, **kwargs):
+    """Каскадное удаление Follow не шлёт m2m_changed: снимаем связи профиля со счётчиков сами"""
+    pairs = list(
+        Follow.objects.filter(Q(from_profile=instance) | Q(to_profile=instance))
+        .values_list("from_profile_id", "to_profile_id")
+    )
+    if pairs:
+        follows_changed([a for a, _ in pairs], [b for _, b in pairs], -1)
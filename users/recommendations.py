@@ -0,0 +1,260 @@
+"""
+Рекомендации фильмов и сериалов (item-item).
+
+Пакетный расчёт строит разреженную матрицу профиль × объект: любимые жанры,
+фильмы и сериалы профиля и оценки из его отзывов (фильмы каталога). Матрица
+хранится тройками (строка, столбец, значение) в порядке строк, как CSR;
+столбцы нормированы, поэтому косинусное сходство двух объектов — просто
+сумма произведений по общим профилям. Сходство считается блоками столбцов:
+пары объектов одного профиля разворачиваются массивами NumPy и
+складываются через np.bincount, так что память ограничена размером блока
+(CHUNK_CELLS), а не квадратом числа объектов.
+
+Для каждого объекта в ItemNeighbour пишутся лучшие NEIGHBOURS соседей.
+Жанры бывают только исходными объектами: они дают рекомендации профилям без
+избранного и отзывов, но сами не рекомендуются. Запрос к API складывает
+готовые списки соседей объектов профиля с весами сигналов и убирает то,
+что у профиля уже есть.
+"""
+import heapq
+from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Q
+
+from movies.models import Movie as CatalogMovie
+from reviews.models import Review
+from .models import Profile, Movie, Series, ItemNeighbour
+
+KINDS = ("genre", "movie", "series", "catalog_movie")
+RECOMMENDED_KINDS = ("movie", "series", "catalog_movie")
+FAVORITES = (
+    ("genre", "favorite_genres", "genre_id"),
+    ("movie", "favorite_movies", "movie_id"),
+    ("series", "favorite_series", "series_id"),
+)
+TITLE_MODELS = {"movie": Movie, "series": Series, "catalog_movie": CatalogMovie}
+
+TOP_K = 20
+# Ключ столбца: код вида в старших битах, pk в младших
+KIND_SHIFT = 32
+PK_MASK = (1 << KIND_SHIFT) - 1
+# Сколько пар объектов разворачивать за один вызов bincount
+MAX_PAIRS = 2_000_000
+
+
+def _config():
+    config = getattr(settings, "RECOMMENDATIONS", {})
+    weights = {"movie": 1.0, "series": 1.0, "genre": 0.5, **config.get("WEIGHTS", {})}
+    return {
+        "neighbours": config.get("NEIGHBOURS", 30),
+        "weights": weights,
+        "neutral": config.get("NEUTRAL_RATING", 3),
+        "chunk_cells": config.get("CHUNK_CELLS", 4_000_000),
+    }
+
+
+def _favorites(field, column, profile_ids=None):
+    links = getattr(Profile, field).through.objects.all()
+    if profile_ids is not None:
+        links = links.filter(profile_id__in=profile_ids)
+    return links.values_list("profile_id", column)
+
+
+def _ratings(profile_ids=None):
+    """(profile_id, movie_id, средняя оценка) — отзывов на один фильм может быть несколько"""
+    reviews = Review.objects.all()
+    if profile_ids is not None:
+        reviews = reviews.filter(author__profile__in=profile_ids)
+    return (
+        reviews.order_by()
+        .values("author__profile", "movie_id")
+        .annotate(rating=Avg("rating"))
+        .values_list("author__profile", "movie_id", "rating")
+    )
+
+
+class ItemMatrix:
+    """Разреженная матрица профиль × объект с нормированными столбцами"""
+
+    def __init__(self, keys, rows, cols, vals, n_rows):
+        self.keys = keys
+        self.rows = rows
+        self.cols = cols
+        self.vals = vals
+        self.shape = (n_rows, len(keys))
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n_rows))))
+
+    @classmethod
+    def load(cls, config=None):
+        config = config or _config()
+        weights = config["weights"]
+        profiles, keys, vals = [], [], []
+
+        def add(kind, pairs, values):
+            profiles.append(pairs[:, 0])
+            keys.append((KINDS.index(kind) << KIND_SHIFT) | pairs[:, 1])
+            vals.append(values)
+
+        for kind, field, column in FAVORITES:
+            pairs = np.fromiter(
+                chain.from_iterable(_favorites(field, column).iterator(chunk_size=10000)), dtype=np.int64
+            ).reshape(-1, 2)
+            add(kind, pairs, np.full(len(pairs), weights.get(kind, 1.0)))
+
+        rated = np.fromiter(
+            chain.from_iterable(_ratings().iterator(chunk_size=10000)), dtype=np.float64
+        ).reshape(-1, 3)
+        add("catalog_movie", rated[:, :2].astype(np.int64), (rated[:, 2] - config["neutral"]) / 2)
+
+        profiles, keys, vals = np.concatenate(profiles), np.concatenate(keys), np.concatenate(vals)
+        # нейтральная оценка не сигнал
+        nonzero = vals != 0
+        profiles, keys, vals = profiles[nonzero], keys[nonzero], vals[nonzero]
+
+        row_ids, rows = np.unique(profiles, return_inverse=True)
+        keys, cols = np.unique(keys, return_inverse=True)
+        order = np.argsort(rows, kind="stable")
+        rows, cols, vals = rows[order], cols[order], vals[order]
+        norms = np.sqrt(np.bincount(cols, weights=vals * vals, minlength=len(keys)))
+        return cls(keys, rows, cols, vals / norms[cols], n_rows=len(row_ids))
+
+    def _pair_batches(self, entries):
+        """Делит записи блока так, чтобы каждая пачка давала не больше MAX_PAIRS пар"""
+        if not len(entries):
+            return []
+        pairs = np.cumsum(np.diff(self.indptr)[self.rows[entries]])
+        return np.split(entries, np.searchsorted(pairs, np.arange(MAX_PAIRS, pairs[-1], MAX_PAIRS)))
+
+    def _cooccurrence(self, entries, start, size):
+        """Суммы произведений записей блока со всеми записями тех же профилей"""
+        rows = self.rows[entries]
+        counts = self.indptr[rows + 1] - self.indptr[rows]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        others = np.repeat(self.indptr[rows], counts) + offsets
+        flat = np.repeat(self.cols[entries] - start, counts) * self.shape[1] + self.cols[others]
+        weights = np.repeat(self.vals[entries], counts) * self.vals[others]
+        return np.bincount(flat, weights=weights, minlength=size)
+
+    def neighbours(self, top_n, chunk_cells):
+        """
+        Генератор (первый столбец блока, индексы соседей, сходства): для каждого
+        столбца блока top_n соседей по убыванию сходства.
+        """
+        n = self.shape[1]
+        if not n:
+            return
+        recommended = np.isin(self.keys >> KIND_SHIFT, [KINDS.index(kind) for kind in RECOMMENDED_KINDS])
+        by_col = np.argsort(self.cols, kind="stable")
+        col_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.cols, minlength=n))))
+        chunk = max(1, chunk_cells // n)
+        k = min(top_n, n)
+
+        for start in range(0, n, chunk):
+            stop = min(n, start + chunk)
+            size = (stop - start) * n
+            block = np.zeros(size)
+            for entries in self._pair_batches(by_col[col_ptr[start]:col_ptr[stop]]):
+                block += self._cooccurrence(entries, start, size)
+            block = block.reshape(stop - start, n)
+            block[:, ~recommended] = 0
+            block[np.arange(stop - start), np.arange(start, stop)] = 0
+
+            top = np.argpartition(block, n - k, axis=1)[:, n - k:]
+            scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-scores, axis=1, kind="stable")
+            yield start, np.take_along_axis(top, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+    def kind_and_pk(self, col):
+        key = int(self.keys[col])
+        return KINDS[key >> KIND_SHIFT], key & PK_MASK
+
+
+def refresh_recommendations(top_n=None, chunk_cells=None, batch_size=1000):
+    """Пересчитывает соседей всех объектов, возвращает (профилей, объектов, соседей сохранено)"""
+    config = _config()
+    top_n = top_n or config["neighbours"]
+    chunk_cells = chunk_cells or config["chunk_cells"]
+    matrix = ItemMatrix.load(config)
+
+    stored = 0
+    # читатели видят старые списки до коммита полного пересчёта
+    with transaction.atomic():
+        ItemNeighbour.objects.all().delete()
+        for start, top, scores in matrix.neighbours(top_n, chunk_cells):
+            rows = []
+            for offset, (cols, values) in enumerate(zip(top.tolist(), scores.tolist())):
+                item_kind, item_id = matrix.kind_and_pk(start + offset)
+                for rank, (col, score) in enumerate(zip(cols, values), 1):
+                    if score <= 0:
+                        break
+                    neighbour_kind, neighbour_id = matrix.kind_and_pk(col)
+                    rows.append(ItemNeighbour(
+                        item_kind=item_kind,
+                        item_id=item_id,
+                        neighbour_kind=neighbour_kind,
+                        neighbour_id=neighbour_id,
+                        rank=rank,
+                        score=score,
+                    ))
+            ItemNeighbour.objects.bulk_create(rows, batch_size=batch_size)
+            stored += len(rows)
+    return matrix.shape[0], matrix.shape[1], stored
+
+
+def profile_items(profile_id):
+    """{(вид, pk): вес} для всего, что есть у профиля; нейтральные оценки с весом 0"""
+    config = _config()
+    items = {}
+    for kind, field, column in FAVORITES:
+        for _, pk in _favorites(field, column, [profile_id]):
+            items[kind, pk] = config["weights"].get(kind, 1.0)
+    for _, pk, rating in _ratings([profile_id]):
+        items["catalog_movie", pk] = (rating - config["neutral"]) / 2
+    return items
+
+
+def recommend(profile_id, limit=TOP_K):
+    """[(вид, pk, score)]: сумма сходств с объектами профиля, взвешенных сигналом"""
+    items = profile_items(profile_id)
+    seeds = {key: weight for key, weight in items.items() if weight}
+    if not seeds:
+        return []
+
+    by_kind = defaultdict(list)
+    for kind, pk in seeds:
+        by_kind[kind].append(pk)
+    condition = Q()
+    for kind, ids in by_kind.items():
+        condition |= Q(item_kind=kind, item_id__in=ids)
+
+    scores = defaultdict(float)
+    neighbours = ItemNeighbour.objects.filter(condition).values_list(
+        "item_kind", "item_id", "neighbour_kind", "neighbour_id", "score"
+    )
+    for item_kind, item_id, kind, pk, score in neighbours:
+        scores[kind, pk] += seeds[item_kind, item_id] * score
+
+    best = heapq.nlargest(
+        limit, ((score, key) for key, score in scores.items() if score > 0 and key not in items)
+    )
+    return [(kind, pk, score) for score, (kind, pk) in best]
+
+
+def describe(recommended):
+    """Рекомендации с названиями; объекты, удалённые после расчёта, пропускаются"""
+    by_kind = defaultdict(list)
+    for kind, pk, _ in recommended:
+        by_kind[kind].append(pk)
+    titles = {}
+    for kind, ids in by_kind.items():
+        for pk, title in TITLE_MODELS[kind].objects.filter(pk__in=ids).values_list("pk", "title"):
+            titles[kind, pk] = title
+    return [
+        {"type": kind, "id": pk, "title": titles[kind, pk], "score": score}
+        for kind, pk, score in recommended
+        if (kind, pk) in titles
+    ]
@@ -0,0 +1,158 @@
+"""
+Отзыв JWT по jti.
+
+Отозванный jti хранится в общем кэше (ключ на токен, TTL до истечения
+токена), поэтому запись исчезает сама, когда токен всё равно перестал бы
+действовать. Перед кэшем стоит фильтр Блума в памяти процесса: jti, которого
+нет в фильтре, точно не отозван и проверяется без обращения к кэшу. Кэш
+дергается только при попадании в фильтр (реальный отзыв или ложное
+срабатывание).
+
+Отзывы из других процессов фильтр подтягивает по журналу в кэше:
+счётчик JWT_REVOKED_SEQ и запись на каждый номер. Синхронизация идёт не
+чаще раза в SYNC_INTERVAL секунд, это и есть максимальная задержка, с
+которой отзыв доходит до остальных воркеров.
+
+Номер выдаётся incr'ом до записи в журнал, поэтому синхронизация может
+увидеть номер без записи. Такие номера перечитываются при следующих
+синхронизациях и забываются через GAP_GRACE секунд (запись истекла вместе
+с токеном или процесс упал между incr и set). Кэш должен быть общим для
+всех процессов (алиас 'shared').
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.settings import api_settings
+
+KEY_PREFIX = "jwt:revoked:"
+SEQ_KEY = KEY_PREFIX + "seq"
+LOG_BATCH = 1000
+GAP_GRACE = 60
+
+
+class BloomFilter:
+    """Фильтр Блума на bytearray с двойным хэшированием blake2b"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class RevocationStore:
+    def __init__(self, cache_alias=None, sync_interval=None, capacity=None, error_rate=None):
+        config = getattr(settings, "JWT_REVOCATION", {})
+        self.cache_alias = cache_alias or config.get("CACHE", "shared")
+        self.sync_interval = sync_interval if sync_interval is not None else config.get("SYNC_INTERVAL", 5)
+        self.capacity = capacity or config.get("BLOOM_CAPACITY", 100_000)
+        self.error_rate = error_rate or config.get("BLOOM_ERROR_RATE", 0.001)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def reset(self):
+        """Сбрасывает локальное состояние; журнал в кэше перечитается при следующей проверке"""
+        with self._lock:
+            self._entries = {}  # jti -> exp, чтобы перестраивать фильтр без истёкших
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            self._seen_seq = 0
+            self._missing = {}  # номер без записи -> когда впервые не нашли
+            self._synced_at = float("-inf")
+
+    # ---------- запись ----------
+    def revoke(self, jti, exp):
+        """Отзывает токен до момента exp (unix time)"""
+        ttl = int(exp - time.time()) + 1
+        if ttl <= 0:
+            return
+        cache = self.cache
+        cache.set(KEY_PREFIX + jti, exp, ttl)
+        cache.add(SEQ_KEY, 0, None)
+        seq = cache.incr(SEQ_KEY)
+        cache.set(f"{KEY_PREFIX}log:{seq}", (jti, exp), ttl)
+        with self._lock:
+            self._remember(jti, exp)
+
+    def revoke_token(self, token):
+        """Отзывает токен simplejwt (access или refresh)"""
+        self.revoke(token[api_settings.JTI_CLAIM], token["exp"])
+
+    # ---------- проверка ----------
+    def is_revoked(self, jti):
+        self._sync_if_due()
+        with self._lock:
+            if jti not in self._bloom:
+                return False
+        return self.cache.get(KEY_PREFIX + jti) is not None
+
+    # ---------- локальный фильтр ----------
+    def _remember(self, jti, exp):
+        if jti in self._entries:
+            return
+        self._entries[jti] = exp
+        if self._bloom.count >= self._bloom.capacity:
+            self._rebuild()
+        else:
+            self._bloom.add(jti)
+
+    def _rebuild(self):
+        """Новый фильтр только из живых записей, с запасом по ёмкости"""
+        now = time.time()
+        self._entries = {jti: exp for jti, exp in self._entries.items() if exp > now}
+        capacity = max(self.capacity, 2 * len(self._entries))
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._entries:
+            self._bloom.add(jti)
+
+    def _sync_if_due(self):
+        now = time.monotonic()
+        if now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if now - self._synced_at < self.sync_interval:
+                return
+            self._synced_at = now
+            cache = self.cache
+            current = cache.get(SEQ_KEY, 0)
+            if current < self._seen_seq:
+                # кэш очищали: журнал начинается заново
+                self._seen_seq = 0
+                self._missing = {}
+            seqs = list(self._missing) + list(range(self._seen_seq + 1, current + 1))
+            for start in range(0, len(seqs), LOG_BATCH):
+                batch = seqs[start:start + LOG_BATCH]
+                found = cache.get_many([f"{KEY_PREFIX}log:{seq}" for seq in batch])
+                for seq in batch:
+                    entry = found.get(f"{KEY_PREFIX}log:{seq}")
+                    if entry is not None:
+                        self._missing.pop(seq, None)
+                        self._remember(*entry)
+                    elif now - self._missing.setdefault(seq, now) >= GAP_GRACE:
+                        del self._missing[seq]
+            self._seen_seq = max(self._seen_seq, current)
+
+
+revocation_store = RevocationStore()
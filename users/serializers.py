@@ -1,50 +1,55 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from django.contrib.auth import authenticate
+from django.db.models import Prefetch
+from core.fieldsets import ShapedSerializerMixin
+from imaging.fields import ImageVariantsField
+from .auth_pool import auth_pool
 from .models import User, Profile, Genre, Movie, Series
 
 
 # ---------- USER ----------
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "email", "username", "joined_date"]
 
 
 # ---------- GENRES ----------
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ["id", "name"]
 
 
 # ---------- MOVIES ----------
-class MovieSerializer(serializers.ModelSerializer):
+class MovieSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     genres = GenreSerializer(many=True, read_only=True)
+    poster_variants = ImageVariantsField(source="poster")
 
     class Meta:
         model = Movie
-        fields = ["id", "title", "description", "release_year", "poster", "genres"]
+        fields = ["id", "title", "description", "release_year", "poster", "poster_variants", "genres"]
+        expandable_fields = ["genres"]
 
 
 # ---------- SERIES ----------
-class SeriesSerializer(serializers.ModelSerializer):
+class SeriesSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     genres = GenreSerializer(many=True, read_only=True)
+    poster_variants = ImageVariantsField(source="poster")
 
     class Meta:
         model = Series
-        fields = ["id", "title", "description", "start_year", "end_year", "poster", "genres"]
+        fields = ["id", "title", "description", "start_year", "end_year", "poster", "poster_variants", "genres"]
+        expandable_fields = ["genres"]
 
 
 # ---------- PROFILE ----------
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     favorite_genres = GenreSerializer(many=True, read_only=True)
     favorite_movies = MovieSerializer(many=True, read_only=True)
     favorite_series = SeriesSerializer(many=True, read_only=True)
-
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField(source="avatar")
 
     following = serializers.SerializerMethodField()
     followers = serializers.SerializerMethodField()
@@ -55,6 +60,7 @@ class ProfileSerializer(serializers.ModelSerializer):
             "id",
             "user",
             "avatar",
+            "avatar_variants",
             "bio",
             "gender",
             "birth_date",
@@ -67,12 +73,11 @@ class ProfileSerializer(serializers.ModelSerializer):
             "favorite_series",
             "created_at",
         ]
-
-    def get_followers_count(self, obj):
-        return obj.followers.count()
-
-    def get_following_count(self, obj):
-        return obj.following.count()
+        expandable_fields = ["user", "favorite_genres", "favorite_movies", "favorite_series"]
+        field_prefetches = {
+            "following": [Prefetch("following", queryset=Profile.objects.select_related("user"))],
+            "followers": [Prefetch("followers", queryset=Profile.objects.select_related("user"))],
+        }
 
     def get_following(self, obj):
         """Список на кого подписан"""
@@ -83,6 +88,15 @@ class ProfileSerializer(serializers.ModelSerializer):
         return [f.user.username for f in obj.followers.all()]
 
 
+class ProfileIdsSerializer(serializers.Serializer):
+    """Список id профилей для массовой подписки/отписки"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500,
+    )
+
+
 # ---------- REGISTER ----------
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -96,10 +110,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
+        # хэш считается в пуле, create_user только сохраняет его
         user = User.objects.create_user(
             email=validated_data["email"],
             username=validated_data["username"],
-            password=validated_data["password"],
+            password_hash=auth_pool.make_password(validated_data["password"]),
         )
         # на всякий случай создаём профиль, если сигнал не сработал
         if not hasattr(user, "profile"):
@@ -113,28 +128,26 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
     def validate(self, attrs):
-        user = authenticate(
-            request=self.context.get("request"),
-            username=attrs.get("email"),
-            password=attrs.get("password"),
-        )
+        user = auth_pool.authenticate(attrs.get("email"), attrs.get("password"))
         if not user:
             raise serializers.ValidationError("Неверный email или пароль")
         attrs["user"] = user
         return attrs
 
 from rest_framework import serializers
-from .models import Profile
+from imaging.fields import ImageVariantsField
+from .models import Profile, ProfileSuggestion
 
 
 class FriendSerializer(serializers.ModelSerializer):
     """Мини-сериализатор профиля (для друзей/подписок/подписчиков)"""
     username = serializers.CharField(source="user.username", read_only=True)
     email = serializers.EmailField(source="user.email", read_only=True)
+    avatar_variants = ImageVariantsField(source="avatar")
 
     class Meta:
         model = Profile
-        fields = ["id", "username", "email", "avatar"]
+        fields = ["id", "username", "email", "avatar", "avatar_variants"]
 
 
 class FriendsListSerializer(serializers.ModelSerializer):
@@ -151,3 +164,20 @@ class FriendsListSerializer(serializers.ModelSerializer):
         """Друзья = только взаимные подписки"""
         mutual = obj.following.filter(id__in=obj.followers.values_list("id", flat=True))
         return FriendSerializer(mutual, many=True).data
+
+
+class ProfileSuggestionSerializer(serializers.ModelSerializer):
+    """Кандидат "возможно, вы знакомы" с причинами рекомендации"""
+    profile = FriendSerializer(source="candidate", read_only=True)
+
+    class Meta:
+        model = ProfileSuggestion
+        fields = ["profile", "score", "mutual_count", "shared_genres"]
+
+
+class RecommendationSerializer(serializers.Serializer):
+    """Рекомендованный фильм или сериал (users/recommendations.py)"""
+    type = serializers.ChoiceField(choices=["movie", "series", "catalog_movie"])
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    score = serializers.FloatField()
@@ -1,7 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Profile, Genre
+from .models import Profile, Genre, DEFAULT_GENRE_NAMES
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -9,7 +9,7 @@ def manage_user_profile(sender, instance, created, **kwargs):
     if created:
         profile = Profile.objects.create(user=instance)
 
-        default_genres = Genre.objects.filter(name__in=["Драма", "Комедия"])
+        default_genres = Genre.objects.filter(name__in=DEFAULT_GENRE_NAMES)
         profile.favorite_genres.set(default_genres)
     else:
         if hasattr(instance, 'profile'):
@@ -0,0 +1,134 @@
+"""
+Рекомендации "возможно, вы знакомы".
+
+Пакетный расчёт идёт по снимку графа подписок в формате CSR: для каждого
+профиля хранится срез общего массива соседей (indptr/indices), так что весь
+граф занимает два плоских массива целых чисел. Кандидаты — профили на
+расстоянии двух подписок, ранжируются по числу общих связей и общих любимых
+жанров. Результат (top-k на профиль) пишется в ProfileSuggestion, и запрос
+к API читает готовый список.
+"""
+import heapq
+from array import array
+from collections import Counter
+
+from django.db import transaction
+
+from .models import Profile, Follow, Genre, ProfileSuggestion
+
+TOP_K = 20
+MUTUAL_WEIGHT = 1.0
+GENRE_WEIGHT = 0.5
+
+
+class CSRGraph:
+    """Разреженная матрица смежности: строки — профили, значения — индексы соседей"""
+
+    def __init__(self, ids, indptr, indices):
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.position = {pk: i for i, pk in enumerate(ids)}
+
+    @classmethod
+    def from_pairs(cls, ids, pairs, columns=None):
+        """
+        Строит матрицу из пар (pk строки, pk столбца), отсортированных по строке.
+        Столбцы по умолчанию те же профили; для жанров передаётся свой список pk.
+        """
+        position = {pk: i for i, pk in enumerate(ids)}
+        column_position = position if columns is None else {pk: i for i, pk in enumerate(columns)}
+        indptr = array("q", [0]) * (len(ids) + 1)
+        indices = array("q")
+        for row, col in pairs:
+            if row in position and col in column_position:
+                indptr[position[row] + 1] += 1
+                indices.append(column_position[col])
+        for i in range(len(ids)):
+            indptr[i + 1] += indptr[i]
+        return cls(ids, indptr, indices)
+
+    def row(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+
+class SuggestionEngine:
+    """Снимок подписок и любимых жанров, из которого считаются рекомендации"""
+
+    def __init__(self, top_k=TOP_K):
+        self.top_k = top_k
+        ids = array("q", Profile.objects.order_by("pk").values_list("pk", flat=True))
+        follows = (
+            Follow.objects.order_by("from_profile_id", "to_profile_id")
+            .values_list("from_profile_id", "to_profile_id")
+            .iterator(chunk_size=10000)
+        )
+        self.graph = CSRGraph.from_pairs(ids, follows)
+
+        genres = (
+            Profile.favorite_genres.through.objects.order_by("profile_id")
+            .values_list("profile_id", "genre_id")
+            .iterator(chunk_size=10000)
+        )
+        genre_ids = Genre.objects.order_by("pk").values_list("pk", flat=True)
+        self.genres = CSRGraph.from_pairs(ids, genres, columns=list(genre_ids))
+
+    def suggest(self, profile_id):
+        """[(candidate_id, score, mutual_count, shared_genres)] для одного профиля"""
+        i = self.graph.position.get(profile_id)
+        if i is None:
+            return []
+        followed = set(self.graph.row(i))
+        mutual = Counter()
+        for j in followed:
+            mutual.update(self.graph.row(j))
+        mutual.pop(i, None)
+        for j in followed:
+            mutual.pop(j, None)
+
+        own_genres = set(self.genres.row(i))
+        scored = []
+        for candidate, count in mutual.items():
+            shared = len(own_genres.intersection(self.genres.row(candidate))) if own_genres else 0
+            score = MUTUAL_WEIGHT * count + GENRE_WEIGHT * shared
+            scored.append((score, count, shared, -self.graph.ids[candidate]))
+        best = heapq.nlargest(self.top_k, scored)
+        return [(-pk, score, count, shared) for score, count, shared, pk in best]
+
+    def store(self, profile_ids):
+        """Перезаписывает списки рекомендаций для указанных профилей"""
+        rows = []
+        for profile_id in profile_ids:
+            for rank, (candidate_id, score, count, shared) in enumerate(self.suggest(profile_id), 1):
+                rows.append(ProfileSuggestion(
+                    profile_id=profile_id,
+                    candidate_id=candidate_id,
+                    rank=rank,
+                    score=score,
+                    mutual_count=count,
+                    shared_genres=shared,
+                ))
+        with transaction.atomic():
+            ProfileSuggestion.objects.filter(profile_id__in=profile_ids).delete()
+            ProfileSuggestion.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+def refresh_suggestions(full=False, batch_size=1000, top_k=TOP_K):
+    """
+    Пересчитывает рекомендации. По умолчанию только для профилей с
+    suggestions_stale; флаг снимается до снятия снимка, поэтому подписки,
+    сделанные во время расчёта, снова пометят профиль.
+    """
+    profiles = Profile.objects.all() if full else Profile.objects.filter(suggestions_stale=True)
+    profile_ids = list(profiles.order_by("pk").values_list("pk", flat=True))
+    if not profile_ids:
+        return 0, 0
+    for start in range(0, len(profile_ids), batch_size):
+        Profile.objects.filter(pk__in=profile_ids[start:start + batch_size]).update(suggestions_stale=False)
+
+    engine = SuggestionEngine(top_k=top_k)
+    stored = 0
+    for start in range(0, len(profile_ids), batch_size):
+        stored += engine.store(profile_ids[start:start + batch_size])
+    return len(profile_ids), stored
@@ -1,3 +1,565 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from movies.models import Movie as CatalogMovie, Genre as CatalogGenre
+from reviews.models import Review
+from .auth_pool import auth_pool
+from .models import DEFAULT_GENRE_NAMES, User, Follow, Genre, ItemNeighbour, Movie, Profile, ProfileSuggestion, Series
+from .recommendations import KIND_SHIFT, KINDS, ItemMatrix, recommend, refresh_recommendations
+from .suggestions import SuggestionEngine, refresh_suggestions
+from .revocation import KEY_PREFIX, SEQ_KEY, RevocationStore, revocation_store
+from .user_cache import UserCache, user_cache
+
+
+class ProfileListQueriesTest(TestCase):
+    """Число запросов на список профилей не должно расти вместе с числом строк"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.genre = Genre.objects.create(name="Триллер")
+        self.movie = Movie.objects.create(title="Фильм", release_year=2000)
+        self.movie.genres.add(self.genre)
+        self.series = Series.objects.create(title="Сериал", start_year=2010)
+        self.series.genres.add(self.genre)
+        self.profiles = []
+
+    def add_profiles(self, count):
+        start = len(self.profiles)
+        for i in range(start, start + count):
+            user = User.objects.create_user(
+                email=f"user{i}@example.com", username=f"user{i}", password="pass"
+            )
+            profile = user.profile
+            profile.favorite_genres.add(self.genre)
+            profile.favorite_movies.add(self.movie)
+            profile.favorite_series.add(self.series)
+            for other in self.profiles:
+                profile.following.add(other)
+                other.following.add(profile)
+            self.profiles.append(profile)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/profiles/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), len(self.profiles))
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant(self):
+        self.add_profiles(2)
+        small = self.count_list_queries()
+        self.add_profiles(8)
+        large = self.count_list_queries()
+        self.assertEqual(small, large)
+
+
+class CatalogQueryPlanTest(TestCase):
+    """Каждая поддерживаемая комбинация фильтров и сортировки читает таблицу по индексу"""
+
+    CASES = [
+        ("users_movie", "/api/movies/"),
+        ("users_movie", "/api/movies/?ordering=-title"),
+        ("users_movie", "/api/movies/?ordering=year"),
+        ("users_movie", "/api/movies/?ordering=-year&release_year_min=1995&release_year_max=2000"),
+        ("users_movie", "/api/movies/?ordering=title&release_year_min=1995"),
+        ("users_movie", "/api/movies/?genre=1"),
+        ("users_movie", "/api/movies/?genre=1&release_year_max=2000&ordering=-year"),
+        ("users_series", "/api/series/"),
+        ("users_series", "/api/series/?ordering=year&start_year_min=2003"),
+        ("users_series", "/api/series/?ordering=-year&end_year_min=2010&end_year_max=2020"),
+        ("users_series", "/api/series/?genre=1&start_year_max=2005"),
+        ("movies_movie", "/api/catalog/movies/"),
+        ("movies_movie", "/api/catalog/movies/?ordering=date"),
+        ("movies_movie", "/api/catalog/movies/?ordering=-date&release_date_min=2003-01-01"),
+        ("movies_movie", "/api/catalog/movies/?genre=1&release_date_max=2005-01-01"),
+        ("movies_movie", "/api/catalog/movies/?ordering=-rating"),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name="Драма")
+        catalog_genre = CatalogGenre.objects.create(name="Драма")
+        for i in range(30):
+            movie = Movie.objects.create(title=f"Фильм {i % 7}", release_year=1990 + i % 20)
+            movie.genres.add(genre)
+            series = Series.objects.create(
+                title=f"Сериал {i}", start_year=2000 + i % 10, end_year=None if i % 3 else 2015
+            )
+            series.genres.add(genre)
+            catalog_movie = CatalogMovie.objects.create(
+                title=f"Кино {i}", release_date=None if i % 5 == 0 else datetime.date(2000 + i % 10, 1, 1)
+            )
+            catalog_movie.genres.add(catalog_genre)
+
+    def list_queries(self, url, table):
+        """SQL и параметры запросов к таблице, выполненных при GET url"""
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            if f'FROM "{table}"' in sql:
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, queries
+
+    def assert_uses_index(self, url, table):
+        response, queries = self.list_queries(url, table)
+        self.assertTrue(queries, url)
+        for sql, params in queries:
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                plan = [row[3] for row in cursor.fetchall()]
+            for step in plan:
+                if step.startswith(("SCAN", "SEARCH")):
+                    self.assertIn(" USING ", step, f"{url}: {plan}")
+        return response
+
+    def test_filters_use_indexes(self):
+        for table, url in self.CASES:
+            with self.subTest(url=url):
+                response = self.assert_uses_index(url + ("&" if "?" in url else "?") + "page_size=5", table)
+                # следующая страница ищется по курсору, тоже по индексу
+                next_link = response.json()["next"]
+                if next_link:
+                    self.assert_uses_index(next_link.replace("http://testserver", ""), table)
+
+
+class TokenRevocationTest(TestCase):
+    """Выход отзывает access и refresh, другие процессы узнают об этом из журнала"""
+
+    def setUp(self):
+        revocation_store.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="user@example.com", username="user", password="pass")
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access = self.refresh.access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def test_logout_revokes_access_and_refresh(self):
+        # отдельный экземпляр — другой воркер со своим фильтром Блума
+        worker = RevocationStore(sync_interval=0)
+        self.assertFalse(worker.is_revoked(self.access["jti"]))
+        self.assertEqual(self.client.get("/api/users/").status_code, 200)
+
+        response = self.client.post("/api/auth/logout/", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 205)
+
+        response = self.client.get("/api/users/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "token_revoked")
+        for token in (self.access, self.refresh):
+            self.assertTrue(worker.is_revoked(token["jti"]))
+        self.assertFalse(worker.is_revoked(RefreshToken.for_user(self.user)["jti"]))
+
+    def test_sync_picks_up_entry_written_after_seq(self):
+        writer, worker = RevocationStore(), RevocationStore(sync_interval=0)
+        cache = writer.cache
+        jti, exp = self.access["jti"], self.access["exp"]
+
+        # writer получил номер, но ещё не записал журнал, а worker уже синхронизировался
+        cache.set(KEY_PREFIX + jti, exp, 300)
+        cache.add(SEQ_KEY, 0, None)
+        seq = cache.incr(SEQ_KEY)
+        self.assertFalse(worker.is_revoked(jti))
+
+        cache.set(f"{KEY_PREFIX}log:{seq}", (jti, exp), 300)
+        self.assertTrue(worker.is_revoked(jti))
+
+
+class UserCacheTest(TestCase):
+    """Версия пользователя в общем кэше: изменение в одном воркере сбрасывает запись в остальных"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@example.com", username="user", password="pass")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+
+    def test_version_bump_from_other_worker_evicts_entry(self):
+        worker, other = UserCache(revalidate=0), UserCache(revalidate=0)
+        # версия должна лежать в кэше, который видят другие процессы, а не в памяти этого
+        self.assertNotIsInstance(worker.cache, LocMemCache)
+        loads = []
+
+        def loader(pk):
+            loads.append(pk)
+            return User.objects.get(pk=pk)
+
+        self.assertEqual(worker.get(self.user.pk, loader).username, "user")
+        worker.get(self.user.pk, loader)
+        self.assertEqual(len(loads), 1)
+
+        User.objects.filter(pk=self.user.pk).update(username="renamed")
+        other.invalidate(self.user.pk)
+        self.assertEqual(worker.get(self.user.pk, loader).username, "renamed")
+        self.assertEqual(len(loads), 2)
+
+    def test_deactivated_user_is_rejected_in_other_worker(self):
+        revalidate = user_cache.revalidate
+        user_cache.revalidate = 0
+        self.addCleanup(setattr, user_cache, "revalidate", revalidate)
+        self.assertEqual(self.client.get("/api/users/").status_code, 200)
+
+        # изменение без сигналов этого процесса: версию поднимает другой воркер
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        UserCache().invalidate(self.user.pk)
+        self.assertEqual(self.client.get("/api/users/").status_code, 401)
+
+
+class AuthViewsTest(TestCase):
+    """Вход и регистрация — обычные DRF-представления, хэширование в пуле"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_register_and_login(self):
+        response = self.client.post(
+            "/api/auth/register/",
+            {"email": "new@example.com", "username": "new", "password": "Strong-pass-123"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(email="new@example.com").check_password("Strong-pass-123"))
+
+        response = self.client.post(
+            "/api/auth/login/", {"email": "new@example.com", "password": "Strong-pass-123"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+
+        response = self.client.post(
+            "/api/auth/login/", {"email": "new@example.com", "password": "wrong"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("non_field_errors", response.data)
+
+    def test_busy_pool_returns_503_with_retry_after(self):
+        pending = auth_pool.pending
+        auth_pool.pending = auth_pool.max_pending
+        self.addCleanup(setattr, auth_pool, "pending", pending)
+        response = self.client.post(
+            "/api/auth/login/", {"email": "any@example.com", "password": "pass"}, format="json"
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data["detail"].code, "pool_busy")
+        self.assertEqual(response["Retry-After"], str(auth_pool.retry_after))
+
+
+class FollowManyTest(TestCase):
+    """Массовые подписки идемпотентны, счётчики сдвигаются только на реально изменённые связи"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.me, *others = [
+            User.objects.create_user(email=f"user{i}@example.com", username=f"user{i}", password="pass").profile
+            for i in range(4)
+        ]
+        self.ids = [profile.pk for profile in others]
+        self.client.force_authenticate(self.me.user)
+
+    def post(self, action, ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/profiles/{action}/", {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def counters(self):
+        following = Profile.objects.get(pk=self.me.pk).following_count
+        followers = list(Profile.objects.filter(pk__in=self.ids).order_by("pk").values_list("followers_count", flat=True))
+        return following, followers
+
+    def test_follow_and_unfollow_many_are_idempotent(self):
+        self.me.follow(Profile.objects.get(pk=self.ids[0]))
+        self.assertEqual(self.post("follow-many", self.ids + [self.me.pk, 10**6])["followed"], self.ids[1:])
+        self.assertEqual(self.post("follow-many", self.ids)["followed"], [])
+        self.assertEqual(self.counters(), (3, [1, 1, 1]))
+
+        self.assertEqual(self.post("unfollow-many", self.ids[:2])["unfollowed"], self.ids[:2])
+        self.assertEqual(self.post("unfollow-many", self.ids[:2])["unfollowed"], [])
+        self.assertEqual(self.counters(), (1, [0, 0, 1]))
+        self.assertEqual(Follow.objects.filter(from_profile=self.me).count(), 1)
+
+    def test_deleting_profile_releases_counters(self):
+        self.post("follow-many", self.ids)
+        other = Profile.objects.get(pk=self.ids[0])
+        other.follow(self.me)
+        self.me.user.delete()
+        self.assertEqual(
+            list(Profile.objects.filter(pk__in=self.ids).order_by("pk").values_list("followers_count", flat=True)),
+            [0, 0, 0],
+        )
+        self.assertEqual(Profile.objects.get(pk=other.pk).following_count, 0)
+
+
+class FollowListTest(TestCase):
+    """Подписчики, подписки и друзья листаются курсором от новых подписок к старым"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.me, *self.others = [
+            User.objects.create_user(email=f"user{i}@example.com", username=f"user{i}", password="pass").profile
+            for i in range(6)
+        ]
+        start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        for i, other in enumerate(self.others):
+            other.follow(self.me)
+            self.me.follow(other)
+            # одинаковое время у пар проверяет добивку сортировки по pk
+            moment = start + datetime.timedelta(minutes=(i + 1) // 2)
+            Follow.objects.filter(to_profile=self.me, from_profile=other).update(created_at=moment)
+            Follow.objects.filter(from_profile=self.me, to_profile=other).update(created_at=moment)
+        # friends — только взаимные подписки
+        self.others[0].unfollow(self.me)
+
+    def walk(self, action):
+        """Имена пользователей по всем страницам и число запросов на каждую страницу"""
+        url = f"/api/profiles/{self.me.pk}/{action}/?page_size=2"
+        names, queries = [], []
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            names += [user["username"] for user in response.data["results"]]
+            queries.append(len(captured))
+            url = response.data["next"]
+        return names, queries
+
+    def test_pages_follow_link_time(self):
+        # user5 и user4, user3 и user2 подписаны в одну минуту: более поздняя связь идёт первой
+        expected = {
+            "following": ["user5", "user4", "user3", "user2", "user1"],
+            "followers": ["user5", "user4", "user3", "user2"],
+            "friends": ["user5", "user4", "user3", "user2"],
+        }
+        for action, usernames in expected.items():
+            with self.subTest(action=action):
+                names, queries = self.walk(action)
+                self.assertEqual(names, usernames)
+                # профиль и страница связей с пользователями — без запроса на строку
+                self.assertEqual(set(queries), {2})
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(f"/api/profiles/{self.me.pk}/followers/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+class ProfileShapeTest(TestCase):
+    """?fields= оставляет только перечисленные поля, ?expand= раскрывает только указанные связи"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.genre = Genre.objects.create(name="Драма")
+        self.movie = Movie.objects.create(title="Фильм", release_year=2000)
+        self.movie.genres.add(self.genre)
+        self.profile = User.objects.create_user(email="user@example.com", username="user", password="pass").profile
+        self.profile.favorite_genres.add(self.genre)
+        self.profile.favorite_movies.add(self.movie)
+
+    def get(self, query, status_code=200):
+        response = self.client.get(f"/api/profiles/{self.profile.pk}/?{query}")
+        self.assertEqual(response.status_code, status_code, response.content)
+        return response.json()
+
+    def test_fields_select_nested_fields(self):
+        self.assertEqual(
+            self.get("fields=id,user.username,favorite_movies.title"),
+            {"id": self.profile.pk, "user": {"username": "user"}, "favorite_movies": [{"title": "Фильм"}]},
+        )
+
+    def test_expand_collapses_other_relations_to_ids(self):
+        data = self.get("fields=user,favorite_genres,favorite_movies&expand=favorite_movies")
+        self.assertEqual(data["user"], self.profile.user_id)
+        self.assertEqual(data["favorite_genres"], [self.genre.pk])
+        self.assertEqual(data["favorite_movies"][0]["title"], "Фильм")
+        # вложенная связь раскрытого объекта без своего expand тоже сворачивается
+        self.assertEqual(data["favorite_movies"][0]["genres"], [self.genre.pk])
+        data = self.get("fields=favorite_movies&expand=favorite_movies,favorite_movies.genres")
+        self.assertEqual(data["favorite_movies"][0]["genres"][0]["name"], "Драма")
+
+    def test_without_params_response_is_full(self):
+        data = self.get("")
+        self.assertEqual(data["user"]["username"], "user")
+        self.assertEqual(data["favorite_movies"][0]["genres"][0]["name"], "Драма")
+
+    def test_unknown_names_are_rejected(self):
+        for query in ("fields=id,nope", "fields=user.nope", "expand=bio", "expand=favorite_movies.nope"):
+            with self.subTest(query):
+                self.assertIn("Неизвестные поля", str(self.get(query, 400)))
+
+
+@override_settings(FEED={"WORKERS": 0})
+class RecommendationsTest(TestCase):
+    """Соседи по косинусу на маленькой матрице с известными сходствами"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.m1, self.m2, self.m3 = [Movie.objects.create(title=f"Фильм {i}", release_year=2000) for i in range(3)]
+        self.s1 = Series.objects.create(title="Сериал", start_year=2010)
+        self.loved = CatalogMovie.objects.create(title="Любимый")
+        self.p1, self.p2, self.p3, self.p4 = [
+            User.objects.create_user(email=f"user{i}@example.com", username=f"user{i}", password="pass").profile
+            for i in range(4)
+        ]
+        self.p1.favorite_movies.add(self.m1, self.m2)
+        self.p2.favorite_movies.add(self.m1, self.m2)
+        self.p2.favorite_series.add(self.s1)
+        self.p3.favorite_movies.add(self.m2, self.m3)
+        self.p3.favorite_series.add(self.s1)
+        self.p4.favorite_movies.add(self.m1)
+        # пятёрка — сигнал, тройка (нейтральная оценка) — нет
+        self.rate(self.p1, self.loved, 5)
+        self.rate(self.p4, self.loved, 3)
+
+    def rate(self, profile, movie, rating):
+        Review.objects.create(movie=movie, author=profile.user, title="Отзыв", content="Текст", rating=rating)
+
+    def neighbours(self):
+        return {
+            (row.item_kind, row.item_id, row.neighbour_kind, row.neighbour_id): row.score
+            for row in ItemNeighbour.objects.all()
+        }
+
+    def test_cosine_neighbours_and_chunking(self):
+        matrix = ItemMatrix.load()
+        self.assertEqual(matrix.shape, (4, 5))
+        # нейтральная оценка p4 не попала в матрицу: у фильма каталога один профиль, p1
+        loved = int(np.flatnonzero(matrix.keys == (KINDS.index("catalog_movie") << KIND_SHIFT) | self.loved.pk)[0])
+        self.assertEqual(int((matrix.cols == loved).sum()), 1)
+
+        refresh_recommendations(chunk_cells=10**6)
+        full = self.neighbours()
+        # m1: p1, p2, p4; m2: p1, p2, p3 — cos = 2 / 3
+        self.assertAlmostEqual(full["movie", self.m1.pk, "movie", self.m2.pk], 2 / 3)
+        # m2 и s1: общие p2, p3 из трёх и двух профилей
+        self.assertAlmostEqual(full["movie", self.m2.pk, "series", self.s1.pk], 2 / (3 ** 0.5 * 2 ** 0.5))
+        self.assertNotIn(("movie", self.m1.pk, "movie", self.m1.pk), full)
+
+        with mock.patch("users.recommendations.MAX_PAIRS", 3):
+            refresh_recommendations(chunk_cells=1)
+        chunked = self.neighbours()
+        self.assertEqual(chunked.keys(), full.keys())
+        for key, score in full.items():
+            self.assertAlmostEqual(chunked[key], score)
+
+    def test_recommend_excludes_owned_items(self):
+        refresh_recommendations()
+        recommended = recommend(self.p4.pk)
+        keys = [(kind, pk) for kind, pk, _ in recommended]
+        self.assertEqual(keys[0], ("movie", self.m2.pk))
+        self.assertNotIn(("movie", self.m1.pk), keys)
+        # фильм каталога у p4 есть (пусть и с нейтральной оценкой) — не рекомендуется
+        self.assertNotIn(("catalog_movie", self.loved.pk), keys)
+        self.assertEqual(recommend(User.objects.create_user(
+            email="new@example.com", username="new", password="pass").profile.pk), [])
+
+        response = self.client.get(f"/api/profiles/{self.p4.pk}/recommendations/?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(set(response.data[0]), {"type", "id", "title", "score"})
+        self.assertEqual((response.data[0]["type"], response.data[0]["title"]), ("movie", "Фильм 1"))
+        self.assertEqual(self.client.get(f"/api/profiles/{self.p4.pk}/recommendations/?limit=0").status_code, 400)
+
+
+@override_settings(FEED={"WORKERS": 0})
+class SuggestionsTest(TestCase):
+    """Кандидаты на расстоянии двух подписок: общие связи, затем общие жанры"""
+
+    def setUp(self):
+        names = ("me", "a", "b", "c", "d", "h")
+        self.p = {
+            name: User.objects.create_user(email=f"{name}@example.com", username=name, password="pass").profile
+            for name in names
+        }
+        genre = Genre.objects.create(name="Драма")
+        self.p["me"].favorite_genres.add(genre)
+        self.p["d"].favorite_genres.add(genre)
+        for source, targets in {"me": "ab", "a": "cdb", "b": "c", "c": "h"}.items():
+            self.p[source].follow_many([self.p[name].pk for name in targets])
+        # обратные подписки на себя и на уже отслеживаемых кандидатами не становятся
+        self.p["a"].follow(self.p["me"])
+        self.p["b"].follow(self.p["a"])
+
+    def suggestions(self, name):
+        return list(
+            ProfileSuggestion.objects.filter(profile=self.p[name])
+            .order_by("rank")
+            .values_list("candidate__user__username", "mutual_count", "shared_genres")
+        )
+
+    def test_ranking_and_exclusions(self):
+        refresh_suggestions(full=True)
+        # c: две общие связи; d: одна связь и общий жанр; a, b и сам me исключены
+        self.assertEqual(self.suggestions("me"), [("c", 2, 0), ("d", 1, 1)])
+        # для a: me — он сам через обратную подписку, b и c уже отслеживаются
+        self.assertEqual(self.suggestions("a"), [("h", 1, 0)])
+        self.assertFalse(Profile.objects.filter(suggestions_stale=True).exists())
+
+    def test_follow_during_refresh_marks_profile_stale_again(self):
+        refresh_suggestions(full=True)
+        snapshot = SuggestionEngine.__init__
+
+        def follow_while_snapshotting(engine, *args, **kwargs):
+            self.p["d"].follow(self.p["h"])
+            snapshot(engine, *args, **kwargs)
+
+        self.p["h"].follow(self.p["d"])
+        with mock.patch.object(SuggestionEngine, "__init__", follow_while_snapshotting):
+            refresh_suggestions()
+        self.assertTrue(Profile.objects.get(pk=self.p["d"].pk).suggestions_stale)
+        self.assertFalse(Profile.objects.get(pk=self.p["me"].pk).suggestions_stale)
+
+
+class ImportUsersTest(TestCase):
+    """Повторный импорт ничего не меняет, занятые email и username пропускаются"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = Path(directory) / "users.jsonl"
+        self.genres = {Genre.objects.create(name=name).pk for name in DEFAULT_GENRE_NAMES}
+        User.objects.create_user(email="taken@example.com", username="taken", password="pass")
+
+    def run_import(self, records):
+        self.path.write_text("\n".join(json.dumps(record) for record in records))
+        out = io.StringIO()
+        call_command("import_users", str(self.path), "--workers", "1", stdout=out)
+        return out.getvalue()
+
+    def test_import_is_idempotent(self):
+        records = [
+            {"email": "Plain@EXAMPLE.com", "username": "plain", "password": "secret"},
+            {"email": "hashed@example.com", "username": "hashed", "password_hash": make_password("secret")},
+            {"email": "taken@example.com", "username": "other"},
+            {"email": "fresh@example.com", "username": "taken"},
+            {"email": "hashed@example.com", "username": "again"},
+        ]
+        self.assertIn("Создано: 2, пропущено: 3", self.run_import(records))
+        self.assertIn("Создано: 0, пропущено: 5", self.run_import(records))
+
+        users = {user.username: user for user in User.objects.select_related("profile")}
+        self.assertEqual(set(users), {"taken", "plain", "hashed"})
+        self.assertEqual(users["plain"].email, "Plain@example.com")
+        for name in ("plain", "hashed"):
+            with self.subTest(username=name):
+                self.assertTrue(users[name].check_password("secret"))
+                self.assertEqual(set(users[name].profile.favorite_genres.values_list("pk", flat=True)), self.genres)
+        self.assertFalse(User.objects.filter(email="fresh@example.com").exists())
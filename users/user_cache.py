@@ -0,0 +1,95 @@
+"""
+Кэш пользователей для JWT-аутентификации в памяти процесса.
+
+JWTAuthentication на каждый запрос делает User.objects.get(id=...). Здесь
+пользователь берётся из ограниченного LRU-кэша с TTL. Сохранение/удаление
+пользователя сбрасывает запись локально (сигналы в users/models.py) и
+увеличивает версию пользователя в общем кэше (алиас shared, виден всем
+процессам); другие воркеры сверяют версию не чаще раза в REVALIDATE секунд,
+так что чужое изменение доходит до них с такой задержкой, а остальные
+запросы не делают никакого I/O.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+VERSION_KEY = "auth:user:{}:version"
+
+
+class UserCache:
+    def __init__(self, maxsize=None, ttl=None, revalidate=None, cache_alias=None):
+        config = getattr(settings, "AUTH_USER_CACHE", {})
+        self.maxsize = maxsize if maxsize is not None else config.get("MAXSIZE", 10_000)
+        self.ttl = ttl if ttl is not None else config.get("TTL", 300)
+        self.revalidate = revalidate if revalidate is not None else config.get("REVALIDATE", 5)
+        self.cache_alias = cache_alias or config.get("CACHE", "shared")
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (значения полей, версия, загружен, проверен)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _version(self, user_id):
+        return self.cache.get(VERSION_KEY.format(user_id), 0)
+
+    @staticmethod
+    def _snapshot(user):
+        return tuple(getattr(user, field.attname) for field in user._meta.concrete_fields)
+
+    @staticmethod
+    def _build(values):
+        # Каждый запрос получает свой экземпляр, чтобы состояние не протекало между запросами
+        User = get_user_model()
+        return User.from_db(None, [field.attname for field in User._meta.concrete_fields], values)
+
+    def get(self, user_id, loader):
+        """Пользователь из кэша или loader(user_id), если записи нет/она устарела"""
+        if self.maxsize <= 0:
+            return loader(user_id)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+        if entry is not None:
+            values, version, loaded_at, checked_at = entry
+            if now - loaded_at < self.ttl:
+                if now - checked_at < self.revalidate:
+                    return self._build(values)
+                if self._version(user_id) == version:
+                    with self._lock:
+                        if user_id in self._entries:
+                            self._entries[user_id] = (values, version, loaded_at, now)
+                    return self._build(values)
+
+        # версию читаем до загрузки: изменение во время загрузки увидим при следующей сверке
+        version = self._version(user_id)
+        user = loader(user_id)
+        with self._lock:
+            self._entries[user_id] = (self._snapshot(user), version, now, now)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        """Сбрасывает пользователя в этом процессе и во всех остальных"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+        key = VERSION_KEY.format(user_id)
+        cache = self.cache
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
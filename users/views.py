@@ -1,15 +1,26 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from rest_framework.decorators import action
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 
-from .models import Profile, Genre, Movie, Series
+from core.fieldsets import shape_queryset
+from core.filters import CatalogFilter, KeysetOrderingMixin
+from core.pagination import KeysetPagination
+from core.versions import ConditionalGetMixin
+from .models import Profile, Follow, ProfileSuggestion, Genre, Movie, Series
+from .recommendations import TOP_K, recommend, describe
+from .revocation import revocation_store
 from .serializers import (
     UserSerializer,
     ProfileSerializer,
+    ProfileIdsSerializer,
+    ProfileSuggestionSerializer,
+    RecommendationSerializer,
     GenreSerializer,
     MovieSerializer,
     SeriesSerializer,
@@ -19,6 +30,8 @@ from .serializers import (
 
 User = get_user_model()
 
+MAX_RECOMMENDATIONS = 100
+
 # ================== USERS ==================
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
@@ -31,48 +44,110 @@ class ProfileViewSet(viewsets.ModelViewSet):
     serializer_class = ProfileSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        """Связи грузим пачкой и только те, что попадут в ответ (core/fieldsets.py)"""
+        if self.action not in ("list", "retrieve"):
+            return Profile.objects.select_related("user")
+        return shape_queryset(Profile.objects.order_by("id"), self.get_serializer())
+
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
     def follow(self, request, pk=None):
         profile = self.get_object()
         if profile == request.user.profile:
             return Response({"error": "Нельзя подписаться на себя"}, status=status.HTTP_400_BAD_REQUEST)
-        if profile in request.user.profile.following.all():
-            return Response({"error": "Вы уже подписаны"}, status=status.HTTP_400_BAD_REQUEST)
-        request.user.profile.following.add(profile)
+        if not request.user.profile.follow(profile):
+            return Response({"message": "Вы уже подписаны"}, status=status.HTTP_200_OK)
         return Response({"message": f"Вы подписались на {profile.user.username}"}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
     def unfollow(self, request, pk=None):
         profile = self.get_object()
-        if profile not in request.user.profile.following.all():
-            return Response({"error": "Вы не подписаны"}, status=status.HTTP_400_BAD_REQUEST)
-        request.user.profile.following.remove(profile)
+        if not request.user.profile.unfollow(profile):
+            return Response({"message": "Вы не подписаны"}, status=status.HTTP_200_OK)
         return Response({"message": f"Вы отписались от {profile.user.username}"}, status=status.HTTP_200_OK)
 
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="follow-many",
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def follow_many(self, request):
+        """Массовая подписка, например при онбординге"""
+        serializer = ProfileIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        followed = request.user.profile.follow_many(serializer.validated_data["ids"])
+        return Response({"followed": followed}, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="unfollow-many",
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def unfollow_many(self, request):
+        """Массовая отписка"""
+        serializer = ProfileIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        unfollowed = request.user.profile.unfollow_many(serializer.validated_data["ids"])
+        return Response({"unfollowed": unfollowed}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
+    def suggestions(self, request):
+        """Возможно, вы знакомы: готовый список из пакетного расчёта (build_suggestions)"""
+        profile = request.user.profile
+        already_following = Follow.objects.filter(from_profile=profile, to_profile=OuterRef("candidate"))
+        suggestions = (
+            ProfileSuggestion.objects.filter(profile=profile)
+            .exclude(Exists(already_following))
+            .select_related("candidate__user")
+            .order_by("rank")
+        )
+        return Response(ProfileSuggestionSerializer(suggestions, many=True).data)
+
+    @action(detail=True, methods=["get"])
+    def recommendations(self, request, pk=None):
+        """Фильмы и сериалы по соседям из пакетного расчёта (build_recommendations)"""
+        profile = self.get_object()
+        try:
+            limit = min(int(request.query_params.get("limit", TOP_K)), MAX_RECOMMENDATIONS)
+        except ValueError:
+            raise ValidationError({"limit": "Должно быть целым числом"})
+        if limit < 1:
+            raise ValidationError({"limit": "Должно быть больше 0"})
+        items = describe(recommend(profile.pk, limit))
+        return Response(RecommendationSerializer(items, many=True).data)
+
+    def paginate_follows(self, links, side):
+        """Страница пользователей по связям подписки, от новых подписок к старым"""
+        paginator = KeysetPagination(ordering=("-created_at", "-pk"))
+        page = paginator.paginate_queryset(
+            links.select_related(f"{side}__user"), self.request, view=self
+        )
+        serializer = UserSerializer([getattr(link, side).user for link in page], many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=["get"])
     def followers(self, request, pk=None):
         profile = self.get_object()
-        followers = profile.followers.all().select_related("user")
-        serializer = UserSerializer([p.user for p in followers], many=True)
-        return Response(serializer.data)
+        return self.paginate_follows(Follow.objects.filter(to_profile=profile), "from_profile")
 
     @action(detail=True, methods=["get"])
     def following(self, request, pk=None):
         profile = self.get_object()
-        following = profile.following.all().select_related("user")
-        serializer = UserSerializer([p.user for p in following], many=True)
-        return Response(serializer.data)
+        return self.paginate_follows(Follow.objects.filter(from_profile=profile), "to_profile")
 
     @action(detail=True, methods=["get"])
     def friends(self, request, pk=None):
         profile = self.get_object()
-        friends = profile.following.filter(following=profile).select_related("user")
-        serializer = UserSerializer([p.user for p in friends], many=True)
-        return Response(serializer.data)
+        mutual = Follow.objects.filter(from_profile=OuterRef("to_profile"), to_profile=profile)
+        links = Follow.objects.filter(Exists(mutual), from_profile=profile)
+        return self.paginate_follows(links, "to_profile")
 
 # ================== GENRES ==================
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Genre.objects.all()
+    version_collection = "genres"
     serializer_class = GenreSerializer
 
     def get_permissions(self):
@@ -81,9 +156,19 @@ class GenreViewSet(viewsets.ModelViewSet):
         return [permissions.IsAdminUser()]
 
 # ================== MOVIES ==================
-class MovieViewSet(viewsets.ModelViewSet):
+class MovieViewSet(ConditionalGetMixin, KeysetOrderingMixin, viewsets.ModelViewSet):
     queryset = Movie.objects.all()
+    version_collection = "movies"
     serializer_class = MovieSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [CatalogFilter]
+    range_filters = {"release_year": "release_year"}
+    genre_field = "genres"
+    ordering_fields = {"title": "title", "year": "release_year"}
+    default_ordering = "title"
+
+    def get_queryset(self):
+        return shape_queryset(super().get_queryset(), self.get_serializer())
 
     def get_permissions(self):
         if self.request.method in permissions.SAFE_METHODS:
@@ -91,9 +176,19 @@ class MovieViewSet(viewsets.ModelViewSet):
         return [permissions.IsAdminUser()]
 
 # ================== SERIES ==================
-class SeriesViewSet(viewsets.ModelViewSet):
+class SeriesViewSet(ConditionalGetMixin, KeysetOrderingMixin, viewsets.ModelViewSet):
     queryset = Series.objects.all()
+    version_collection = "series"
     serializer_class = SeriesSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [CatalogFilter]
+    range_filters = {"start_year": "start_year", "end_year": "end_year"}
+    genre_field = "genres"
+    ordering_fields = {"title": "title", "year": "start_year"}
+    default_ordering = "title"
+
+    def get_queryset(self):
+        return shape_queryset(super().get_queryset(), self.get_serializer())
 
     def get_permissions(self):
         if self.request.method in permissions.SAFE_METHODS:
@@ -101,6 +196,7 @@ class SeriesViewSet(viewsets.ModelViewSet):
         return [permissions.IsAdminUser()]
 
 # ================== AUTH ==================
+# PBKDF2 считается в ограниченном пуле (users/auth_pool.py): при переполнении — 503
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -142,7 +238,11 @@ class LogoutView(APIView):
 
         try:
             token = RefreshToken(refresh_token)
-            token.blacklist()  # Помещаем токен в blacklist
-            return Response({"message": "Вы вышли из аккаунта"}, status=status.HTTP_205_RESET_CONTENT)
         except TokenError:
             return Response({"error": "Невалидный или просроченный токен"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Отзываем refresh и текущий access токен
+        revocation_store.revoke_token(token)
+        if request.auth is not None:
+            revocation_store.revoke_token(request.auth)
+        return Response({"message": "Вы вышли из аккаунта"}, status=status.HTTP_205_RESET_CONTENT)